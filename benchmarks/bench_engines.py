@@ -0,0 +1,46 @@
+"""Compare the row and columnar engines of parse_files on synthetic dumps.
+
+Run with ``python benchmarks/bench_engines.py --scale 0.01``.
+"""
+import os
+import tempfile
+import time
+
+import click
+
+from moviegraphbenchmark.create_graph import (
+    _create_data_path,
+    get_allowed,
+    get_excluded,
+    parse_files,
+)
+from synthetic import generate_imdb_dumps
+
+
+@click.command
+@click.option("--scale", default=0.01, type=float, help="Fraction of real row counts")
+@click.option("--workers", default=1, type=int, help="Number of parsing processes")
+@click.option("--compress", is_flag=True, help="Benchmark on .tsv.gz dumps")
+def main(scale: float, workers: int, compress: bool):
+    data_path, _ = _create_data_path()
+    allowed = get_allowed(os.path.join(data_path, "imdb", "allowed"))
+    exclude = get_excluded(os.path.join(data_path, "imdb", "exclude"))
+    with tempfile.TemporaryDirectory() as imdb_dir:
+        rows = sum(
+            generate_imdb_dumps(imdb_dir, allowed, scale=scale, compress=compress).values()
+        )
+        results = {}
+        for engine in ["row", "columnar"]:
+            start = time.perf_counter()
+            results[engine] = parse_files(
+                imdb_dir, allowed, exclude, workers=workers, engine=engine
+            )
+            elapsed = time.perf_counter() - start
+            click.echo(
+                f"{engine:>9}: {elapsed:8.2f}s {rows / elapsed:12,.0f} rows/s"
+            )
+    assert results["row"] == results["columnar"], "engines produced different triples"
+
+
+if __name__ == "__main__":
+    main()
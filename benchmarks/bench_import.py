@@ -0,0 +1,47 @@
+"""Time of importing the package and of the command line help.
+
+Run with ``python benchmarks/bench_import.py``. Every import runs in a
+fresh interpreter, the best of ``--repeat`` runs is reported next to the
+time of starting an interpreter without any import.
+"""
+import subprocess
+import sys
+import time
+
+import click
+
+CASES = {
+    "python": [sys.executable, "-c", "pass"],
+    "import moviegraphbenchmark": [sys.executable, "-c", "import moviegraphbenchmark"],
+    "import create_graph": [
+        sys.executable,
+        "-c",
+        "import moviegraphbenchmark.create_graph",
+    ],
+    "cli --help": [sys.executable, "-m", "moviegraphbenchmark.cli", "--help"],
+    "import load_data": [
+        sys.executable,
+        "-c",
+        "from moviegraphbenchmark import load_data",
+    ],
+}
+
+
+def _best_time(command, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@click.command
+@click.option("--repeat", default=5, type=int, help="Runs per case, the best is reported")
+def main(repeat: int):
+    for name, command in CASES.items():
+        click.echo(f"{name:>26}: {_best_time(command, repeat) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare the peak memory of creating the IMDB graph via lists and via streaming.
+
+Run with ``python benchmarks/bench_memory.py --scale 0.05``. Every mode runs
+in a fresh process, so the reported peak RSS is not shared between them.
+"""
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from moviegraphbenchmark.create_graph import (
+    _create_data_path,
+    create_imdb_graph,
+    get_allowed,
+    get_excluded,
+    parse_files,
+    write_files,
+)
+from synthetic import generate_imdb_dumps
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+
+def _run(mode: str, imdb_dir: str, out_dir: str):
+    allowed = get_allowed(os.path.join(imdb_dir, "allowed"))
+    exclude = get_excluded(os.path.join(imdb_dir, "exclude"))
+    out_folders = [os.path.join(out_dir, "imdb-tmdb"), os.path.join(out_dir, "imdb-tvdb")]
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "lists":
+        cleaned_attr, rel_trips = parse_files(imdb_dir, allowed, exclude)
+        for out_folder in out_folders:
+            write_files(cleaned_attr, rel_trips, out_folder)
+    else:
+        create_imdb_graph(imdb_dir, allowed, exclude, out_folders)
+    elapsed = time.perf_counter() - start
+    click.echo(
+        f"{mode:>6}: {elapsed:8.2f}s peak RSS {_peak_rss_mb():8.1f} MB"
+        f" (after imports {baseline:.1f} MB)"
+    )
+
+
+@click.command
+@click.option("--scale", default=0.05, type=float, help="Fraction of real row counts")
+@click.option(
+    "--n-allowed",
+    default=0,
+    type=int,
+    help="Number of synthetic allowed ids, by default the real allowed list is used",
+)
+@click.option("--run", "run_mode", default=None, hidden=True)
+@click.option("--imdb-dir", default=None, hidden=True)
+@click.option("--out-dir", default=None, hidden=True)
+def main(scale: float, n_allowed: int, run_mode: str, imdb_dir: str, out_dir: str):
+    if run_mode is not None:
+        _run(run_mode, imdb_dir, out_dir)
+        return
+    data_path, _ = _create_data_path()
+    if n_allowed:
+        allowed = {f"nm{i:07d}" for i in range(n_allowed // 2)} | {
+            f"tt{i:07d}" for i in range(n_allowed - n_allowed // 2)
+        }
+    else:
+        allowed = get_allowed(os.path.join(data_path, "imdb", "allowed"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        imdb_dir = os.path.join(tmp_dir, "imdb")
+        generate_imdb_dumps(imdb_dir, allowed, scale=scale)
+        with open(os.path.join(imdb_dir, "allowed"), "w", encoding="utf8") as out_file:
+            out_file.write("\n".join(allowed) + "\n")
+        shutil.copyfile(
+            os.path.join(data_path, "imdb", "exclude"),
+            os.path.join(imdb_dir, "exclude"),
+        )
+        for mode in ["lists", "stream"]:
+            subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--run",
+                    mode,
+                    "--imdb-dir",
+                    imdb_dir,
+                    "--out-dir",
+                    os.path.join(tmp_dir, mode),
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Throughput, wall time and peak RSS of every stage of creating and loading the data.
+
+Run with ``python benchmarks/bench_stages.py --scale 1 --scale 10 --output results.json``
+to benchmark on synthetic dumps with the real (1x) and ten times (10x) the
+real number of rows, and add ``--baseline old_results.json`` to compare
+against an earlier run. The dumps are generated once per scale and seed in
+``--work-dir`` and reused by later runs. Every stage runs in a fresh
+process, so the reported peak RSS is not shared between stages.
+"""
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import click
+
+import moviegraphbenchmark
+from moviegraphbenchmark.create_graph import (
+    REL,
+    _create_data_path,
+    _dedup,
+    create_imdb_graph,
+    get_allowed,
+    get_excluded,
+    iter_trips,
+    parse_files,
+    write_files,
+)
+from moviegraphbenchmark.loading import load_data
+from synthetic import cached_imdb_dumps
+
+STAGES = [
+    "parse_files",
+    "_dedup",
+    "write_files",
+    "create_imdb_graph",
+    "load_data",
+    "load_data_cached",
+]
+
+# files of the repository needed to load imdb-tvdb besides the IMDB graph
+_PAIR = "imdb-tvdb"
+_REPO_FILES = ["imdb_intra_ent_links", "tvdb_intra_ent_links", _PAIR]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+
+def _split(trips):
+    attr_trips, rel_trips = [], []
+    for target, t in trips:
+        (rel_trips if target == REL else attr_trips).append(t)
+    return attr_trips, rel_trips
+
+
+def _run_stage(stage: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Set up and time a single stage, called in a fresh process."""
+    imdb_dir = config["imdb_dir"]
+    data_dir = config["data_dir"]
+    allowed = get_allowed(os.path.join(imdb_dir, "allowed"))
+    exclude = get_excluded(os.path.join(imdb_dir, "exclude"))
+    parse_args = dict(workers=config["workers"], engine=config["engine"])
+    out_folders = [os.path.join(data_dir, "imdb-tmdb"), os.path.join(data_dir, _PAIR)]
+    # everything before the timer is setup and only shows up in setup RSS
+    if stage == "_dedup":
+        attr_trips, rel_trips = _split(iter_trips(imdb_dir, allowed, exclude, **parse_args))
+    elif stage == "write_files":
+        attr_trips, rel_trips = parse_files(imdb_dir, allowed, exclude, **parse_args)
+        out_dir = tempfile.mkdtemp(dir=config["work_dir"])
+    setup_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    if stage == "parse_files":
+        attr_trips, rel_trips = parse_files(imdb_dir, allowed, exclude, **parse_args)
+        rows = config["dump_rows"]
+    elif stage == "_dedup":
+        rows = len(attr_trips) + len(rel_trips)
+        _dedup(attr_trips)
+        _dedup(rel_trips)
+    elif stage == "write_files":
+        write_files(attr_trips, rel_trips, out_dir)
+        rows = len(attr_trips) + len(rel_trips)
+    elif stage == "create_imdb_graph":
+        create_imdb_graph(imdb_dir, allowed, exclude, out_folders, **parse_args)
+        rows = config["dump_rows"]
+    else:
+        data = load_data(_PAIR, data_dir, use_cache=stage == "load_data_cached")
+        rows = sum(
+            len(frame)
+            for frame in [
+                data.attr_triples_1,
+                data.attr_triples_2,
+                data.rel_triples_1,
+                data.rel_triples_2,
+                data.ent_links,
+            ]
+        )
+    seconds = time.perf_counter() - start
+    if stage == "write_files":
+        shutil.rmtree(out_dir)
+    return {
+        "stage": stage,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_s": rows / seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "setup_rss_mb": setup_rss,
+    }
+
+
+def _spawn(stage: str, config_path: str) -> Dict[str, Any]:
+    result_path = f"{config_path}.{stage}.json"
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--run-stage",
+            stage,
+            "--config",
+            config_path,
+            "--result",
+            result_path,
+        ],
+        check=True,
+    )
+    with open(result_path, encoding="utf8") as in_file:
+        return json.load(in_file)
+
+
+def _prepare_data_dir(repo_data_path: str, imdb_dir: str, data_dir: str):
+    """Data folder with the files of the repository and the synthetic lists."""
+    if os.path.exists(data_dir):
+        shutil.rmtree(data_dir)
+    for name in _REPO_FILES:
+        src = os.path.join(repo_data_path, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(data_dir, name))
+        else:
+            os.makedirs(data_dir, exist_ok=True)
+            shutil.copyfile(src, os.path.join(data_dir, name))
+    os.makedirs(os.path.join(data_dir, "imdb"))
+    for name in ["allowed", "exclude"]:
+        shutil.copyfile(os.path.join(imdb_dir, name), os.path.join(data_dir, "imdb", name))
+
+
+def _compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float):
+    with open(baseline_path, encoding="utf8") as in_file:
+        baseline = {
+            (r["scale"], r["stage"]): r for r in json.load(in_file)["results"]
+        }
+    click.echo(f"\nCompared to {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["scale"], result["stage"]))
+        if old is None:
+            continue
+        speed = result["rows_per_s"] / old["rows_per_s"] - 1
+        memory = result["peak_rss_mb"] / old["peak_rss_mb"] - 1
+        flag = "  REGRESSION" if speed < -tolerance or memory > tolerance else ""
+        click.echo(
+            f"{result['scale']:>6g}x {result['stage']:>18}: rows/s {speed:+7.1%}"
+            f" peak RSS {memory:+7.1%}{flag}"
+        )
+
+
+@click.command
+@click.option(
+    "--scale",
+    "scales",
+    default=[0.01],
+    type=float,
+    multiple=True,
+    help="Fraction of real row counts, can be given multiple times",
+)
+@click.option("--seed", default=0, type=int, help="Seed of the generated dumps")
+@click.option("--compress", is_flag=True, help="Benchmark on .tsv.gz dumps")
+@click.option("--workers", default=1, type=int, help="Number of parsing processes")
+@click.option("--engine", default="row", type=click.Choice(["row", "columnar"]))
+@click.option(
+    "--stage",
+    "stages",
+    default=STAGES,
+    type=click.Choice(STAGES),
+    multiple=True,
+    help="Stages to run, by default all",
+)
+@click.option(
+    "--work-dir",
+    default=None,
+    help="Directory in which generated dumps are kept, by default a temporary one",
+)
+@click.option("--output", default=None, help="Write the results to this JSON file")
+@click.option("--baseline", default=None, help="Compare to the results in this JSON file")
+@click.option(
+    "--tolerance",
+    default=0.1,
+    type=float,
+    help="Relative change of rows/s or peak RSS that is reported as regression",
+)
+@click.option("--run-stage", default=None, hidden=True)
+@click.option("--config", "config_path", default=None, hidden=True)
+@click.option("--result", "result_path", default=None, hidden=True)
+def main(
+    scales: List[float],
+    seed: int,
+    compress: bool,
+    workers: int,
+    engine: str,
+    stages: List[str],
+    work_dir: Optional[str],
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+    run_stage: Optional[str],
+    config_path: Optional[str],
+    result_path: Optional[str],
+):
+    if run_stage is not None:
+        with open(config_path, encoding="utf8") as in_file:
+            config = json.load(in_file)
+        with open(result_path, "w", encoding="utf8") as out_file:
+            json.dump(_run_stage(run_stage, config), out_file)
+        return
+    repo_data_path, _ = _create_data_path()
+    allowed = get_allowed(os.path.join(repo_data_path, "imdb", "allowed"))
+    exclude = get_excluded(os.path.join(repo_data_path, "imdb", "exclude"))
+    # loading needs the graph, so it is created before in any case
+    if any(stage.startswith("load_data") for stage in stages):
+        stages = list(stages) + ["create_imdb_graph"]
+    stages = [stage for stage in STAGES if stage in stages]
+    tmp_dir = None
+    if work_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        work_dir = tmp_dir.name
+    results = []
+    try:
+        for scale in scales:
+            start = time.perf_counter()
+            imdb_dir, counts = cached_imdb_dumps(
+                os.path.join(work_dir, "dumps"), allowed, exclude, scale, seed, compress
+            )
+            click.echo(
+                f"{scale:g}x: {sum(counts.values()):,} dump rows in {imdb_dir}"
+                f" ({time.perf_counter() - start:.1f}s)"
+            )
+            config = {
+                "imdb_dir": imdb_dir,
+                "data_dir": os.path.join(work_dir, "data"),
+                "work_dir": work_dir,
+                "dump_rows": sum(counts.values()),
+                "workers": workers,
+                "engine": engine,
+            }
+            _prepare_data_dir(repo_data_path, imdb_dir, config["data_dir"])
+            config_path = os.path.join(work_dir, "config.json")
+            with open(config_path, "w", encoding="utf8") as out_file:
+                json.dump(config, out_file)
+            for stage in stages:
+                if stage == "load_data_cached":
+                    # the first load creates the cache, the second one is timed
+                    _spawn(stage, config_path)
+                result = _spawn(stage, config_path)
+                result["scale"] = scale
+                results.append(result)
+                click.echo(
+                    f"{scale:>6g}x {stage:>18}: {result['seconds']:8.2f}s"
+                    f" {result['rows_per_s']:12,.0f} rows/s"
+                    f" peak RSS {result['peak_rss_mb']:8.1f} MB"
+                    f" (after setup {result['setup_rss_mb']:.1f} MB)"
+                )
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+    if output is not None:
+        with open(output, "w", encoding="utf8") as out_file:
+            json.dump(
+                {
+                    "version": moviegraphbenchmark.__version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "seed": seed,
+                    "compress": compress,
+                    "workers": workers,
+                    "engine": engine,
+                    "results": results,
+                },
+                out_file,
+                indent=2,
+            )
+    if baseline is not None:
+        _compare(results, baseline, tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Seeded generator for IMDB-shaped dumps, so benchmarks can run offline."""
+import gzip
+import json
+import os
+import random
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+# approximate number of rows of the dumps used to create the benchmark
+REAL_ROW_COUNTS = {
+    "name.basics.tsv": 10_300_000,
+    "title.basics.tsv": 7_000_000,
+    "title.episode.tsv": 5_000_000,
+    "title.principals.tsv": 41_000_000,
+}
+
+HEADERS = {
+    "name.basics.tsv": "nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles",
+    "title.basics.tsv": "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres",
+    "title.episode.tsv": "tconst\tparentTconst\tseasonNumber\tepisodeNumber",
+    "title.principals.tsv": "tconst\tordering\tnconst\tcategory\tjob\tcharacters",
+}
+
+_TITLE_TYPES = ["movie", "short", "tvMovie", "tvSeries", "tvEpisode", "video", "tvMiniSeries"]
+_PROFESSIONS = ["actor", "actress", "writer", "director", "producer", "composer"]
+_GENRES = ["Drama", "Comedy", "Crime", "Documentary", "Action", "Romance"]
+
+# filler ids are far above the ids of the real allowed list
+_FILLER_OFFSET = 50_000_000
+
+
+def _or_missing(rnd: random.Random, value: str, p: float = 0.2) -> str:
+    return "\\N" if rnd.random() < p else value
+
+
+def _name_row(rnd: random.Random, nconst: str, titles: List[str]) -> str:
+    return "\t".join(
+        [
+            nconst,
+            f"Person {nconst[2:]}",
+            _or_missing(rnd, str(rnd.randint(1880, 2005)), 0.6),
+            _or_missing(rnd, str(rnd.randint(1920, 2020)), 0.9),
+            _or_missing(rnd, ",".join(rnd.sample(_PROFESSIONS, rnd.randint(1, 3)))),
+            _or_missing(rnd, ",".join(rnd.sample(titles, min(len(titles), rnd.randint(1, 4))))),
+        ]
+    )
+
+
+def _title_row(rnd: random.Random, tconst: str) -> str:
+    return "\t".join(
+        [
+            tconst,
+            rnd.choice(_TITLE_TYPES),
+            f"Title {tconst[2:]}",
+            f"Original Title {tconst[2:]}",
+            str(int(rnd.random() < 0.02)),
+            _or_missing(rnd, str(rnd.randint(1900, 2020)), 0.1),
+            _or_missing(rnd, str(rnd.randint(1950, 2020)), 0.9),
+            _or_missing(rnd, str(rnd.randint(1, 240)), 0.3),
+            _or_missing(rnd, ",".join(rnd.sample(_GENRES, rnd.randint(1, 3))), 0.1),
+        ]
+    )
+
+
+def _episode_row(rnd: random.Random, tconst: str, titles: List[str]) -> str:
+    return "\t".join(
+        [
+            tconst,
+            rnd.choice(titles),
+            _or_missing(rnd, str(rnd.randint(1, 20))),
+            _or_missing(rnd, str(rnd.randint(1, 30))),
+        ]
+    )
+
+
+def _principal_row(rnd: random.Random, tconst: str, ordering: int, nconst: str) -> str:
+    return "\t".join(
+        [tconst, str(ordering), nconst, rnd.choice(_PROFESSIONS), "\\N", "\\N"]
+    )
+
+
+def _open(path: str, compress: bool) -> IO[str]:
+    if compress:
+        return gzip.open(path + ".gz", "wt", encoding="utf8", compresslevel=1)
+    return open(path, "w", encoding="utf8")
+
+
+def _ids(
+    rnd: random.Random, allowed_ids: List[str], prefix: str, n_rows: int
+) -> Iterator[str]:
+    # allowed ids are spread over random positions between the filler ids,
+    # which are produced on the fly so even 10x dumps need little memory
+    n_rows = max(n_rows, len(allowed_ids))
+    shuffled = list(allowed_ids)
+    rnd.shuffle(shuffled)
+    allowed_at = dict(zip(sorted(rnd.sample(range(n_rows), len(shuffled))), shuffled))
+    filler = 0
+    for position in range(n_rows):
+        if position in allowed_at:
+            yield allowed_at[position]
+        else:
+            yield f"{prefix}{_FILLER_OFFSET + filler:08d}"
+            filler += 1
+
+
+def generate_imdb_dumps(
+    imdb_dir: str,
+    allowed: Set[str],
+    scale: float = 0.01,
+    seed: int = 0,
+    compress: bool = False,
+    row_counts: Optional[Dict[str, int]] = None,
+    exclude: Optional[Set[Tuple[str, str]]] = None,
+) -> Dict[str, int]:
+    """Write IMDB-shaped dumps containing every id of the allowed list.
+
+    :param imdb_dir: Directory the dumps are written to.
+    :param allowed: Ids that have to show up in the dumps.
+    :param scale: Fraction of the real number of rows per dump.
+    :param seed: Seed of the random generator.
+    :param compress: Write .tsv.gz instead of .tsv files.
+    :param row_counts: Number of rows per dump at scale 1, defaults to the real ones.
+    :param exclude: Excluded (nconst, tconst) pairs, which are written as
+        principals so the exclusion is exercised.
+    :return: Number of written rows per dump.
+    """
+    rnd = random.Random(seed)
+    os.makedirs(imdb_dir, exist_ok=True)
+    row_counts = REAL_ROW_COUNTS if row_counts is None else row_counts
+    allowed_names = sorted(a for a in allowed if a.startswith("nm"))
+    allowed_titles = sorted(a for a in allowed if a.startswith("tt"))
+    excluded_names: Dict[str, List[str]] = {}
+    for nconst, tconst in sorted(exclude or []):
+        excluded_names.setdefault(tconst, []).append(nconst)
+    written = {}
+    for filename, header in HEADERS.items():
+        n_rows = int(row_counts[filename] * scale)
+        path = os.path.join(imdb_dir, filename)
+        count = 0
+        with _open(path, compress) as out_file:
+            out_file.write(header + "\n")
+            if filename == "name.basics.tsv":
+                for nconst in _ids(rnd, allowed_names, "nm", n_rows):
+                    out_file.write(_name_row(rnd, nconst, allowed_titles) + "\n")
+                    count += 1
+            elif filename == "title.basics.tsv":
+                for tconst in _ids(rnd, allowed_titles, "tt", n_rows):
+                    out_file.write(_title_row(rnd, tconst) + "\n")
+                    count += 1
+            elif filename == "title.episode.tsv":
+                for tconst in _ids(rnd, allowed_titles, "tt", n_rows):
+                    out_file.write(_episode_row(rnd, tconst, allowed_titles) + "\n")
+                    count += 1
+            else:
+                # about 6 principals per title
+                for tconst in _ids(rnd, allowed_titles, "tt", n_rows // 6):
+                    names = excluded_names.get(tconst, [])[:6]
+                    names += [rnd.choice(allowed_names) for _ in range(6 - len(names))]
+                    for ordering, nconst in enumerate(names, start=1):
+                        out_file.write(
+                            _principal_row(rnd, tconst, ordering, nconst) + "\n"
+                        )
+                        count += 1
+        written[filename] = count
+    return written
+
+
+def cached_imdb_dumps(
+    cache_dir: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    scale: float,
+    seed: int = 0,
+    compress: bool = False,
+) -> Tuple[str, Dict[str, int]]:
+    """Generate dumps with allowed and exclude list once and reuse them afterwards.
+
+    :param cache_dir: Directory holding one folder of dumps per configuration.
+    :param allowed: Ids that have to show up in the dumps.
+    :param exclude: Excluded (nconst, tconst) pairs.
+    :param scale: Fraction of the real number of rows per dump.
+    :param seed: Seed of the random generator.
+    :param compress: Write .tsv.gz instead of .tsv files.
+    :return: The folder of the dumps and the number of rows per dump.
+    """
+    imdb_dir = os.path.join(
+        cache_dir, f"scale-{scale:g}-seed-{seed}" + ("-gz" if compress else "")
+    )
+    # written last, so an interrupted generation is not reused
+    counts_path = os.path.join(imdb_dir, "row_counts.json")
+    if os.path.isfile(counts_path):
+        with open(counts_path, encoding="utf8") as in_file:
+            return imdb_dir, json.load(in_file)
+    counts = generate_imdb_dumps(
+        imdb_dir, allowed, scale=scale, seed=seed, compress=compress, exclude=exclude
+    )
+    with open(os.path.join(imdb_dir, "allowed"), "w", encoding="utf8") as out_file:
+        out_file.write("\n".join(sorted(allowed)) + "\n")
+    with open(os.path.join(imdb_dir, "exclude"), "w", encoding="utf8") as out_file:
+        out_file.write("\n".join("\t".join(pair) for pair in sorted(exclude)) + "\n")
+    with open(counts_path, "w", encoding="utf8") as out_file:
+        json.dump(counts, out_file)
+    return imdb_dir, counts
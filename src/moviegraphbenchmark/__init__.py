@@ -1,10 +1,30 @@
-import sys
-import logging
-from .loading import load_data
+import importlib
+from typing import TYPE_CHECKING
 
-from importlib.metadata import version  # pragma: no cover
+if TYPE_CHECKING:
+    from .loading import load_data
+    from .multi_source import load_multi_source
 
-logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+__all__ = ["load_data", "load_multi_source"]
 
-__all__ = ["load_data"]
-__version__ = version(__package__)
+# modules of the public functions, which are only imported on first use so
+# importing the package does not load pandas
+_lazy_functions = {"load_data": "loading", "load_multi_source": "multi_source"}
+
+
+def __getattr__(name: str):
+    if name in _lazy_functions:
+        module = importlib.import_module(f".{_lazy_functions[name]}", __name__)
+        value = getattr(module, name)
+    elif name == "__version__":
+        from importlib.metadata import version
+
+        value = version(__name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_functions) + ["__version__"])
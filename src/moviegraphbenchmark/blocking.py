@@ -0,0 +1,366 @@
+"""Token and q-gram blocking over the name and title literals.
+
+Literals of the blocking properties are normalized and split into tokens
+(or q-grams), which are integer encoded jointly for both KGs. The
+inverted index holds the entities of each token, and candidate pairs are
+all pairs of entities that share a token. Candidates are produced for
+batches of left entities, so each pair is emitted exactly once without
+keeping all pairs in memory. Pair completeness and reduction ratio are
+counted against ``ent_links`` while the batches are produced.
+"""
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from moviegraphbenchmark.encoding import EncodedERData
+from moviegraphbenchmark.evaluation import _contains, _sorted_unique
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    # the string kernels of pandas are used instead
+    pa = None
+
+BLOCKING_PROPERTIES = [
+    "https://www.scads.de/movieBenchmark/ontology/name",
+    "https://www.scads.de/movieBenchmark/ontology/title",
+]
+BATCH_SIZE = 1_000_000
+_DATATYPE = r"\^\^<[^>]*>$"
+
+
+def normalize_literals(literals: "pd.Series") -> "pd.Series":
+    """Lowercase literals without datatype and surrounding quotes."""
+    return (
+        literals.astype(object)
+        .fillna("")
+        .str.replace(_DATATYPE, "", regex=True)
+        .str.strip('"')
+        .str.lower()
+    )
+
+
+def _qgrams(value: str, q: int) -> List[str]:
+    if len(value) <= q:
+        return [value] if value else []
+    return [value[i : i + q] for i in range(len(value) - q + 1)]
+
+
+def _arrow_tokens(literals: np.ndarray, q: Optional[int]):
+    values = pa.array(literals, type=pa.large_string(), from_pandas=True)
+    values = pc.replace_substring_regex(pc.fill_null(values, ""), _DATATYPE, "")
+    values = pc.utf8_lower(pc.utf8_trim(values, '"'))
+    if q is None:
+        # RE2 has no unicode \w, this is the same class as \w of python
+        lists = pc.split_pattern_regex(values, r"[^\p{L}\p{N}_]+")
+        tokens = pc.list_flatten(lists)
+        parents = pc.list_parent_indices(lists).to_numpy()
+    else:
+        lengths = pc.utf8_length(values).to_numpy()
+        short = np.flatnonzero((lengths > 0) & (lengths < q))
+        parts = [values.take(short)]
+        part_parents = [short]
+        for start in range(max(int(lengths.max(initial=0)) - q + 1, 0)):
+            rows = np.flatnonzero(lengths >= start + q)
+            parts.append(
+                pc.utf8_slice_codeunits(values.take(rows), start, start + q)
+            )
+            part_parents.append(rows)
+        parents = np.concatenate(part_parents)
+        order = np.argsort(parents, kind="stable")
+        tokens = pa.concat_arrays(parts).take(order)
+        parents = parents[order]
+    # older pyarrow only filters with an Arrow mask
+    non_empty = pc.not_equal(tokens, "")
+    return (
+        parents[non_empty.to_numpy(zero_copy_only=False)],
+        tokens.filter(non_empty).to_pandas(),
+    )
+
+
+def _literal_tokens(
+    literals: np.ndarray, q: Optional[int]
+) -> Tuple[np.ndarray, "pd.Series"]:
+    """Tokens (or q-grams) of normalized literals and the literal of each."""
+    if pa is not None:
+        return _arrow_tokens(literals, q)
+    normalized = normalize_literals(pd.Series(literals, dtype=object))
+    if q is None:
+        tokens = normalized.str.findall(r"\w+")
+    else:
+        tokens = normalized.map(lambda value: _qgrams(value, q))
+    tokens = tokens.explode()
+    tokens = tokens[tokens.notna() & (tokens != "")]
+    return tokens.index.to_numpy(), tokens.reset_index(drop=True)
+
+
+def _csr(owners: np.ndarray, values: np.ndarray, size: int):
+    order = np.argsort(owners, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+
+@dataclass
+class BlockingIndex:
+    """Inverted index of the tokens of both KGs.
+
+    The left tokens of entity ``e`` are
+    ``left_tokens[left_offsets[e]:left_offsets[e + 1]]``, the right entities
+    of token ``t`` are ``right_entities[right_offsets[t]:right_offsets[t + 1]]``.
+    """
+
+    tokens: "pd.Index"
+    num_left: int
+    num_right: int
+    left_offsets: np.ndarray
+    left_tokens: np.ndarray
+    right_offsets: np.ndarray
+    right_entities: np.ndarray
+    gold_keys: np.ndarray
+
+    def comparisons(self) -> np.ndarray:
+        """Number of candidate pairs of each left entity before deduplication."""
+        block_sizes = np.diff(self.right_offsets)[self.left_tokens]
+        per_entity = np.zeros(self.num_left, dtype=np.int64)
+        has_tokens = np.diff(self.left_offsets) > 0
+        if len(block_sizes):
+            per_entity[has_tokens] = np.add.reduceat(
+                block_sizes, self.left_offsets[:-1][has_tokens]
+            )
+        return per_entity
+
+
+def _entity_tokens(
+    triples: np.ndarray,
+    attributes: "pd.Index",
+    literals: "pd.Index",
+    properties: List[str],
+    q: Optional[int],
+) -> Tuple[np.ndarray, np.ndarray, "pd.Series"]:
+    """Entities with the row of each of their tokens in the returned tokens."""
+    property_ids = attributes.get_indexer(properties)
+    rows = triples[np.isin(triples[:, 1], property_ids[property_ids >= 0])]
+    literal_ids = _sorted_unique(rows[:, 2].astype(np.int64))
+    parents, tokens = _literal_tokens(
+        np.asarray(literals[literal_ids], dtype=object), q
+    )
+    # tokens are grouped by literal, join them with the triples
+    position = np.zeros(len(literals), dtype=np.int64)
+    position[literal_ids] = np.arange(len(literal_ids))
+    row_literals = position[rows[:, 2]]
+    counts = np.bincount(parents, minlength=len(literal_ids))
+    first_token = np.cumsum(counts) - counts
+    row_counts = counts[row_literals]
+    entities = np.repeat(rows[:, 0].astype(np.int64), row_counts)
+    shift = first_token[row_literals] - (np.cumsum(row_counts) - row_counts)
+    token_rows = np.repeat(shift, row_counts) + np.arange(len(entities))
+    return entities, token_rows, tokens
+
+
+def build_index(
+    data,
+    properties: Optional[List[str]] = None,
+    q: Optional[int] = None,
+    max_block_comparisons: Optional[int] = 100_000,
+) -> BlockingIndex:
+    """Build the inverted index of an encoded pair.
+
+    :param data: The pair as :class:`~moviegraphbenchmark.loading.ERData` or
+        :class:`~moviegraphbenchmark.encoding.EncodedERData`.
+    :param properties: Attribute properties whose literals are blocked on.
+    :param q: Use q-grams of this length instead of word tokens.
+    :param max_block_comparisons: Drop tokens with more left times right
+        entities, which are too common to be useful (None keeps all).
+    :return: The index.
+    """
+    encoded = data if isinstance(data, EncodedERData) else data.to_encoded()
+    properties = BLOCKING_PROPERTIES if properties is None else properties
+    left_entities, left_rows, left_tokens = _entity_tokens(
+        encoded.attr_triples_1,
+        encoded.attributes_1,
+        encoded.literals_1,
+        properties,
+        q,
+    )
+    right_entities, right_rows, right_tokens = _entity_tokens(
+        encoded.attr_triples_2,
+        encoded.attributes_2,
+        encoded.literals_2,
+        properties,
+        q,
+    )
+    codes, tokens = pd.factorize(
+        pd.concat([left_tokens, right_tokens], ignore_index=True)
+    )
+    left_codes = codes[: len(left_tokens)][left_rows]
+    right_codes = codes[len(left_tokens) :][right_rows]
+    num_tokens = len(tokens)
+    num_left = len(encoded.entities_1)
+    num_right = len(encoded.entities_2)
+    # each token of an entity only once
+    left_keys = _sorted_unique(left_entities * num_tokens + left_codes)
+    right_keys = _sorted_unique(right_codes * num_right + right_entities)
+    left_entities, left_codes = left_keys // num_tokens, left_keys % num_tokens
+    right_codes, right_entities = right_keys // num_right, right_keys % num_right
+    if max_block_comparisons is not None:
+        block_comparisons = np.bincount(
+            left_codes, minlength=num_tokens
+        ) * np.bincount(right_codes, minlength=num_tokens)
+        frequent = block_comparisons > max_block_comparisons
+        logger.info(f"Dropping {frequent.sum()} of {num_tokens} frequent tokens")
+        keep = ~frequent[left_codes]
+        left_entities, left_codes = left_entities[keep], left_codes[keep]
+        keep = ~frequent[right_codes]
+        right_codes, right_entities = right_codes[keep], right_entities[keep]
+    left_offsets, left_tokens_csr = _csr(left_entities, left_codes, num_left)
+    right_offsets, right_entities_csr = _csr(right_codes, right_entities, num_tokens)
+    links = encoded.ent_links.astype(np.int64)
+    return BlockingIndex(
+        tokens=pd.Index(tokens, dtype=object),
+        num_left=num_left,
+        num_right=num_right,
+        left_offsets=left_offsets,
+        left_tokens=left_tokens_csr,
+        right_offsets=right_offsets,
+        right_entities=right_entities_csr,
+        gold_keys=_sorted_unique(links[:, 0] * num_right + links[:, 1]),
+    )
+
+
+def _batch_pairs(
+    index: BlockingIndex, start: int, end: int
+) -> Tuple[np.ndarray, int]:
+    """Unique candidate pairs of the left entities in [start, end)."""
+    first, last = index.left_offsets[start], index.left_offsets[end]
+    tokens = index.left_tokens[first:last]
+    owners = np.repeat(
+        np.arange(start, end, dtype=np.int64),
+        np.diff(index.left_offsets[start : end + 1]),
+    )
+    block_starts = index.right_offsets[tokens]
+    block_sizes = index.right_offsets[tokens + 1] - block_starts
+    lefts = np.repeat(owners, block_sizes)
+    # position of each pair in the right entities of its token
+    shift = block_starts - (np.cumsum(block_sizes) - block_sizes)
+    rights = index.right_entities[
+        np.repeat(shift, block_sizes) + np.arange(len(lefts))
+    ]
+    keys = _sorted_unique(lefts * index.num_right + rights)
+    found = int(_contains(index.gold_keys, keys).sum())
+    pairs = np.stack([keys // index.num_right, keys % index.num_right], axis=1)
+    return pairs.astype(np.int32), found
+
+
+@dataclass
+class BlockingReport:
+    num_candidates: int
+    num_gold: int
+    num_found: int
+    pair_completeness: float
+    reduction_ratio: float
+
+
+class CandidatePairs:
+    """Candidate pairs of a blocking index, produced in batches.
+
+    Iterating yields (n, 2) int32 arrays with entity ids of the left and
+    right KG of the encoded pair. Once all batches were produced,
+    :attr:`report` holds pair completeness and reduction ratio.
+
+    :param index: The blocking index.
+    :param batch_size: Approximate number of pairs per batch.
+    :param workers: Number of threads producing batches.
+    """
+
+    def __init__(
+        self, index: BlockingIndex, batch_size: int = BATCH_SIZE, workers: int = 1
+    ):
+        self.index = index
+        self.batch_size = batch_size
+        self.workers = workers
+        self.report: Optional[BlockingReport] = None
+
+    def _batches(self) -> List[Tuple[int, int]]:
+        # split the left entities by the number of pairs before deduplication
+        comparisons = np.cumsum(self.index.comparisons())
+        total = int(comparisons[-1]) if len(comparisons) else 0
+        cuts = np.searchsorted(
+            comparisons,
+            np.arange(1, total // self.batch_size + 1) * self.batch_size,
+            side="right",
+        )
+        bounds = np.unique(np.concatenate([[0], cuts, [self.index.num_left]]))
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        num_candidates = 0
+        num_found = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # numpy releases the GIL while sorting, so a few batches are
+            # produced in parallel and yielded in order
+            pending: Deque[Future] = deque()
+            for start, end in self._batches():
+                pending.append(executor.submit(_batch_pairs, self.index, start, end))
+                if len(pending) < 2 * self.workers:
+                    continue
+                pairs, found = pending.popleft().result()
+                num_candidates += len(pairs)
+                num_found += found
+                yield pairs
+            while pending:
+                pairs, found = pending.popleft().result()
+                num_candidates += len(pairs)
+                num_found += found
+                yield pairs
+        num_gold = len(self.index.gold_keys)
+        self.report = BlockingReport(
+            num_candidates=num_candidates,
+            num_gold=num_gold,
+            num_found=num_found,
+            pair_completeness=num_found / num_gold if num_gold else 0.0,
+            reduction_ratio=1
+            - num_candidates / max(self.index.num_left * self.index.num_right, 1),
+        )
+        logger.info(
+            f"{num_candidates} candidates, pair completeness "
+            f"{self.report.pair_completeness:.4f}, reduction ratio "
+            f"{self.report.reduction_ratio:.6f}"
+        )
+
+
+def block(
+    data,
+    properties: Optional[List[str]] = None,
+    q: Optional[int] = None,
+    max_block_comparisons: Optional[int] = 100_000,
+    batch_size: int = BATCH_SIZE,
+    workers: Optional[int] = None,
+) -> CandidatePairs:
+    """Candidate pairs of entities that share a token of their names or titles.
+
+    :param data: The pair as :class:`~moviegraphbenchmark.loading.ERData` or
+        :class:`~moviegraphbenchmark.encoding.EncodedERData`.
+    :param properties: Attribute properties whose literals are blocked on.
+    :param q: Use q-grams of this length instead of word tokens.
+    :param max_block_comparisons: Drop tokens with more left times right
+        entities (None keeps all).
+    :param batch_size: Approximate number of pairs per batch.
+    :param workers: Number of threads producing batches, all cores if None.
+    :return: Iterable of candidate batches with a report once exhausted.
+    """
+    index = build_index(data, properties, q, max_block_comparisons)
+    return CandidatePairs(index, batch_size, workers or os.cpu_count() or 1)
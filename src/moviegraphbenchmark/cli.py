@@ -0,0 +1,160 @@
+"""Command line interface for creating and checking the benchmark data.
+
+It is kept apart from the library, so that importing the library does
+not need click.
+"""
+import json
+import logging
+import sys
+from typing import List, Optional
+
+import click
+
+from moviegraphbenchmark import metrics
+from moviegraphbenchmark.create_graph import _create_data_path, _create_graph_data
+from moviegraphbenchmark.formats import OUTPUT_FORMATS
+from moviegraphbenchmark.manifest import verify_manifest
+
+
+@click.command
+@click.option("--data-path", default=None, help="Path where data is stored")
+@click.option(
+    "--dedup-limit",
+    default=None,
+    type=int,
+    help="Number of triples above which deduplication spills to disk",
+)
+@click.option(
+    "--keep-compressed",
+    is_flag=True,
+    help="Only keep the compressed IMDB dumps and parse them directly",
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of processes used to parse the IMDB dumps",
+)
+@click.option(
+    "--engine",
+    default="row",
+    type=click.Choice(["row", "columnar"]),
+    help="Parse the IMDB dumps row by row or vectorized with pandas",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Always parse the full IMDB dumps instead of a cache of the relevant rows",
+)
+@click.option(
+    "--remove-dumps",
+    is_flag=True,
+    help="Remove the IMDB dumps once the cache of the relevant rows was created",
+)
+@click.option(
+    "--archive-dir",
+    default=None,
+    type=click.Path(file_okay=False),
+    help="Keep the release archive of the repository in this directory and reuse it",
+)
+@click.option(
+    "--output-format",
+    default=None,
+    type=click.Choice(OUTPUT_FORMATS),
+    help="Format of the IMDB graph files, by default tsv or that of the existing graph",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Only check the created data against the checksums of the manifest",
+)
+@click.option(
+    "--rebuild-clusters",
+    is_flag=True,
+    help="Only rebuild the cluster files from the links and list missing links",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print wall and CPU time, I/O, rows and peak memory of every stage",
+)
+@click.option(
+    "--metrics-json",
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the metrics of every stage to this JSON file",
+)
+def create_graph_data(
+    data_path: Optional[str] = None,
+    dedup_limit: Optional[int] = None,
+    keep_compressed: bool = False,
+    workers: int = 1,
+    engine: str = "row",
+    no_cache: bool = False,
+    remove_dumps: bool = False,
+    archive_dir: Optional[str] = None,
+    output_format: Optional[str] = None,
+    verify: bool = False,
+    rebuild_clusters: bool = False,
+    profile: bool = False,
+    metrics_json: Optional[str] = None,
+):
+    """(Download and) create benchmark data on specified path.
+
+    :param data_path: Path where data should be stored.
+    :param dedup_limit: Number of triples above which deduplication spills to disk.
+    :param keep_compressed: Only keep the compressed IMDB dumps and parse them directly.
+    :param workers: Number of processes used to parse the IMDB dumps.
+    :param engine: Either "row" or the vectorized "columnar" engine for parsing.
+    :param no_cache: Always parse the full IMDB dumps.
+    :param remove_dumps: Remove the IMDB dumps once the cache was created.
+    :param archive_dir: Keep and reuse the release archive in this directory.
+    :param output_format: Format of the IMDB graph files.
+    :param verify: Only check the created data against the manifest.
+    :param rebuild_clusters: Only rebuild the cluster files from the links.
+    :param profile: Print the metrics of every stage.
+    :param metrics_json: Write the metrics of every stage to this file.
+    """
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+    if rebuild_clusters:
+        from moviegraphbenchmark import clustering
+
+        if data_path is None:
+            data_path, _ = _create_data_path()
+        missing = clustering.rebuild_clusters(data_path)
+        for group, pairs in missing.items():
+            for left, right in pairs.itertuples(index=False):
+                click.echo(f"{group}\t{left}\t{right}")
+        return
+    if verify:
+        if data_path is None:
+            data_path, _ = _create_data_path()
+        problems = verify_manifest(data_path)
+        for problem in problems:
+            click.echo(problem, err=True)
+        if problems:
+            sys.exit(1)
+        click.echo(f"All files in {data_path} are intact")
+        return
+    collected: List[metrics.StageMetrics] = []
+    _create_graph_data(
+        data_path,
+        dedup_limit=dedup_limit,
+        keep_compressed=keep_compressed,
+        workers=workers,
+        engine=engine,
+        use_cache=not no_cache,
+        remove_dumps=remove_dumps,
+        on_metrics=collected.append if profile or metrics_json else None,
+        archive_dir=archive_dir,
+        output_format=output_format,
+    )
+    if profile:
+        click.echo(metrics.format_table(collected), err=True)
+    if metrics_json is not None:
+        with open(metrics_json, "w", encoding="utf8") as out_file:
+            json.dump([m.to_dict() for m in collected], out_file, indent=2)
+
+
+if __name__ == "__main__":
+    create_graph_data()
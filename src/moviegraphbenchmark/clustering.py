@@ -0,0 +1,246 @@
+"""Clusters as connected components of the entity links.
+
+The ``cluster`` files of the pairs and ``multi_source_cluster`` are the
+connected components of the graph formed by the ``ent_links`` and the
+``*_intra_ent_links`` of the involved datasets. All link files are
+integer encoded once and the components are found with a union-find
+that works on whole arrays, so rebuilding the clusters after editing the
+links takes seconds even for millions of links.
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from moviegraphbenchmark.create_graph import _create_data_path, _github_outputs
+from moviegraphbenchmark.loading import _read
+from moviegraphbenchmark.manifest import load_manifest, record_stage, save_manifest
+from moviegraphbenchmark.multi_source import DATASETS, ClusterIndex, read_clusters
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+PAIRS = ["imdb-tmdb", "imdb-tvdb", "tmdb-tvdb"]
+MULTI_SOURCE = "multi_source"
+
+
+def connected_components(
+    left: np.ndarray, right: np.ndarray, num_nodes: int
+) -> np.ndarray:
+    """Root of the component of every node, which is its smallest node id.
+
+    Each round hooks every root onto the smallest root it is linked with
+    and then compresses all paths by pointer jumping, until no link
+    connects two different roots.
+
+    :param left: Node ids of one side of the links.
+    :param right: Node ids of the other side of the links.
+    :param num_nodes: Number of nodes, ids are in ``range(num_nodes)``.
+    :return: Array with the root of each node.
+    """
+    parent = np.arange(num_nodes, dtype=np.int64)
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    while len(left):
+        root_left = parent[left]
+        root_right = parent[right]
+        # links within a component stay that way, so they can be dropped
+        crossing = root_left != root_right
+        if not crossing.any():
+            break
+        left, right = left[crossing], right[crossing]
+        root_left, root_right = root_left[crossing], root_right[crossing]
+        np.minimum.at(
+            parent,
+            np.maximum(root_left, root_right),
+            np.minimum(root_left, root_right),
+        )
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def _encode_links(
+    links: List["pd.DataFrame"],
+) -> Tuple["pd.Index", List[np.ndarray]]:
+    left = [frame.iloc[:, 0] for frame in links]
+    right = [frame.iloc[:, 1] for frame in links]
+    codes, vocabulary = pd.factorize(
+        pd.concat(left + right, ignore_index=True), use_na_sentinel=False
+    )
+    sizes = [len(frame) for frame in links]
+    bounds = np.cumsum([0] + sizes)
+    half = bounds[-1]
+    encoded = [
+        np.stack([codes[start:end], codes[half + start : half + end]], axis=1)
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+    return pd.Index(vocabulary, dtype=object), encoded
+
+
+def _cluster_encoded(
+    vocabulary: "pd.Index", links: np.ndarray
+) -> Tuple[ClusterIndex, np.ndarray]:
+    """Clusters of encoded links and the links as ids of the cluster index."""
+    nodes, inverse = np.unique(links.ravel(), return_inverse=True)
+    local = inverse.reshape(links.shape)
+    roots = connected_components(local[:, 0], local[:, 1], len(nodes))
+    # clusters are numbered in order of their first entity
+    _, entity_cluster = np.unique(roots, return_inverse=True)
+    return ClusterIndex(vocabulary[nodes], entity_cluster), local
+
+
+def _missing_encoded(clusters: ClusterIndex, links: np.ndarray) -> "pd.DataFrame":
+    num_entities = len(clusters.entities)
+    implied = clusters.pairs().astype(np.int64)
+    # undirected pairs as single integers
+    implied_sorted = np.sort(implied, axis=1)
+    implied_keys = implied_sorted[:, 0] * num_entities + implied_sorted[:, 1]
+    linked = np.sort(links, axis=1).astype(np.int64)
+    linked_keys = linked[:, 0] * num_entities + linked[:, 1]
+    missing = implied[~np.isin(implied_keys, linked_keys)]
+    # the entity of the first dataset is on the left like in the link files
+    sources = clusters.entity_source[missing]
+    swap = (sources[:, 0] > sources[:, 1]) | (
+        (sources[:, 0] == sources[:, 1]) & (missing[:, 0] > missing[:, 1])
+    )
+    missing[swap] = missing[swap][:, ::-1]
+    return pd.DataFrame(
+        {
+            "left": clusters.entities[missing[:, 0]],
+            "right": clusters.entities[missing[:, 1]],
+        }
+    )
+
+
+def link_clusters(links: List["pd.DataFrame"]) -> ClusterIndex:
+    """Clusters of the connected components of entity links.
+
+    :param links: Frames with the linked entity URIs in the first two columns.
+    :return: The clusters, numbered in order of their first entity.
+    """
+    vocabulary, encoded = _encode_links(links)
+    clusters, _ = _cluster_encoded(vocabulary, np.concatenate(encoded))
+    return clusters
+
+
+def missing_links(
+    clusters: ClusterIndex, links: List["pd.DataFrame"]
+) -> "pd.DataFrame":
+    """Pairs of entities that are in the same cluster but not linked.
+
+    :param clusters: Clusters, e.g. from :func:`link_clusters`.
+    :param links: Frames with the linked entity URIs in the first two columns.
+    :return: Frame with the URIs of the missing pairs in "left" and "right".
+    """
+    left = pd.concat([frame.iloc[:, 0] for frame in links], ignore_index=True)
+    right = pd.concat([frame.iloc[:, 1] for frame in links], ignore_index=True)
+    encoded = np.stack(
+        [clusters.entities.get_indexer(left), clusters.entities.get_indexer(right)],
+        axis=1,
+    )
+    return _missing_encoded(clusters, encoded[(encoded >= 0).all(axis=1)])
+
+
+def write_clusters(clusters: ClusterIndex, path: str):
+    """Write clusters with one comma separated cluster per line."""
+    members = clusters.entities[clusters.members]
+    lines = [
+        ",".join(members[start:end])
+        for start, end in zip(clusters.offsets[:-1], clusters.offsets[1:])
+    ]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf8") as out_file:
+        out_file.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def same_clusters(first: ClusterIndex, second: ClusterIndex) -> bool:
+    """Whether both group the same entities the same way, ignoring order."""
+    if len(first) != len(second) or len(first.entities) != len(second.entities):
+        return False
+    clusters = second.clusters_of(first.entities)
+    if (clusters < 0).any():
+        return False
+    # each cluster of first has to map to exactly one cluster of second
+    mapping = np.unique(np.stack([first.entity_cluster, clusters], axis=1), axis=0)
+    return len(mapping) == len(first)
+
+
+def rebuild_clusters(
+    data_path: Optional[str] = None, write: bool = True
+) -> Dict[str, "pd.DataFrame"]:
+    """Rebuild the cluster files from the entity links.
+
+    The ``cluster`` file of each pair contains the components of its
+    ``ent_links`` and the intra links of both datasets, and
+    ``multi_source_cluster`` those of all link files. Files are only
+    replaced if the clusters changed, in which case the checksums in the
+    manifest are updated as well.
+
+    :param data_path: Path where the data is stored.
+    :param write: Replace changed cluster files, otherwise only report.
+    :return: Implied but missing links for each pair and "multi_source".
+    """
+    if data_path is None:
+        data_path, _ = _create_data_path()
+    data_path = str(data_path)
+    names = [f"{dataset}_intra_ent_links" for dataset in DATASETS] + [
+        os.path.join(pair, "ent_links") for pair in PAIRS
+    ]
+    vocabulary, encoded = _encode_links(
+        [_read(os.path.join(data_path, name), ["left", "right"]) for name in names]
+    )
+    encoded = dict(zip(names, encoded))
+    groups = {
+        pair: [
+            os.path.join(pair, "ent_links"),
+            f"{pair.split('-')[0]}_intra_ent_links",
+            f"{pair.split('-')[1]}_intra_ent_links",
+        ]
+        for pair in PAIRS
+    }
+    groups[MULTI_SOURCE] = names
+    missing = {}
+    changed = False
+    for group, group_names in groups.items():
+        clusters, links = _cluster_encoded(
+            vocabulary, np.concatenate([encoded[name] for name in group_names])
+        )
+        missing[group] = _missing_encoded(clusters, links)
+        if missing[group].empty:
+            logger.info(f"{group}: {len(clusters)} clusters")
+        else:
+            logger.warning(
+                f"{group}: {len(clusters)} clusters, "
+                f"{len(missing[group])} implied links are missing"
+            )
+        if group == MULTI_SOURCE:
+            path = os.path.join(data_path, "multi_source_cluster")
+        else:
+            path = os.path.join(data_path, group, "cluster")
+        if write and not (
+            os.path.isfile(path) and same_clusters(clusters, read_clusters(path))
+        ):
+            logger.info(f"Writing changed clusters to {path}")
+            write_clusters(clusters, path)
+            changed = True
+    manifest = load_manifest(data_path)
+    if changed and "github" in manifest["stages"]:
+        record_stage(
+            manifest,
+            "github",
+            manifest["stages"]["github"]["inputs"],
+            data_path,
+            _github_outputs(data_path),
+        )
+        save_manifest(data_path, manifest)
+    return missing
@@ -0,0 +1,425 @@
+"""Vectorized alternative to the row-wise IMDB handlers in create_graph.
+
+The dumps are read in batches of rows and every column is turned into
+triples with pandas column operations. The result (including the order
+of the triples) is the same as the one of the row engine.
+"""
+import ast
+import csv
+import io
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from moviegraphbenchmark import metrics
+from moviegraphbenchmark.create_graph import (
+    ATTR,
+    BENCHMARK_RESOURCE_PREFIX,
+    DTYPE_DATE,
+    DTYPE_NON_NEG_INT,
+    FILM_TYPE,
+    PERSON_TYPE,
+    REL,
+    TV_EPISODE_TYPE,
+    TV_SHOW_TYPE,
+    property_dict,
+)
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for the columnar engine: pip install pandas")
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    # the slower pandas parser is used instead
+    pa_csv = None
+
+# rows per batch when parsing with pandas
+BATCH_SIZE = 1_000_000
+# bytes per batch when parsing with pyarrow
+BLOCK_SIZE = 64 * 1024 * 1024
+
+_FILM_TITLE_TYPES = ["movie", "short", "tvMovie", "tvShort"]
+
+
+class _ByteRangeReader(io.RawIOBase):
+    """Raw binary stream over a byte range of a file."""
+
+    def __init__(self, path: str, byte_range: Tuple[int, int]):
+        start, end = byte_range
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self._remaining)
+        if n <= 0:
+            return 0
+        read = self._file.readinto(memoryview(b)[:n])
+        self._remaining -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _source(path: str, byte_range: Optional[Tuple[int, int]] = None):
+    if byte_range is None:
+        return path
+    return io.BufferedReader(_ByteRangeReader(path, byte_range))
+
+
+def _read_batches_pyarrow(
+    path: str,
+    num_columns: int,
+    exclusion: str,
+    allowed: Set[str],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator["pd.DataFrame"]:
+    source = _source(path, byte_range)
+    if isinstance(source, str) and source.endswith(".gz"):
+        source = pa.input_stream(source, compression="gzip")
+    column_names = [str(i) for i in range(num_columns)]
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            column_names=column_names, block_size=BLOCK_SIZE
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter="\t", quote_char=False),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in column_names},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    allowed_array = pa.array(list(allowed), type=pa.string())
+    offset = 0
+    try:
+        for record_batch in reader:
+            metrics.add_rows(record_batch.num_rows)
+            # the row engine strips the whole line
+            first = pc.utf8_ltrim_whitespace(record_batch.column(0))
+            mask = pc.and_(
+                pc.not_equal(first, exclusion),
+                pc.is_in(first, value_set=allowed_array),
+            ).to_numpy(zero_copy_only=False)
+            rows = np.flatnonzero(mask)
+            if len(rows) > 0:
+                batch = pd.DataFrame(
+                    {
+                        i: record_batch.column(i)
+                        .take(pa.array(rows))
+                        .to_numpy(zero_copy_only=False)
+                        .astype(object)
+                        for i in range(num_columns)
+                    },
+                    index=rows + offset,
+                    dtype=object,
+                )
+                batch[0] = batch[0].str.lstrip()
+                batch[num_columns - 1] = batch[num_columns - 1].str.rstrip()
+                yield batch
+            offset += record_batch.num_rows
+    finally:
+        reader.close()
+        if not isinstance(source, str):
+            source.close()
+
+
+def _read_batches_pandas(
+    path: str,
+    num_columns: int,
+    exclusion: str,
+    allowed: Set[str],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator["pd.DataFrame"]:
+    source = _source(path, byte_range)
+    allowed_idx = pd.Index(list(allowed), dtype=object)
+    reader = pd.read_csv(
+        source,
+        sep="\t",
+        header=None,
+        names=list(range(num_columns)),
+        dtype=object,
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+        na_filter=False,
+        encoding="utf8",
+        chunksize=BATCH_SIZE,
+    )
+    try:
+        for batch in reader:
+            metrics.add_rows(len(batch))
+            # the row engine strips the whole line
+            batch[0] = batch[0].str.lstrip()
+            batch[num_columns - 1] = batch[num_columns - 1].str.rstrip()
+            batch = batch[(batch[0] != exclusion) & batch[0].isin(allowed_idx)]
+            if not batch.empty:
+                yield batch
+    finally:
+        reader.close()
+        if not isinstance(source, str):
+            source.close()
+
+
+def _read_batches(
+    path: str,
+    num_columns: int,
+    exclusion: str,
+    allowed: Set[str],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator["pd.DataFrame"]:
+    """Read batches of rows whose first column is allowed.
+
+    The batches are indexed by the row number and hold python strings.
+    """
+    if pa_csv is not None:
+        return _read_batches_pyarrow(path, num_columns, exclusion, allowed, byte_range)
+    return _read_batches_pandas(path, num_columns, exclusion, allowed, byte_range)
+
+
+def _is_id(values: "pd.Series") -> "pd.Series":
+    return values.str.startswith("nm") | values.str.startswith("tt")
+
+
+def _prefix_ids(values: "pd.Series") -> "pd.Series":
+    return values.where(~_is_id(values), BENCHMARK_RESOURCE_PREFIX + values)
+
+
+def _should_write(
+    s: "pd.Series", o: "pd.Series", allowed: "pd.Index", exclude: "pd.Index"
+) -> "pd.Series":
+    s_id = _is_id(s)
+    o_id = _is_id(o)
+    s_allowed = s.isin(allowed)
+    o_allowed = o.isin(allowed)
+    excluded = (s + "\t" + o).isin(exclude)
+    return (
+        (s_id & o_id & ~excluded & s_allowed & o_allowed)
+        | (s_id & ~o_id & s_allowed)
+        | (~s_id & o_id & o_allowed)
+    )
+
+
+def _title_type(o: "pd.Series") -> "pd.Series":
+    film = o.isin(_FILM_TITLE_TYPES) | o.str.contains("video", regex=False)
+    episode = o == "tvEpisode"
+    return pd.Series(
+        np.select([film, episode], [FILM_TYPE, TV_EPISODE_TYPE], TV_SHOW_TYPE),
+        index=o.index,
+        dtype=o.dtype,
+    )
+
+
+def _explode(o: "pd.Series") -> Tuple["pd.Series", "pd.Series"]:
+    is_list = o.str.startswith("[")
+    if is_list.any():
+        lists = o[is_list].map(ast.literal_eval).explode().dropna().astype(o.dtype)
+        objs = pd.concat([o[~is_list], lists]).sort_index(kind="stable")
+    else:
+        objs = o
+    return objs, objs.groupby(level=0).cumcount()
+
+
+def column_trips(
+    s: "pd.Series",
+    p: str,
+    o: "pd.Series",
+    multiple_possible: bool,
+    allowed: "pd.Index",
+    exclude: "pd.Index",
+    dtype: Optional[str] = None,
+) -> "pd.DataFrame":
+    """Vectorized version of :func:`moviegraphbenchmark.create_graph.create_trips`.
+
+    :return: Frame with the triples in columns s, p, o and the position of
+        o in a multi-valued cell in column sub, indexed by row.
+    """
+    keep = (s != "") & (o != "")
+    s, o = s[keep], o[keep]
+    if p == "titleType":
+        o = _title_type(o)
+        p = property_dict["type"]
+    else:
+        p = property_dict[p]
+    keep = (s != "\\N") & (o != "\\N")
+    s, o = s[keep], o[keep]
+    if "Year" in p:
+        o = o + "-01-01"
+    if multiple_possible:
+        o, sub = _explode(o)
+        s = s.reindex(o.index)
+        first_ok = _should_write(s, o, allowed, exclude)
+        # once a triple of a row was written, its subject is prefixed, which
+        # changes the outcome of _should_write for the remaining objects
+        written_before = (
+            first_ok.astype(int).groupby(level=0).cumsum() - first_ok.astype(int)
+        ) > 0
+        later_ok = _is_id(o) & o.isin(allowed)
+        write = first_ok.where(~(written_before & _is_id(s)), later_ok)
+    else:
+        sub = pd.Series(0, index=o.index)
+        write = _should_write(s, o, allowed, exclude)
+    s, o, sub = s[write], o[write], sub[write]
+    o = _prefix_ids(o)
+    if dtype is not None:
+        o = '"' + o + '"^^' + dtype
+    return pd.DataFrame({"s": _prefix_ids(s), "p": p, "o": o, "sub": sub})
+
+
+def _to_trips(
+    target: str, slot_frames: List["pd.DataFrame"]
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    trips = pd.concat(
+        [
+            frame.assign(row=frame.index, slot=slot)
+            for slot, frame in enumerate(slot_frames)
+        ],
+        ignore_index=True,
+    )
+    # restore the row-wise order of the row engine
+    trips = trips.sort_values(["row", "slot", "sub"], kind="stable")
+    for t in zip(trips["s"].tolist(), trips["p"].tolist(), trips["o"].tolist()):
+        yield target, t
+
+
+def _index(allowed: Set[str], exclude: Set[Tuple[str, str]]):
+    return (
+        pd.Index(list(allowed), dtype=object),
+        pd.Index(["\t".join(e) for e in exclude], dtype=object),
+    )
+
+
+def handle_name_basics(
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    allowed_idx, exclude_idx = _index(allowed, exclude)
+    for batch in _read_batches(path, 6, "nconst", allowed, byte_range):
+        s = batch[0]
+        yield from _to_trips(
+            ATTR,
+            [
+                column_trips(s, p, batch[col], multiple, allowed_idx, exclude_idx)
+                for p, col, multiple in [
+                    ("primaryName", 1, False),
+                    ("birthYear", 2, False),
+                    ("deathYear", 3, False),
+                    ("primaryProfession", 4, True),
+                ]
+            ],
+        )
+        person = pd.DataFrame(
+            {
+                "s": BENCHMARK_RESOURCE_PREFIX + s,
+                "p": property_dict["type"],
+                "o": PERSON_TYPE,
+                "sub": 0,
+            }
+        )
+        yield from _to_trips(
+            REL,
+            [
+                column_trips(
+                    s, "knownForTitles", batch[5], True, allowed_idx, exclude_idx
+                ),
+                person,
+            ],
+        )
+
+
+def handle_title_basics(
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    allowed_idx, exclude_idx = _index(allowed, exclude)
+    for batch in _read_batches(path, 9, "tconst", allowed, byte_range):
+        s = batch[0]
+        yield from _to_trips(
+            REL,
+            [column_trips(s, "titleType", batch[1], False, allowed_idx, exclude_idx)],
+        )
+        yield from _to_trips(
+            ATTR,
+            [
+                column_trips(s, p, batch[col], False, allowed_idx, exclude_idx, dtype)
+                for p, col, dtype in [
+                    ("primaryTitle", 2, None),
+                    ("originalTitle", 3, None),
+                    ("isAdult", 4, None),
+                    ("startYear", 5, DTYPE_DATE),
+                    ("endYear", 6, DTYPE_DATE),
+                    ("runtimeMinutes", 7, None),
+                    ("genres", 8, None),
+                ]
+            ],
+        )
+
+
+def handle_title_episode(
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    allowed_idx, exclude_idx = _index(allowed, exclude)
+    for batch in _read_batches(path, 4, "tconst", allowed, byte_range):
+        s = batch[0]
+        episode = pd.Series("tvEpisode", index=s.index, dtype=s.dtype)
+        yield from _to_trips(
+            REL,
+            [
+                column_trips(s, "episodeOf", batch[1], False, allowed_idx, exclude_idx),
+                column_trips(s, "titleType", episode, False, allowed_idx, exclude_idx),
+            ],
+        )
+        yield from _to_trips(
+            ATTR,
+            [
+                column_trips(
+                    s, p, batch[col], False, allowed_idx, exclude_idx, DTYPE_NON_NEG_INT
+                )
+                for p, col in [("seasonNumber", 2), ("episodeNumber", 3)]
+            ],
+        )
+
+
+def handle_title_principals(
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    allowed_idx, exclude_idx = _index(allowed, exclude)
+    for batch in _read_batches(path, 6, "tconst", allowed, byte_range):
+        yield from _to_trips(
+            REL,
+            [
+                column_trips(
+                    batch[2], "participatedIn", batch[0], False, allowed_idx, exclude_idx
+                )
+            ],
+        )
+
+
+file_handler_dict: Dict[str, Callable] = {
+    "name.basics.tsv": handle_name_basics,
+    "title.basics.tsv": handle_title_basics,
+    "title.episode.tsv": handle_title_episode,
+    "title.principals.tsv": handle_title_principals,
+}
@@ -0,0 +1,106 @@
+"""Memory compact representation of the loaded frames.
+
+Nearly all entity URIs start with one of a few prefixes, so an entity
+column ``head`` is stored as categorical ``head_prefix`` and the local
+id as (Arrow backed) string ``head``. Relations are categoricals and
+literals Arrow backed strings. :func:`expand_uris` gives back the frame
+with full URIs.
+"""
+import logging
+from typing import Iterable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    # the URIs are split with pandas instead
+    pa = None
+
+PREFIX_SUFFIX = "_prefix"
+# everything up to the last "/" or "#" is the prefix
+_URI_PATTERN = r"^(.*[/#])?([^/#]*)$"
+
+
+def _split_uris(values: "pd.Series") -> Tuple["pd.Series", "pd.Series"]:
+    if pa is None:
+        parts = values.astype(object).str.extract(_URI_PATTERN)
+        return (
+            parts[0].fillna("").astype("category"),
+            parts[1].astype(pd.StringDtype()),
+        )
+    # split without creating Python strings
+    parts = pc.extract_regex(
+        pa.array(values, type=pa.string(), from_pandas=True),
+        r"^(?P<prefix>.*[/#])?(?P<local>[^/#]*)$",
+    )
+    prefix = pc.fill_null(pc.struct_field(parts, "prefix"), "").dictionary_encode()
+    local = pd.arrays.ArrowStringArray(pc.struct_field(parts, "local"))
+    return (
+        pd.Series(prefix.to_pandas(), index=values.index),
+        pd.Series(local, index=values.index),
+    )
+
+
+def compact_frame(
+    df: "pd.DataFrame",
+    entity_columns: Iterable[str] = (),
+    category_columns: Iterable[str] = (),
+) -> "pd.DataFrame":
+    """Split entity columns into prefix and local id and compress the others.
+
+    :param df: Frame as loaded by ``load_data``.
+    :param entity_columns: Columns containing URIs that are split.
+    :param category_columns: Columns with few distinct values.
+    :return: Frame where every entity column ``c`` is replaced by the
+        categorical ``c_prefix`` and the local id ``c``; all other
+        columns that are not categoricals are Arrow backed strings.
+    """
+    entity_columns = set(entity_columns)
+    category_columns = set(category_columns)
+    string_dtype = pd.StringDtype() if pa is None else pd.StringDtype("pyarrow")
+    columns = {}
+    for column in df.columns:
+        if column in entity_columns:
+            columns[column + PREFIX_SUFFIX], columns[column] = _split_uris(df[column])
+        elif column in category_columns:
+            columns[column] = df[column].astype("category")
+        else:
+            columns[column] = df[column].astype(string_dtype)
+    return pd.DataFrame(columns)
+
+
+def is_compact(df: "pd.DataFrame") -> bool:
+    return any(str(column).endswith(PREFIX_SUFFIX) for column in df.columns)
+
+
+def expand_uris(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Join prefixes and local ids of a compact frame back into full URIs.
+
+    :param df: Frame created by :func:`compact_frame`.
+    :return: Frame with the columns and string values of the original frame.
+    """
+    if not is_compact(df):
+        return df
+    columns = {}
+    for column in df.columns:
+        if column.endswith(PREFIX_SUFFIX):
+            continue
+        values = df[column].astype(object)
+        prefix_column = column + PREFIX_SUFFIX
+        if prefix_column in df.columns:
+            values = df[prefix_column].astype(object) + values
+        # missing values are pd.NA for pandas < 3, but nan when reading, and
+        # converting a Series (not an array) to str would turn nan into "nan"
+        values = values.where(values.notna(), np.nan).to_numpy(dtype=object)
+        # same dtype as when reading with dtype=str
+        columns[column] = pd.Series(values, index=df.index, dtype=str)
+    return pd.DataFrame(columns)
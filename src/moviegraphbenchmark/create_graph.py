@@ -1,11 +1,45 @@
 import ast
+import contextlib
+import heapq
+import itertools
 import logging
 import os
-from typing import List, Set, Tuple, Optional
+import re
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    IO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Optional,
+)
 
-import click
-
-from moviegraphbenchmark.get_imdb_data import download_if_needed
+from moviegraphbenchmark import metrics
+from moviegraphbenchmark.formats import TripleWriter
+from moviegraphbenchmark.get_imdb_data import (
+    download_if_needed,
+    imdb_file_path,
+    open_tsv,
+    uris,
+)
+from moviegraphbenchmark.manifest import (
+    MANIFEST_NAME,
+    load_manifest,
+    record_stage,
+    save_manifest,
+    sha256_file,
+    stage_is_current,
+)
 from moviegraphbenchmark.utils import download_github_folder
 import moviegraphbenchmark
 
@@ -42,6 +76,10 @@ TV_EPISODE_TYPE = "http://dbpedia.org/ontology/TelevisionEpisode"
 TV_SHOW_TYPE = "http://dbpedia.org/ontology/TelevisionShow"
 PERSON_TYPE = "http://xmlns.com/foaf/0.1/Person"
 
+# handlers tag every triple with the file it belongs to
+ATTR = "attr"
+REL = "rel"
+
 logger = logging.getLogger("moviegraphbenchmark")
 
 
@@ -58,13 +96,55 @@ def get_excluded(path: str) -> Set[Tuple[str, str]]:
         }
 
 
-def _read_row_tuples(path: str, exclusion: str, allowed: Set[str]):
-    with open(path, "r", encoding="utf8") as in_file:
-        for line in in_file:
-            if not line.startswith(exclusion):
-                row = line.strip().split("\t")
-                if row[0] in allowed:
-                    yield row
+def _filter_rows(lines: Iterable[str], exclusion: str, allowed: Set[str]):
+    for line in lines:
+        if not line.startswith(exclusion):
+            row = line.strip().split("\t")
+            if row[0] in allowed:
+                yield row
+
+
+def _read_lines_in_range(path: str, byte_range: Tuple[int, int]) -> Iterator[str]:
+    start, end = byte_range
+    with open(path, "rb") as in_file:
+        in_file.seek(start)
+        pos = start
+        while pos < end:
+            line = in_file.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode("utf8")
+
+
+def _read_row_tuples(
+    path: str,
+    exclusion: str,
+    allowed: Set[str],
+    byte_range: Optional[Tuple[int, int]] = None,
+):
+    if byte_range is None:
+        with open_tsv(path) as in_file:
+            yield from _filter_rows(metrics.count_rows(in_file), exclusion, allowed)
+    else:
+        yield from _filter_rows(
+            metrics.count_rows(_read_lines_in_range(path, byte_range)),
+            exclusion,
+            allowed,
+        )
+
+
+def _line_aligned_chunks(path: str, num_chunks: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that start at the beginning of a line."""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as in_file:
+        for i in range(1, num_chunks):
+            in_file.seek(max(size * i // num_chunks, boundaries[-1]))
+            in_file.readline()
+            boundaries.append(min(in_file.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
 
 
 def _should_write(
@@ -120,12 +200,7 @@ def create_trips(
     if not (_sanity_check(s) and _sanity_check(p) and _sanity_check(o)):
         return []
     if p == "titleType":
-        if o in {"movie", "short", "tvMovie", "tvShort"} or "video" in o:
-            o = FILM_TYPE
-        elif o == "tvEpisode":
-            o = TV_EPISODE_TYPE
-        else:
-            o = TV_SHOW_TYPE
+        o = _title_type(o)
         p = property_dict["type"]
     else:
         try:
@@ -160,204 +235,644 @@ def create_trips(
     return trips
 
 
-def handle_name_basics(
-    path: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
-) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    attr_trips = []
-    rel_trips = []
-    for row in _read_row_tuples(path, exclusion="nconst\t", allowed=allowed):
-        for p, o, multiple_possible in [
-            ("primaryName", row[1], False),
-            ("birthYear", row[2], False),
-            ("deathYear", row[3], False),
-            ("primaryProfession", row[4], True),
-        ]:
-            attr_trips.extend(
-                create_trips(
-                    s=row[0],
-                    p=p,
-                    o=o,
-                    multiple_possible=multiple_possible,
-                    allowed=allowed,
-                    exclude=exclude,
-                )
-            )
-        rel_trips.extend(
-            create_trips(
-                s=row[0],
-                p="knownForTitles",
-                o=row[5],
-                multiple_possible=True,
-                allowed=allowed,
-                exclude=exclude,
-            )
-        )
-        rel_trips.append(
-            (
-                BENCHMARK_RESOURCE_PREFIX + row[0],
-                property_dict["type"],
-                PERSON_TYPE,
-            )
-        )
-    return attr_trips, rel_trips
+@dataclass(frozen=True)
+class ColumnMapping:
+    """How the cells of a column of an IMDB dump become triples.
 
+    :param prop: Key of the property in :data:`property_dict`.
+    :param column: Index of the column of the objects, None to use ``value``.
+    :param target: Whether the triples are attribute (ATTR) or relation (REL) triples.
+    :param dtype: Datatype the objects are tagged with.
+    :param multiple: If the cells can hold a list of objects like ``['a', 'b']``.
+    :param year: Turn years into dates by appending ``-01-01``.
+    :param subject: Index of the column of the subjects.
+    :param value: Object used for every row instead of a column.
+    :param transform: Maps the raw cell to the object, e.g. a title type to its class.
+    :param checked: If False the triple is emitted for every row without
+        checking subject and object against the allowed and excluded ids.
+    """
 
-def handle_title_basics(
-    path: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
-) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    attr_trips = []
-    rel_trips = []
-    for row in _read_row_tuples(path, exclusion="tconst\t", allowed=allowed):
-        rel_trips.extend(
-            create_trips(
-                s=row[0],
-                p="titleType",
-                o=row[1],
-                multiple_possible=False,
-                allowed=allowed,
-                exclude=exclude,
-            )
+    prop: str
+    column: Optional[int] = None
+    target: str = ATTR
+    dtype: Optional[str] = None
+    multiple: bool = False
+    year: bool = False
+    subject: int = 0
+    value: Optional[str] = None
+    transform: Optional[Callable[[str], str]] = None
+    checked: bool = True
+
+
+@dataclass(frozen=True)
+class FileMapping:
+    """Columns of an IMDB dump and the triples they become, in output order.
+
+    :param header: Name of the first column, which marks the header line.
+    :param columns: Mappings of the columns.
+    """
+
+    header: str
+    columns: Tuple[ColumnMapping, ...]
+
+
+def _title_type(title_type: str) -> str:
+    if title_type in {"movie", "short", "tvMovie", "tvShort"} or "video" in title_type:
+        return FILM_TYPE
+    if title_type == "tvEpisode":
+        return TV_EPISODE_TYPE
+    return TV_SHOW_TYPE
+
+
+# adding a file of the IMDB dumps only needs an entry here (and its url)
+FILE_MAPPINGS: Dict[str, FileMapping] = {
+    "name.basics.tsv": FileMapping(
+        "nconst",
+        (
+            ColumnMapping("primaryName", 1),
+            ColumnMapping("birthYear", 2, year=True),
+            ColumnMapping("deathYear", 3, year=True),
+            ColumnMapping("primaryProfession", 4, multiple=True),
+            ColumnMapping("knownForTitles", 5, REL, multiple=True),
+            ColumnMapping("type", target=REL, value=PERSON_TYPE, checked=False),
+        ),
+    ),
+    "title.basics.tsv": FileMapping(
+        "tconst",
+        (
+            ColumnMapping("type", 1, REL, transform=_title_type),
+            ColumnMapping("primaryTitle", 2),
+            ColumnMapping("originalTitle", 3),
+            ColumnMapping("isAdult", 4),
+            ColumnMapping("startYear", 5, dtype=DTYPE_DATE, year=True),
+            ColumnMapping("endYear", 6, dtype=DTYPE_DATE, year=True),
+            ColumnMapping("runtimeMinutes", 7),
+            ColumnMapping("genres", 8),
+        ),
+    ),
+    "title.crew.tsv": FileMapping(
+        "tconst",
+        (
+            ColumnMapping("participatedIn", 1, REL, multiple=True),
+            ColumnMapping("participatedIn", 2, REL, multiple=True),
+        ),
+    ),
+    "title.episode.tsv": FileMapping(
+        "tconst",
+        (
+            ColumnMapping("episodeOf", 1, REL),
+            ColumnMapping("type", target=REL, value="tvEpisode", transform=_title_type),
+            ColumnMapping("seasonNumber", 2, dtype=DTYPE_NON_NEG_INT),
+            ColumnMapping("episodeNumber", 3, dtype=DTYPE_NON_NEG_INT),
+        ),
+    ),
+    "title.principals.tsv": FileMapping(
+        "tconst", (ColumnMapping("participatedIn", 0, REL, subject=2),)
+    ),
+}
+
+_ID_PREFIXES = ("nm", "tt")
+# a list of plain strings as written by str(list)
+_SIMPLE_LIST = re.compile(r"\['[^'\\]*'(?:, '[^'\\]*')*\]")
+
+
+def _parse_list(value: str) -> List[str]:
+    """Same as ast.literal_eval for a list of strings, but faster for plain ones."""
+    if _SIMPLE_LIST.fullmatch(value):
+        return value[2:-2].split("', '")
+    return ast.literal_eval(value)
+
+
+# compiled column: (row, subject, subject is an id, subject is allowed,
+# subject as written, append) -> None
+_Emitter = Callable[[List[str], str, bool, bool, str, Callable], None]
+
+
+def _compile_column(
+    mapping: ColumnMapping, allowed: Set[str], exclude: Set[Tuple[str, str]]
+) -> _Emitter:
+    """Specialize :func:`create_trips` for a column.
+
+    Everything that only depends on the mapping (property, datatype,
+    constant objects) is resolved here once instead of for every cell.
+    """
+    p = property_dict[mapping.prop]
+    target = mapping.target
+    column = mapping.column
+    year = mapping.year
+    transform = mapping.transform
+    prefix = BENCHMARK_RESOURCE_PREFIX
+    suffix = None if mapping.dtype is None else '"^^' + mapping.dtype
+
+    if not mapping.checked:
+        value = mapping.value
+
+        def emit_unchecked(row, s, s_id, s_allowed, s_out, append):
+            append((target, (prefix + s, p, value)))
+
+        return emit_unchecked
+
+    def accept(s: str, s_id: bool, s_allowed: bool, o: str) -> Optional[str]:
+        """The object as written if the triple is written, see :func:`_should_write`."""
+        if o.startswith(_ID_PREFIXES):
+            if o not in allowed or (s_id and (not s_allowed or (s, o) in exclude)):
+                return None
+            o = prefix + o
+        elif not (s_id and s_allowed):
+            return None
+        return o if suffix is None else '"' + o + suffix
+
+    if column is None:
+        # the same object for every row
+        o = mapping.value if transform is None else transform(mapping.value)
+        if o in ("", "\\N"):
+            return lambda row, s, s_id, s_allowed, s_out, append: None
+        if year:
+            o = _normalize_year(o)
+
+        def emit_value(row, s, s_id, s_allowed, s_out, append):
+            obj = accept(s, s_id, s_allowed, o)
+            if obj is not None:
+                append((target, (s_out, p, obj)))
+
+        return emit_value
+
+    if mapping.multiple:
+        if transform is not None:
+            raise ValueError(f"Multi-valued column {column} can not be transformed")
+
+        def emit_multiple(row, s, s_id, s_allowed, s_out, append):
+            o = row[column]
+            if o == "" or o == "\\N":
+                return
+            if year:
+                o = o + "-01-01"
+            for obj in _parse_list(o) if o.startswith("[") else (o,):
+                if obj.startswith(_ID_PREFIXES):
+                    if obj not in allowed or (
+                        s_id and (not s_allowed or (s, obj) in exclude)
+                    ):
+                        continue
+                    obj = prefix + obj
+                elif not (s_id and s_allowed):
+                    continue
+                if suffix is not None:
+                    obj = '"' + obj + suffix
+                append((target, (s_out, p, obj)))
+                # the written subject is prefixed, so it counts as no id anymore
+                s_id = False
+
+        return emit_multiple
+
+    if transform is not None:
+
+        def emit_transformed(row, s, s_id, s_allowed, s_out, append):
+            o = row[column]
+            if o == "":
+                return
+            o = transform(o)
+            if o == "\\N":
+                return
+            if year:
+                o = o + "-01-01"
+            obj = accept(s, s_id, s_allowed, o)
+            if obj is not None:
+                append((target, (s_out, p, obj)))
+
+        return emit_transformed
+
+    if year:
+
+        def emit_year(row, s, s_id, s_allowed, s_out, append):
+            o = row[column]
+            if o == "" or o == "\\N":
+                return
+            obj = accept(s, s_id, s_allowed, o + "-01-01")
+            if obj is not None:
+                append((target, (s_out, p, obj)))
+
+        return emit_year
+
+    def emit(row, s, s_id, s_allowed, s_out, append):
+        o = row[column]
+        if o == "" or o == "\\N":
+            return
+        # inlined accept, this is the most common case
+        if o.startswith(_ID_PREFIXES):
+            if o not in allowed or (s_id and (not s_allowed or (s, o) in exclude)):
+                return
+            o = prefix + o
+        elif not (s_id and s_allowed):
+            return
+        append((target, (s_out, p, o if suffix is None else '"' + o + suffix)))
+
+    return emit
+
+
+def compile_mapping(
+    mapping: FileMapping, allowed: Set[str], exclude: Set[Tuple[str, str]]
+) -> Callable[[List[str], Callable], None]:
+    """Compile the mapping of a file into a function that appends the
+    (target, triple) pairs of a row, in the same order as :func:`create_trips`
+    called for every column.
+    """
+    # consecutive columns with the same subject share its checks
+    groups: List[Tuple[int, List[_Emitter], List[_Emitter]]] = []
+    for column in mapping.columns:
+        if not groups or groups[-1][0] != column.subject:
+            groups.append((column.subject, [], []))
+        emit = _compile_column(column, allowed, exclude)
+        groups[-1][1].append(emit)
+        if not column.checked:
+            groups[-1][2].append(emit)
+    prefix = BENCHMARK_RESOURCE_PREFIX
+
+    def transform(row: List[str], append: Callable):
+        for subject, emitters, unchecked in groups:
+            s = row[subject]
+            if s == "" or s == "\\N":
+                # no triple of the subject is written, unless it is not checked
+                for emit in unchecked:
+                    emit(row, s, False, False, s, append)
+                continue
+            s_id = s.startswith(_ID_PREFIXES)
+            s_allowed = s in allowed
+            s_out = prefix + s if s_id else s
+            for emit in emitters:
+                emit(row, s, s_id, s_allowed, s_out, append)
+
+    return transform
+
+
+class RowHandler:
+    """Handler turning the rows of an IMDB dump into triples as given by its mapping.
+
+    Unlike the compiled functions it can be pickled and sent to the
+    parsing processes.
+    """
+
+    def __init__(self, mapping: FileMapping):
+        self.mapping = mapping
+
+    def __call__(
+        self,
+        path: str,
+        allowed: Set[str],
+        exclude: Set[Tuple[str, str]],
+        byte_range: Optional[Tuple[int, int]] = None,
+    ) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+        transform = compile_mapping(self.mapping, allowed, exclude)
+        out: List[Tuple[str, Tuple[str, str, str]]] = []
+        append = out.append
+        for row in _read_row_tuples(
+            path,
+            exclusion=self.mapping.header + "\t",
+            allowed=allowed,
+            byte_range=byte_range,
+        ):
+            transform(row, append)
+            if out:
+                yield from out
+                out.clear()
+
+
+handle_name_basics = RowHandler(FILE_MAPPINGS["name.basics.tsv"])
+handle_title_basics = RowHandler(FILE_MAPPINGS["title.basics.tsv"])
+handle_title_crew = RowHandler(FILE_MAPPINGS["title.crew.tsv"])
+handle_title_episode = RowHandler(FILE_MAPPINGS["title.episode.tsv"])
+handle_title_principals = RowHandler(FILE_MAPPINGS["title.principals.tsv"])
+
+
+# open partition files of the on-disk deduplication, well below the usual
+# limit of open files; with more triples the partitions get larger
+MAX_SPILL_PARTITIONS = 256
+
+
+def _spill_dedup(
+    trips: Iterator[Tuple[str, str, str]],
+    buffered: List[Tuple[str, str, str]],
+    max_in_memory: int,
+    spill_dir: Optional[str] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        # spool everything with its position, so we know how many partitions we need
+        spool_path = os.path.join(tmp_dir, "spool")
+        count = 0
+        with open(spool_path, "w", encoding="utf8") as spool:
+            for t in itertools.chain(buffered, trips):
+                spool.write(f"{count}\t" + "\t".join(t) + "\n")
+                count += 1
+        del buffered[:]
+        num_partitions = min(-(-count // max_in_memory), MAX_SPILL_PARTITIONS)
+        partition_paths = [
+            os.path.join(tmp_dir, f"partition_{i}") for i in range(num_partitions)
+        ]
+        with contextlib.ExitStack() as stack:
+            # files that were opened are closed even if opening the next one fails
+            partition_files = [
+                stack.enter_context(open(p, "w", encoding="utf8"))
+                for p in partition_paths
+            ]
+            with open(spool_path, "r", encoding="utf8") as spool:
+                for line in spool:
+                    _, t_str = line.split("\t", 1)
+                    partition_files[hash(t_str) % num_partitions].write(line)
+        os.remove(spool_path)
+
+        # dedup each partition, sorted by first occurrence
+        sorted_paths = []
+        for partition_path in partition_paths:
+            first_seen: Dict[str, int] = {}
+            with open(partition_path, "r", encoding="utf8") as partition_file:
+                for line in partition_file:
+                    pos, t_str = line.split("\t", 1)
+                    if t_str not in first_seen:
+                        first_seen[t_str] = int(pos)
+            os.remove(partition_path)
+            sorted_path = partition_path + "_sorted"
+            with open(sorted_path, "w", encoding="utf8") as sorted_file:
+                for t_str, pos in sorted(first_seen.items(), key=lambda x: x[1]):
+                    sorted_file.write(f"{pos}\t{t_str}")
+            sorted_paths.append(sorted_path)
+
+        # merge partitions back into first-seen order
+        with contextlib.ExitStack() as stack:
+            sorted_files = [
+                stack.enter_context(open(p, "r", encoding="utf8"))
+                for p in sorted_paths
+            ]
+            for line in heapq.merge(
+                *sorted_files, key=lambda line: int(line.split("\t", 1)[0])
+            ):
+                s, p, o = line.rstrip("\n").split("\t")[1:]
+                yield s, p, o
+
+
+def _iter_dedup(
+    trips: Iterable[Tuple[str, str, str]],
+    max_in_memory: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Remove duplicate triples, keeping the order of first occurrence.
+
+    :param trips: Triples to deduplicate.
+    :param max_in_memory: If more triples than this are given, they are
+        hashed into (at most :data:`MAX_SPILL_PARTITIONS`) partitions on disk,
+        which are deduplicated one at a time.
+        If None, everything is deduplicated in memory.
+    :param spill_dir: Directory for the on-disk partitions, defaults to the
+        system temp directory.
+    :return: Iterator over unique triples.
+    """
+    if max_in_memory is None:
+        seen = set()
+        for t in trips:
+            if t not in seen:
+                seen.add(t)
+                yield t
+        return
+    trips = iter(trips)
+    buffered = list(itertools.islice(trips, max_in_memory + 1))
+    if len(buffered) <= max_in_memory:
+        yield from dict.fromkeys(buffered)
+        return
+    logger.info(
+        f"More than {max_in_memory} triples, deduplicating in on-disk partitions"
+    )
+    yield from _spill_dedup(trips, buffered, max_in_memory, spill_dir)
+
+
+def _dedup(
+    trips: Iterable[Tuple[str, str, str]],
+    max_in_memory: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+) -> List[Tuple[str, str, str]]:
+    return list(_iter_dedup(trips, max_in_memory=max_in_memory, spill_dir=spill_dir))
+
+
+# handlers of the downloaded dumps, in the order they are parsed
+file_handler_dict: Dict[str, Callable] = {
+    filename: RowHandler(FILE_MAPPINGS[filename]) for filename in uris.values()
+}
+
+# files smaller than this are not split for parallel parsing
+_MIN_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _file_handlers(engine: str) -> Dict[str, Callable]:
+    if engine == "row":
+        return file_handler_dict
+    if engine == "columnar":
+        from moviegraphbenchmark import columnar
+
+        # files without a vectorized handler are parsed row by row
+        return {**file_handler_dict, **columnar.file_handler_dict}
+    raise ValueError(f"Unknown engine {engine}, expected 'row' or 'columnar'")
+
+
+def _parse_tasks(
+    imdb_dir: str, workers: int, engine: str = "row"
+) -> List[Tuple[Callable, str, Optional[Tuple[int, int]]]]:
+    tasks: List[Tuple[Callable, str, Optional[Tuple[int, int]]]] = []
+    for filename, handle_fun in _file_handlers(engine).items():
+        path = imdb_file_path(imdb_dir, filename)
+        # gz archives can not be split, since they can't be seeked
+        if path.endswith(".gz") or not os.path.isfile(path):
+            tasks.append((handle_fun, path, None))
+            continue
+        num_chunks = min(workers * 4, os.path.getsize(path) // _MIN_CHUNK_SIZE)
+        if num_chunks <= 1:
+            tasks.append((handle_fun, path, None))
+            continue
+        for byte_range in _line_aligned_chunks(path, num_chunks):
+            tasks.append((handle_fun, path, byte_range))
+    return tasks
+
+
+def _run_task(
+    handle_fun: Callable,
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]],
+) -> List[Tuple[str, Tuple[str, str, str]]]:
+    return list(handle_fun(path, allowed, exclude, byte_range))
+
+
+def _run_task_profiled(
+    handle_fun: Callable,
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    byte_range: Optional[Tuple[int, int]],
+) -> Tuple[List[Tuple[str, Tuple[str, str, str]]], metrics.StageMetrics]:
+    collected: List[metrics.StageMetrics] = []
+    with metrics.counting_rows() as counter, metrics.stage(
+        collected.append, f"parse:{os.path.basename(path)}"
+    ) as chunk:
+        trips = _run_task(handle_fun, path, allowed, exclude, byte_range)
+        chunk.bytes_read = (
+            metrics.file_size(path)
+            if byte_range is None
+            else byte_range[1] - byte_range[0]
         )
-        for p, o, multiple_possible, dtype in [
-            ("primaryTitle", row[2], False, None),
-            ("originalTitle", row[3], False, None),
-            ("isAdult", row[4], False, None),
-            ("startYear", row[5], False, DTYPE_DATE),
-            ("endYear", row[6], False, DTYPE_DATE),
-            ("runtimeMinutes", row[7], False, None),
-            ("genres", row[8], False, None),
-        ]:
-            attr_trips.extend(
-                create_trips(
-                    s=row[0],
-                    p=p,
-                    o=o,
-                    multiple_possible=multiple_possible,
-                    allowed=allowed,
-                    exclude=exclude,
-                    dtype=dtype,
-                )
-            )
-    return attr_trips, rel_trips
+        chunk.rows_scanned = counter.rows
+        chunk.rows_kept = len(trips)
+    return trips, collected[0]
 
 
-def handle_title_crew(
-    path: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
-) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    rel_trips = []
+class _FileMetrics:
+    """Adds up the metrics of the chunks of each file, which are parsed by workers."""
 
-    for row in _read_row_tuples(path, exclusion="tconst\t", allowed=allowed):
-        for o in [row[1], row[2]]:
-            rel_trips.extend(
-                create_trips(
-                    s=row[0],
-                    p="participatedIn",
-                    o=o,
-                    multiple_possible=True,
-                    allowed=allowed,
-                    exclude=exclude,
-                )
-            )
-    return [], rel_trips
+    def __init__(self, tasks: List[Tuple[Callable, str, Optional[Tuple[int, int]]]]):
+        self.remaining = {}
+        for _, path, _ in tasks:
+            name = f"parse:{os.path.basename(path)}"
+            self.remaining[name] = self.remaining.get(name, 0) + 1
+        self.totals: Dict[str, metrics.StageMetrics] = {}
 
+    def add(self, chunk: metrics.StageMetrics) -> Optional[metrics.StageMetrics]:
+        """Add a chunk, return the metrics of its file once all chunks were added."""
+        total = self.totals.setdefault(chunk.stage, metrics.StageMetrics(chunk.stage))
+        # wall time of the workers, which overlaps between chunks
+        total.wall_s += chunk.wall_s
+        total.cpu_s += chunk.cpu_s
+        total.bytes_read += chunk.bytes_read
+        total.rows_scanned += chunk.rows_scanned
+        total.rows_kept += chunk.rows_kept
+        total.peak_memory_mb = max(
+            (m for m in [total.peak_memory_mb, chunk.peak_memory_mb] if m is not None),
+            default=None,
+        )
+        self.remaining[chunk.stage] -= 1
+        return total if self.remaining[chunk.stage] == 0 else None
 
-def handle_title_episode(
-    path: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
-) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    attr_trips = []
-    rel_trips = []
-    for row in _read_row_tuples(path, exclusion="tconst\t", allowed=allowed):
-        for p, o in [
-            ("episodeOf", row[1]),
-            ("titleType", "tvEpisode"),
-        ]:
-            rel_trips.extend(
-                create_trips(
-                    s=row[0],
-                    p=p,
-                    o=o,
-                    multiple_possible=False,
-                    allowed=allowed,
-                    exclude=exclude,
-                )
-            )
 
-        for p, o in [
-            ("seasonNumber", row[2]),
-            ("episodeNumber", row[3]),
-        ]:
-            attr_trips.extend(
-                create_trips(
-                    s=row[0],
-                    p=p,
-                    o=o,
-                    multiple_possible=False,
-                    allowed=allowed,
-                    exclude=exclude,
-                    dtype=DTYPE_NON_NEG_INT,
+def _iter_parallel(
+    imdb_dir: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    workers: int,
+    engine: str = "row",
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    tasks = _parse_tasks(imdb_dir, workers, engine)
+    try:
+        from tqdm import tqdm
+
+        progress = tqdm(total=len(tasks), desc="Creating triples")
+    except ImportError:
+        progress = None
+    run_task = _run_task if on_metrics is None else _run_task_profiled
+    file_metrics = _FileMetrics(tasks)
+
+    def result(future: Future) -> List[Tuple[str, Tuple[str, str, str]]]:
+        trips = future.result()
+        if progress is not None:
+            progress.update()
+        if on_metrics is not None:
+            trips, chunk = trips
+            total = file_metrics.add(chunk)
+            if total is not None:
+                on_metrics(total)
+        return trips
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # only keep a few finished chunks in memory and yield them in
+        # submission order, so the result is the same as the serial one
+        pending: Deque[Future] = deque()
+        for handle_fun, path, byte_range in tasks:
+            pending.append(
+                executor.submit(
+                    run_task, handle_fun, path, allowed, exclude, byte_range
                 )
             )
-    return attr_trips, rel_trips
+            if len(pending) >= 2 * workers:
+                yield from result(pending.popleft())
+        while pending:
+            yield from result(pending.popleft())
+    if progress is not None:
+        progress.close()
 
 
-def handle_title_principals(
-    path: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
-) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    attr_trips: List[Tuple[str, str, str]] = []
-    rel_trips = []
-    for row in _read_row_tuples(path, exclusion="tconst\t", allowed=allowed):
-        rel_trips.extend(
-            create_trips(
-                s=row[2],
-                p="participatedIn",
-                o=row[0],
-                multiple_possible=False,
-                allowed=allowed,
-                exclude=exclude,
-            )
+def _iter_profiled(
+    handle_fun: Callable,
+    path: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    on_metrics: metrics.MetricsCallback,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    trips = metrics.TimedIterator(handle_fun(path, allowed, exclude))
+    with metrics.counting_rows() as counter:
+        yield from trips
+    on_metrics(
+        metrics.StageMetrics(
+            f"parse:{os.path.basename(path)}",
+            wall_s=trips.wall_s,
+            cpu_s=trips.cpu_s,
+            bytes_read=metrics.file_size(path),
+            rows_scanned=counter.rows,
+            rows_kept=trips.count,
+            peak_memory_mb=metrics.peak_memory_mb(),
         )
-    return attr_trips, rel_trips
+    )
+
+
+def iter_trips(
+    imdb_dir: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    workers: int = 1,
+    engine: str = "row",
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+) -> Iterator[Tuple[str, Tuple[str, str, str]]]:
+    """Stream the triples of all IMDB dumps.
 
+    :param imdb_dir: Directory containing the IMDB dumps.
+    :param allowed: Ids of entities that are part of the benchmark.
+    :param exclude: Excluded (subject, object) pairs.
+    :param workers: Number of processes used to parse the IMDB dumps.
+    :param engine: Either "row" or the vectorized "columnar" engine for parsing.
+    :param on_metrics: Called with the metrics of each file once it is parsed.
+    :return: Iterator over triples tagged with ATTR or REL.
+    """
+    handlers = _file_handlers(engine)
+    if workers > 1:
+        yield from _iter_parallel(
+            imdb_dir, allowed, exclude, workers, engine, on_metrics
+        )
+        return
+    # use tqdm if available
+    try:
+        from tqdm import tqdm
 
-def _dedup(trips: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
-    d = []
-    for t in trips:
-        if t not in d:
-            d.append(t)
-    return d
+        handler_items = tqdm(handlers.items(), desc="Creating triples")
+    except ImportError:
+        handler_items = handlers.items()
+    for filename, handle_fun in handler_items:
+        path = imdb_file_path(imdb_dir, filename)
+        if on_metrics is None:
+            yield from handle_fun(path, allowed, exclude)
+        else:
+            yield from _iter_profiled(handle_fun, path, allowed, exclude, on_metrics)
 
 
 def parse_files(
-    imdb_dir: str, allowed: Set[str], exclude: Set[Tuple[str, str]]
+    imdb_dir: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    dedup_limit: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "row",
 ) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
-    file_handler_dict = {
-        "name.basics.tsv": handle_name_basics,
-        "title.basics.tsv": handle_title_basics,
-        "title.episode.tsv": handle_title_episode,
-        "title.principals.tsv": handle_title_principals,
-    }
     # collect triples
     rel_trips = []
     attr_trips = []
-    # use tqdm if available
-    try:
-        from tqdm import tqdm
-
-        for filename, handle_fun in tqdm(
-            file_handler_dict.items(), desc="Creating triples"
-        ):
-            tmp_a, tmp_r = handle_fun(
-                os.path.join(imdb_dir, filename), allowed, exclude
-            )
-            attr_trips.extend(tmp_a)
-            rel_trips.extend(tmp_r)
-    except ImportError:
-        for filename, handle_fun in file_handler_dict.items():
-            tmp_a, tmp_r = handle_fun(
-                os.path.join(imdb_dir, filename), allowed, exclude
-            )
-            attr_trips.extend(tmp_a)
-            rel_trips.extend(tmp_r)
+    for target, t in iter_trips(imdb_dir, allowed, exclude, workers, engine):
+        if target == REL:
+            rel_trips.append(t)
+        else:
+            attr_trips.append(t)
 
     # ignore attr trips that do not show up in rel trips
     rel_ids = set()
@@ -365,26 +880,213 @@ def parse_files(
         rel_ids.add(r[0])
         rel_ids.add(r[2])
     cleaned_attr = [a for a in attr_trips if a[0] in rel_ids]
-    return _dedup(cleaned_attr), _dedup(rel_trips)
+    return _dedup(cleaned_attr, max_in_memory=dedup_limit), _dedup(
+        rel_trips, max_in_memory=dedup_limit
+    )
+
+
+def _write_trips(
+    trips: Iterable[Tuple[str, str, str]], paths: List[str], output_format: str = "tsv"
+) -> int:
+    trips = iter(trips)
+    writers = [TripleWriter(path, output_format) for path in paths]
+    count = 0
+    try:
+        for batch in iter(lambda: list(itertools.islice(trips, 10_000)), []):
+            for writer in writers:
+                writer.write(batch)
+            count += len(batch)
+    finally:
+        for writer in writers:
+            writer.close()
+    return count
 
 
 def write_files(
-    cleaned_attr: List[Tuple[str, str, str]],
-    rel_trips: List[Tuple[str, str, str]],
+    cleaned_attr: Iterable[Tuple[str, str, str]],
+    rel_trips: Iterable[Tuple[str, str, str]],
     out_folder: str,
+    output_format: str = "tsv",
 ):
     if not os.path.exists(out_folder):
         os.makedirs(out_folder)
-    with open(
-        os.path.join(out_folder, "attr_triples_1"), "w", encoding="utf8"
-    ) as out_writer_attr:
-        for t in cleaned_attr:
-            out_writer_attr.write("\t".join(t) + "\n")
-    with open(
-        os.path.join(out_folder, "rel_triples_1"), "w", encoding="utf8"
-    ) as out_writer_rel:
-        for t in rel_trips:
-            out_writer_rel.write("\t".join(t) + "\n")
+    _write_trips(
+        iter(cleaned_attr), [os.path.join(out_folder, "attr_triples_1")], output_format
+    )
+    _write_trips(
+        iter(rel_trips), [os.path.join(out_folder, "rel_triples_1")], output_format
+    )
+
+
+def link_or_copy(src: str, dst: str):
+    """Hard link src to dst (replacing dst), copy if links are not supported."""
+    tmp_path = dst + ".tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+# locations of the files of each KG, relative to the data path
+KG_FILES = {
+    "imdb": ["imdb-tmdb/{}_1", "imdb-tvdb/{}_1"],
+    "tmdb": ["imdb-tmdb/{}_2", "tmdb-tvdb/{}_1"],
+    "tvdb": ["imdb-tvdb/{}_2", "tmdb-tvdb/{}_2"],
+}
+
+
+def link_identical_kg_files(data_path: str):
+    """Replace byte-identical copies of the files of a KG by links to the first one."""
+    for locations in KG_FILES.values():
+        for kind in ["attr_triples", "rel_triples"]:
+            src, *others = [
+                os.path.join(data_path, location.format(kind)) for location in locations
+            ]
+            if not os.path.isfile(src):
+                continue
+            src_stat = os.stat(src)
+            src_hash = None
+            for dst in others:
+                if not os.path.isfile(dst):
+                    continue
+                dst_stat = os.stat(dst)
+                if os.path.samestat(src_stat, dst_stat):
+                    continue
+                if dst_stat.st_size != src_stat.st_size:
+                    continue
+                if src_hash is None:
+                    src_hash = sha256_file(src)
+                if sha256_file(dst) == src_hash:
+                    logger.info(f"Linking {dst} to identical {src}")
+                    link_or_copy(src, dst)
+
+
+def _spool_attr(
+    tagged_trips: Iterable[Tuple[str, Tuple[str, str, str]]],
+    spool: IO[str],
+    rel_ids: Set[str],
+) -> Iterator[Tuple[str, str, str]]:
+    # yield rel trips and write attr trips to the spool, since they can only
+    # be cleaned once all rel trips were seen
+    for target, t in tagged_trips:
+        if target == REL:
+            rel_ids.add(t[0])
+            rel_ids.add(t[2])
+            yield t
+        else:
+            spool.write("\t".join(t) + "\n")
+
+
+def _read_spool(spool_path: str, rel_ids: Set[str]) -> Iterator[Tuple[str, str, str]]:
+    with open(spool_path, "r", encoding="utf8") as spool:
+        for line in spool:
+            s, p, o = line.rstrip("\n").split("\t")
+            if s in rel_ids:
+                yield s, p, o
+
+
+def create_imdb_graph(
+    imdb_dir: str,
+    allowed: Set[str],
+    exclude: Set[Tuple[str, str]],
+    out_folders: List[str],
+    dedup_limit: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "row",
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+    output_format: str = "tsv",
+) -> Tuple[int, int]:
+    """Parse the IMDB dumps and stream the triples into the output folders.
+
+    Triples are never collected in lists, so the memory usage is bounded by the
+    sets used for deduplication and cleaning.
+
+    :param imdb_dir: Directory containing the IMDB dumps.
+    :param allowed: Ids of entities that are part of the benchmark.
+    :param exclude: Excluded (subject, object) pairs.
+    :param out_folders: Folders in which attr_triples_1 and rel_triples_1 are written.
+    :param dedup_limit: Number of triples above which deduplication spills to disk.
+    :param workers: Number of processes used to parse the IMDB dumps.
+    :param engine: Either "row" or the vectorized "columnar" engine for parsing.
+    :param on_metrics: Called with the metrics of parsing each file, spooling,
+        deduplication and writing, see :mod:`moviegraphbenchmark.metrics`.
+    :param output_format: Format of the written files, one of
+        :data:`moviegraphbenchmark.formats.OUTPUT_FORMATS`.
+    :return: Number of written attribute and relation triples
+    """
+    for out_folder in out_folders:
+        os.makedirs(out_folder, exist_ok=True)
+    # the graph is written once and linked into the other folders
+    out_folder, *linked_folders = out_folders
+    rel_path = os.path.join(out_folder, "rel_triples_1")
+    attr_path = os.path.join(out_folder, "attr_triples_1")
+    # the pipeline steps are only timed if metrics are requested
+    timed = iter if on_metrics is None else metrics.TimedIterator
+    rel_ids: Set[str] = set()
+    with metrics.stage(on_metrics, "create_imdb_graph") as total:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spool_path = os.path.join(tmp_dir, "attr_spool")
+            with open(spool_path, "w", encoding="utf8") as spool:
+                parsed = timed(
+                    iter_trips(imdb_dir, allowed, exclude, workers, engine, on_metrics)
+                )
+                spooled = timed(_spool_attr(parsed, spool, rel_ids))
+                rel_deduped = timed(_iter_dedup(spooled, max_in_memory=dedup_limit))
+                rel_clock = metrics.Clock()
+                rel_count = _write_trips(rel_deduped, [rel_path], output_format)
+                rel_clock.stop()
+            spool_bytes = metrics.file_size(spool_path)
+            spool_read = timed(_read_spool(spool_path, rel_ids))
+            attr_deduped = timed(_iter_dedup(spool_read, max_in_memory=dedup_limit))
+            attr_clock = metrics.Clock()
+            attr_count = _write_trips(attr_deduped, [attr_path], output_format)
+            attr_clock.stop()
+        for linked_folder in linked_folders:
+            for filename in ["attr_triples_1", "rel_triples_1"]:
+                link_or_copy(
+                    os.path.join(out_folder, filename),
+                    os.path.join(linked_folder, filename),
+                )
+        if on_metrics is not None:
+            written = metrics.file_size(rel_path) + metrics.file_size(attr_path)
+            # attribute triples are spooled while parsing and read back afterwards
+            on_metrics(
+                metrics.exclusive(
+                    "spool",
+                    (spooled, parsed),
+                    (spool_read, None),
+                    bytes_read=spool_bytes,
+                    bytes_written=spool_bytes,
+                    rows_scanned=parsed.count - spooled.count,
+                    rows_kept=spool_read.count,
+                )
+            )
+            on_metrics(
+                metrics.exclusive(
+                    "dedup",
+                    (rel_deduped, spooled),
+                    (attr_deduped, spool_read),
+                    rows_scanned=spooled.count + spool_read.count,
+                    rows_kept=rel_count + attr_count,
+                )
+            )
+            on_metrics(
+                metrics.exclusive(
+                    "write",
+                    (rel_clock, rel_deduped),
+                    (attr_clock, attr_deduped),
+                    bytes_written=written,
+                    rows_scanned=rel_count + attr_count,
+                    rows_kept=rel_count + attr_count,
+                )
+            )
+            total.bytes_written = written
+            total.rows_scanned = parsed.count
+            total.rows_kept = rel_count + attr_count
+    return attr_count, rel_count
 
 
 def _create_data_path() -> Tuple[str, bool]:
@@ -405,44 +1107,245 @@ def _create_data_path() -> Tuple[str, bool]:
     return data_path, False
 
 
-def _create_graph_data(data_path: Optional[str] = None) -> str:
+# files created from the IMDB dumps, relative to the data path
+IMDB_GRAPH_OUTPUTS = [
+    f"{pair}/{filename}"
+    for pair in ["imdb-tmdb", "imdb-tvdb"]
+    for filename in ["attr_triples_1", "rel_triples_1"]
+]
+
+
+def _github_outputs(data_path: str) -> List[str]:
+    outputs = []
+    for root, dirs, files in os.walk(data_path):
+        rel_root = os.path.relpath(root, data_path)
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d != "cache"]
+        elif rel_root == "imdb":
+            # besides the lists the imdb folder holds the dumps and the cache
+            dirs[:] = []
+            files = [f for f in files if f in ["allowed", "exclude"]]
+        for filename in files:
+            rel_path = os.path.normpath(os.path.join(rel_root, filename))
+            rel_path = rel_path.replace(os.sep, "/")
+            if rel_path != MANIFEST_NAME and rel_path not in IMDB_GRAPH_OUTPUTS:
+                outputs.append(rel_path)
+    return outputs
+
+
+def _look_complete(data_path: str, outputs: List[str]) -> bool:
+    for rel_path in outputs:
+        path = os.path.join(data_path, rel_path)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return False
+        with open(path, "rb") as in_file:
+            in_file.seek(-1, os.SEEK_END)
+            if in_file.read(1) != b"\n":
+                return False
+    return True
+
+
+def _download_github_data(
+    data_path: str,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+    archive_dir: Optional[str] = None,
+):
+    with metrics.stage(on_metrics, "github") as github:
+        download_github_folder(
+            data_path, moviegraphbenchmark.__version__, archive_dir=archive_dir
+        )
+        link_identical_kg_files(data_path)
+        if github is not None:
+            github.bytes_written = sum(
+                metrics.file_size(os.path.join(data_path, rel_path))
+                for rel_path in _github_outputs(data_path)
+            )
+
+
+def _cache_target(data_path: str, github: Future) -> Tuple[Set[str], str]:
+    from moviegraphbenchmark import imdb_cache
+
+    github.result()
+    imdb_path = os.path.join(data_path, "imdb")
+    allowed_path = os.path.join(imdb_path, "allowed")
+    exclude_path = os.path.join(imdb_path, "exclude")
+    return get_allowed(allowed_path), imdb_cache.filtered_cache_dir(
+        imdb_path, imdb_cache.cache_key(allowed_path, exclude_path)
+    )
+
+
+def _download_all(
+    data_path: str,
+    keep_compressed: bool,
+    use_cache: bool,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+    archive_dir: Optional[str] = None,
+):
+    """Download the data of the repository and the IMDB dumps at the same time.
+
+    Filtering the dumps into the cache needs the allowed list of the
+    repository, so it waits for the repository data, while the dumps are
+    downloaded (and decompressed) in the meantime.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        github = executor.submit(
+            _download_github_data, data_path, on_metrics, archive_dir
+        )
+        download_if_needed(
+            os.path.join(data_path, "imdb"),
+            keep_compressed=keep_compressed,
+            on_metrics=on_metrics,
+            cache=partial(_cache_target, data_path, github) if use_cache else None,
+        )
+        github.result()
+
+
+def _create_graph_data(
+    data_path: Optional[str] = None,
+    dedup_limit: Optional[int] = None,
+    keep_compressed: bool = False,
+    workers: int = 1,
+    engine: str = "row",
+    use_cache: bool = True,
+    remove_dumps: bool = False,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+    archive_dir: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """(Download and) create benchmark data on specified path.
 
     :param data_path: Path where data should be stored.
+    :param dedup_limit: Number of triples above which deduplication spills to disk.
+    :param keep_compressed: Only keep the compressed IMDB dumps and parse them directly.
+    :param workers: Number of processes used to parse the IMDB dumps.
+    :param engine: Either "row" or the vectorized "columnar" engine for parsing.
+    :param use_cache: Parse a cache of the relevant IMDB rows, which is created if needed.
+    :param remove_dumps: Remove the IMDB dumps once the cache was created.
+    :param on_metrics: Called with the metrics of every stage that is run and
+        every IMDB file, see :mod:`moviegraphbenchmark.metrics`.
+    :param archive_dir: Directory in which the release archive of the
+        repository is kept and looked up before downloading it.
+    :param output_format: Format of the IMDB graph files, see
+        :data:`moviegraphbenchmark.formats.OUTPUT_FORMATS`. By default the
+        format of the existing graph is kept, new graphs are written as tsv.
     :return: data_path
     """
     existing_data_path = False
     if data_path is None:
         data_path, existing_data_path = _create_data_path()
-    # check if data was already created
-    if os.path.exists(os.path.join(data_path, "imdb-tmdb", "rel_triples_1")):
-        if not os.path.exists(os.path.join(data_path, "imdb_intra_ent_links")):
-            logger.info(f"Old data already present in {data_path}, will update...")
-        else:
-            logger.info(f"Data already present in {data_path}")
-            return data_path
-    logger.info(f"Using data path: {data_path}")
+    data_path = str(data_path)
+    manifest = load_manifest(data_path)
+    legacy = not os.path.isfile(os.path.join(data_path, MANIFEST_NAME))
+    github_inputs = {"version": moviegraphbenchmark.__version__}
+    downloaded = False
     if not os.path.exists(os.path.join(data_path, "imdb_intra_ent_links")):
-        download_github_folder(data_path, moviegraphbenchmark.__version__)
+        logger.info(f"Using data path: {data_path}")
+        downloaded = True
+        _download_all(data_path, keep_compressed, use_cache, on_metrics, archive_dir)
+        record_stage(
+            manifest, "github", github_inputs, data_path, _github_outputs(data_path)
+        )
+        save_manifest(data_path, manifest)
+    elif not stage_is_current(manifest, "github", github_inputs, data_path):
+        if existing_data_path or "github" not in manifest["stages"]:
+            # data of the cloned repository or created before there was a manifest
+            logger.info(f"Recording existing data of {data_path} in {MANIFEST_NAME}")
+        else:
+            logger.info(f"Data in {data_path} is outdated, will update...")
+            downloaded = True
+            _download_github_data(data_path, on_metrics, archive_dir)
+        record_stage(
+            manifest, "github", github_inputs, data_path, _github_outputs(data_path)
+        )
+        save_manifest(data_path, manifest)
+
     imdb_path = os.path.join(data_path, "imdb")
-    download_if_needed(imdb_path)
-    allowed = get_allowed(os.path.join(data_path, "imdb", "allowed"))
-    exclude = get_excluded(os.path.join(data_path, "imdb", "exclude"))
-    cleaned_attr, rel_trips = parse_files(imdb_path, allowed, exclude)
-    write_files(cleaned_attr, rel_trips, os.path.join(data_path, "imdb-tmdb"))
-    write_files(cleaned_attr, rel_trips, os.path.join(data_path, "imdb-tvdb"))
+    allowed_path = os.path.join(imdb_path, "allowed")
+    exclude_path = os.path.join(imdb_path, "exclude")
+    graph_inputs = {
+        "version": moviegraphbenchmark.__version__,
+        "allowed": sha256_file(allowed_path),
+        "exclude": sha256_file(exclude_path),
+        "dumps": sorted(uris),
+    }
+    if output_format is None:
+        output_format = (
+            manifest["stages"].get("imdb_graph", {}).get("inputs", {}).get("format")
+            or "tsv"
+        )
+    if output_format != "tsv":
+        # only recorded for other formats, so manifests of tsv graphs stay valid
+        graph_inputs["format"] = output_format
+    if (
+        legacy
+        and not downloaded
+        and output_format == "tsv"
+        and _look_complete(data_path, IMDB_GRAPH_OUTPUTS)
+    ):
+        logger.info(
+            f"Found data without {MANIFEST_NAME} in {data_path}, assuming it is complete"
+        )
+        record_stage(manifest, "imdb_graph", graph_inputs, data_path, IMDB_GRAPH_OUTPUTS)
+        save_manifest(data_path, manifest)
+        return data_path
+    if stage_is_current(manifest, "imdb_graph", graph_inputs, data_path):
+        logger.info(f"Data already present in {data_path}")
+        return data_path
+    logger.info(f"Creating IMDB graph in {data_path}")
+    allowed = get_allowed(allowed_path)
+    exclude = get_excluded(exclude_path)
+    parse_path = imdb_path
+    if use_cache:
+        from moviegraphbenchmark import imdb_cache
+
+        cache_dir = imdb_cache.filtered_cache_dir(
+            imdb_path, imdb_cache.cache_key(allowed_path, exclude_path)
+        )
+        if not imdb_cache.is_cached(cache_dir):
+            download_if_needed(
+                imdb_path,
+                keep_compressed=keep_compressed,
+                on_metrics=on_metrics,
+                cache=lambda: (allowed, cache_dir),
+            )
+        if not imdb_cache.is_cached(cache_dir):
+            # the dumps were already present
+            imdb_cache.build_filtered_cache(
+                imdb_path, allowed, cache_dir, workers, on_metrics=on_metrics
+            )
+        if remove_dumps:
+            imdb_cache.remove_dumps(imdb_path)
+        parse_path = cache_dir
+    else:
+        download_if_needed(
+            imdb_path, keep_compressed=keep_compressed, on_metrics=on_metrics
+        )
+    create_imdb_graph(
+        parse_path,
+        allowed,
+        exclude,
+        [os.path.join(data_path, "imdb-tmdb"), os.path.join(data_path, "imdb-tvdb")],
+        dedup_limit=dedup_limit,
+        workers=workers,
+        engine=engine,
+        on_metrics=on_metrics,
+        output_format=output_format,
+    )
+    record_stage(manifest, "imdb_graph", graph_inputs, data_path, IMDB_GRAPH_OUTPUTS)
+    save_manifest(data_path, manifest)
     return data_path
 
 
-@click.command
-@click.option("--data-path", default=None, help="Path where data is stored")
-def create_graph_data(data_path: Optional[str] = None):
-    """(Download and) create benchmark data on specified path.
+def __getattr__(name: str):
+    # the command line interface lives in cli, so click is only imported for it
+    if name == "create_graph_data":
+        from moviegraphbenchmark.cli import create_graph_data
 
-    :param data_path: Path where data should be stored.
-    """
-    _create_graph_data(data_path)
+        return create_graph_data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    from moviegraphbenchmark.cli import create_graph_data
+
     create_graph_data()
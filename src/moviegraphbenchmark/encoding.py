@@ -0,0 +1,267 @@
+"""Integer encoding of the loaded benchmark data.
+
+Entities, relations, attribute properties and literals of each KG are
+mapped to the position in a sorted vocabulary, so triples become int32
+arrays of shape (n, 3) and links (n, 2) arrays of entity ids of the
+left and right KG.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from moviegraphbenchmark.compact import expand_uris
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+ENCODED_CACHE_DIR = os.path.join("cache", "encoded")
+VOCABULARIES = [
+    "entities_1",
+    "entities_2",
+    "relations_1",
+    "relations_2",
+    "attributes_1",
+    "attributes_2",
+    "literals_1",
+    "literals_2",
+]
+_ARRAYS = [
+    "attr_triples_1",
+    "attr_triples_2",
+    "rel_triples_1",
+    "rel_triples_2",
+    "ent_links",
+]
+
+
+@dataclass
+class EncodedFold:
+    train_links: np.ndarray
+    test_links: np.ndarray
+    valid_links: np.ndarray
+
+
+@dataclass
+class EncodedERData:
+    """Integer encoded pair, ids are positions in the vocabularies.
+
+    Rows of ``rel_triples_*`` are (head, relation, tail) with entity and
+    relation ids, rows of ``attr_triples_*`` (entity, attribute, literal).
+    Links contain the entity id of the left and the right KG, intra links
+    entity ids of the same KG.
+    """
+
+    entities_1: pd.Index
+    entities_2: pd.Index
+    relations_1: pd.Index
+    relations_2: pd.Index
+    attributes_1: pd.Index
+    attributes_2: pd.Index
+    literals_1: pd.Index
+    literals_2: pd.Index
+    attr_triples_1: np.ndarray
+    attr_triples_2: np.ndarray
+    rel_triples_1: np.ndarray
+    rel_triples_2: np.ndarray
+    ent_links: np.ndarray
+    folds: List[EncodedFold]
+    intra_ent_links: Tuple[np.ndarray, np.ndarray]
+
+
+def _vocabulary(*columns: "pd.Series") -> "pd.Index":
+    values = pd.unique(
+        np.concatenate([np.asarray(column, dtype=object) for column in columns])
+    )
+    return pd.Index(values, dtype=object).sort_values()
+
+
+def _encode_columns(
+    df: "pd.DataFrame", vocabularies: List["pd.Index"]
+) -> np.ndarray:
+    encoded = np.empty((len(df), len(vocabularies)), dtype=np.int32)
+    for i, (column, vocabulary) in enumerate(zip(df.columns, vocabularies)):
+        encoded[:, i] = vocabulary.get_indexer(np.asarray(df[column], dtype=object))
+    return encoded
+
+
+def encode(data) -> EncodedERData:
+    """Encode an :class:`~moviegraphbenchmark.loading.ERData` as integer arrays."""
+    # compact frames are encoded by their full URIs
+    attr_1, attr_2, rel_1, rel_2, ent_links, intra_1, intra_2 = (
+        expand_uris(df)
+        for df in [
+            data.attr_triples_1,
+            data.attr_triples_2,
+            data.rel_triples_1,
+            data.rel_triples_2,
+            data.ent_links,
+            *data.intra_ent_links,
+        ]
+    )
+    folds = [
+        [
+            expand_uris(links)
+            for links in [fold.train_links, fold.test_links, fold.valid_links]
+        ]
+        for fold in data.folds
+    ]
+    link_frames = [ent_links] + [links for fold in folds for links in fold]
+    entities = []
+    for side, attr, rel, intra in [(0, attr_1, rel_1, intra_1), (1, attr_2, rel_2, intra_2)]:
+        entities.append(
+            _vocabulary(
+                attr.iloc[:, 0],
+                rel.iloc[:, 0],
+                rel.iloc[:, 2],
+                intra.iloc[:, 0],
+                intra.iloc[:, 1],
+                *[links.iloc[:, side] for links in link_frames],
+            )
+        )
+    entities_1, entities_2 = entities
+    relations_1 = _vocabulary(rel_1.iloc[:, 1])
+    relations_2 = _vocabulary(rel_2.iloc[:, 1])
+    attributes_1 = _vocabulary(attr_1.iloc[:, 1])
+    attributes_2 = _vocabulary(attr_2.iloc[:, 1])
+    literals_1 = _vocabulary(attr_1.iloc[:, 2])
+    literals_2 = _vocabulary(attr_2.iloc[:, 2])
+    link_vocabularies = [entities_1, entities_2]
+    return EncodedERData(
+        entities_1=entities_1,
+        entities_2=entities_2,
+        relations_1=relations_1,
+        relations_2=relations_2,
+        attributes_1=attributes_1,
+        attributes_2=attributes_2,
+        literals_1=literals_1,
+        literals_2=literals_2,
+        attr_triples_1=_encode_columns(attr_1, [entities_1, attributes_1, literals_1]),
+        attr_triples_2=_encode_columns(attr_2, [entities_2, attributes_2, literals_2]),
+        rel_triples_1=_encode_columns(rel_1, [entities_1, relations_1, entities_1]),
+        rel_triples_2=_encode_columns(rel_2, [entities_2, relations_2, entities_2]),
+        ent_links=_encode_columns(ent_links, link_vocabularies),
+        folds=[
+            EncodedFold(
+                train_links=_encode_columns(train_links, link_vocabularies),
+                test_links=_encode_columns(test_links, link_vocabularies),
+                valid_links=_encode_columns(valid_links, link_vocabularies),
+            )
+            for train_links, test_links, valid_links in folds
+        ],
+        intra_ent_links=(
+            _encode_columns(intra_1, [entities_1, entities_1]),
+            _encode_columns(intra_2, [entities_2, entities_2]),
+        ),
+    )
+
+
+def flat_arrays(encoded: EncodedERData) -> Dict[str, np.ndarray]:
+    """All arrays of an encoded pair by a flat name."""
+    arrays = {name: getattr(encoded, name) for name in _ARRAYS}
+    arrays["intra_ent_links_1"], arrays["intra_ent_links_2"] = encoded.intra_ent_links
+    for i, fold in enumerate(encoded.folds):
+        arrays[f"fold_{i}_train_links"] = fold.train_links
+        arrays[f"fold_{i}_test_links"] = fold.test_links
+        arrays[f"fold_{i}_valid_links"] = fold.valid_links
+    return arrays
+
+
+def from_flat_arrays(arrays, num_folds: int) -> Dict[str, Any]:
+    """Keyword arguments of :class:`EncodedERData` except the vocabularies."""
+    return dict(
+        **{name: arrays[name] for name in _ARRAYS},
+        folds=[
+            EncodedFold(
+                train_links=arrays[f"fold_{i}_train_links"],
+                test_links=arrays[f"fold_{i}_test_links"],
+                valid_links=arrays[f"fold_{i}_valid_links"],
+            )
+            for i in range(num_folds)
+        ],
+        intra_ent_links=(arrays["intra_ent_links_1"], arrays["intra_ent_links_2"]),
+    )
+
+
+def _vocabulary_arrays(vocabulary: "pd.Index") -> Tuple[np.ndarray, ...]:
+    """Utf8 bytes of a vocabulary with their offsets and a mask of missing values."""
+    values = [v.encode("utf8") if isinstance(v, str) else b"" for v in vocabulary]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    data = np.frombuffer(b"".join(values), dtype=np.uint8)
+    null = np.array([not isinstance(v, str) for v in vocabulary], dtype=bool)
+    return offsets, data, null
+
+
+def _decode_vocabulary(offsets: np.ndarray, data: np.ndarray, null: np.ndarray):
+    raw = data.tobytes()
+    values = np.array(
+        [raw[start:end].decode("utf8") for start, end in zip(offsets[:-1], offsets[1:])],
+        dtype=object,
+    )
+    values[null] = np.nan
+    return pd.Index(values, dtype=object)
+
+
+def sources_key(paths: List[str]) -> str:
+    """Fingerprint of the size and mtime of the files an encoding was created from."""
+    h = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        h.update(f"{path}\t{stat.st_size}\t{stat.st_mtime_ns}\n".encode("utf8"))
+    return h.hexdigest()
+
+
+def encoded_cache_dir(data_path: str, pair: str) -> str:
+    return os.path.join(data_path, ENCODED_CACHE_DIR, pair)
+
+
+def save_encoded(encoded: EncodedERData, cache_dir: str, key: str):
+    """Store the encoding, the key is written last so partial writes are ignored."""
+    os.makedirs(cache_dir, exist_ok=True)
+    key_path = os.path.join(cache_dir, "key.json")
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    arrays = flat_arrays(encoded)
+    for name in VOCABULARIES:
+        offsets, data, null = _vocabulary_arrays(getattr(encoded, name))
+        arrays[f"{name}_offsets"] = offsets
+        arrays[f"{name}_data"] = data
+        arrays[f"{name}_null"] = null
+    np.savez(os.path.join(cache_dir, "arrays.npz"), **arrays)
+    with open(key_path, "w", encoding="utf8") as out_file:
+        json.dump({"key": key, "folds": len(encoded.folds)}, out_file)
+
+
+def load_encoded(cache_dir: str, key: str) -> Optional[EncodedERData]:
+    """Load a cached encoding if it was created from the same sources."""
+    try:
+        with open(os.path.join(cache_dir, "key.json"), "r", encoding="utf8") as in_file:
+            stored = json.load(in_file)
+    except (OSError, ValueError):
+        return None
+    if stored["key"] != key:
+        return None
+    with np.load(os.path.join(cache_dir, "arrays.npz")) as arrays:
+        if f"{VOCABULARIES[0]}_offsets" not in arrays.files:
+            # written with the vocabularies in separate feather files
+            return None
+        vocabularies = {
+            name: _decode_vocabulary(
+                arrays[f"{name}_offsets"],
+                arrays[f"{name}_data"],
+                arrays[f"{name}_null"],
+            )
+            for name in VOCABULARIES
+        }
+        return EncodedERData(
+            **vocabularies, **from_flat_arrays(arrays, stored["folds"])
+        )
@@ -0,0 +1,343 @@
+"""Scoring of predicted matches against the folds of a pair.
+
+Predicted pairs are encoded with the entity vocabularies of the encoded
+pair and turned into single int64 keys, which are matched against the
+sorted keys of the gold links with ``np.searchsorted``. Entities that are
+connected by intra links are treated as the same entity, so predicting
+any of them counts as correct. The predictions are read once and scored
+against all folds.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from moviegraphbenchmark.clustering import connected_components
+from moviegraphbenchmark.compact import expand_uris
+from moviegraphbenchmark.encoding import EncodedERData
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+SPLITS = ["train", "test", "valid"]
+CHUNK_SIZE = 1_000_000
+
+
+@dataclass
+class MatchScores:
+    precision: float
+    recall: float
+    f1: float
+    true_positives: int
+    num_predicted: int
+    num_gold: int
+
+
+def _scores(true_positives: int, num_predicted: int, num_gold: int) -> MatchScores:
+    precision = true_positives / num_predicted if num_predicted else 0.0
+    recall = true_positives / num_gold if num_gold else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return MatchScores(
+        precision=precision,
+        recall=recall,
+        f1=f1,
+        true_positives=true_positives,
+        num_predicted=num_predicted,
+        num_gold=num_gold,
+    )
+
+
+class _Gold:
+    """Canonical entity ids and sorted gold keys of an encoded pair."""
+
+    def __init__(self, encoded: EncodedERData, honor_intra: bool):
+        self.encoded = encoded
+        self.num_right = len(encoded.entities_2)
+        canonical = []
+        for entities, intra in zip(
+            [encoded.entities_1, encoded.entities_2], encoded.intra_ent_links
+        ):
+            if honor_intra and intra is not None and len(intra):
+                canonical.append(
+                    connected_components(intra[:, 0], intra[:, 1], len(entities))
+                )
+            else:
+                canonical.append(np.arange(len(entities), dtype=np.int64))
+        self.canonical_1, self.canonical_2 = canonical
+
+    def keys(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Keys of canonical pairs, -1 if an entity is unknown."""
+        known = (left >= 0) & (right >= 0)
+        keys = np.full(len(left), -1, dtype=np.int64)
+        keys[known] = (
+            self.canonical_1[left[known]] * self.num_right
+            + self.canonical_2[right[known]]
+        )
+        return keys
+
+    def link_keys(self, links: np.ndarray) -> np.ndarray:
+        return _sorted_unique(self.keys(links[:, 0], links[:, 1]))
+
+    def folds(self, split: str) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Gold keys and excluded left and right entities of each fold."""
+        if split == "all":
+            none_1 = np.zeros(len(self.canonical_1), dtype=bool)
+            none_2 = np.zeros(len(self.canonical_2), dtype=bool)
+            return [(self.link_keys(self.encoded.ent_links), none_1, none_2)]
+        if split not in SPLITS:
+            raise ValueError(f"Unknown split {split}, use one of {SPLITS + ['all']}")
+        folds = []
+        for fold in self.encoded.folds:
+            excluded_1 = np.zeros(len(self.canonical_1), dtype=bool)
+            excluded_2 = np.zeros(len(self.canonical_2), dtype=bool)
+            # links of the other splits are known, predictions for them are ignored
+            for other in SPLITS:
+                if other != split:
+                    links = getattr(fold, f"{other}_links")
+                    excluded_1[self.canonical_1[links[:, 0]]] = True
+                    excluded_2[self.canonical_2[links[:, 1]]] = True
+            gold_keys = self.link_keys(getattr(fold, f"{split}_links"))
+            folds.append((gold_keys, excluded_1, excluded_2))
+        return folds
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    # sorting is much faster than the hash based np.unique for many keys
+    keys = np.sort(keys)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return keys[first]
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(sorted_keys, keys)
+    positions[positions == len(sorted_keys)] = 0
+    return sorted_keys[positions] == keys
+
+
+def _encode_entities(values, vocabulary: "pd.Index") -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        ids = values.astype(np.int64)
+        ids[(ids < 0) | (ids >= len(vocabulary))] = -1
+        return ids
+    return vocabulary.get_indexer(np.asarray(values, dtype=object)).astype(np.int64)
+
+
+Predictions = Union[
+    "pd.DataFrame", np.ndarray, Sequence[np.ndarray], str, "os.PathLike[str]"
+]
+
+
+def _columns(
+    predictions: Predictions, chunk_size: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """Left, right and (if given) score column of the predictions in chunks."""
+    if isinstance(predictions, (str, os.PathLike)):
+        chunks = pd.read_csv(
+            predictions,
+            header=None,
+            sep="\t",
+            encoding="utf8",
+            dtype=str,
+            chunksize=chunk_size,
+        )
+        for chunk in chunks:
+            score = chunk.iloc[:, 2].to_numpy(float) if chunk.shape[1] > 2 else None
+            yield chunk.iloc[:, 0].to_numpy(), chunk.iloc[:, 1].to_numpy(), score
+    elif isinstance(predictions, pd.DataFrame):
+        predictions = expand_uris(predictions)
+        score = predictions["score"] if "score" in predictions.columns else None
+        yield (
+            predictions.iloc[:, 0].to_numpy(),
+            predictions.iloc[:, 1].to_numpy(),
+            None if score is None else score.to_numpy(float),
+        )
+    elif isinstance(predictions, np.ndarray):
+        yield predictions[:, 0], predictions[:, 1], None
+    else:
+        left, right, *score = predictions
+        yield np.asarray(left), np.asarray(right), (
+            np.asarray(score[0], dtype=float) if score else None
+        )
+
+
+def _unknown_side(
+    values, ids: np.ndarray, canonical: np.ndarray, rows: np.ndarray
+) -> List[Union[int, str]]:
+    """Entities of predictions with unknown entities, as canonical id if
+    known and as string of the given value if not, so they can be deduplicated."""
+    values = np.asarray(values)[rows]
+    ids = ids[rows]
+    return [
+        int(canonical[i]) if i >= 0 else str(value) for i, value in zip(ids, values)
+    ]
+
+
+def _as_encoded(data) -> EncodedERData:
+    return data if isinstance(data, EncodedERData) else data.to_encoded()
+
+
+def evaluate(
+    data,
+    predictions: Predictions,
+    split: str = "test",
+    honor_intra: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> List[MatchScores]:
+    """Precision, recall and F1 of predicted matches for every fold.
+
+    Predictions of a fold that contain an entity of the links of the other
+    splits are ignored, e.g. for the test split matches of train and
+    validation entities do not count. Duplicate predictions are counted
+    once, predictions with entities unknown to the pair are wrong (unless
+    their other entity is ignored).
+
+    :param data: The pair as :class:`~moviegraphbenchmark.loading.ERData` or
+        :class:`~moviegraphbenchmark.encoding.EncodedERData`.
+    :param predictions: Predicted pairs of left and right entity as frame,
+        (n, 2) array or tuple of two arrays (URIs or entity ids of the
+        encoded pair), or path of a tab separated file that is streamed.
+    :param split: One of "test", "valid", "train", or "all" to score
+        against ``ent_links`` instead of the folds.
+    :param honor_intra: Treat entities with intra links as the same entity.
+    :param chunk_size: Number of lines of a prediction file read at once.
+    :return: The scores of each fold (a single one for "all").
+    """
+    encoded = _as_encoded(data)
+    gold = _Gold(encoded, honor_intra)
+    folds = gold.folds(split)
+    keys = []
+    unknown: Set[Tuple[Union[int, str], Union[int, str]]] = set()
+    for left, right, _ in _columns(predictions, chunk_size):
+        left_ids = _encode_entities(left, encoded.entities_1)
+        right_ids = _encode_entities(right, encoded.entities_2)
+        chunk_keys = gold.keys(left_ids, right_ids)
+        rows = np.flatnonzero(chunk_keys < 0)
+        unknown.update(
+            zip(
+                _unknown_side(left, left_ids, gold.canonical_1, rows),
+                _unknown_side(right, right_ids, gold.canonical_2, rows),
+            )
+        )
+        keys.append(_sorted_unique(chunk_keys[chunk_keys >= 0]))
+    # canonical ids of the known entities of the unknown pairs, -1 if unknown
+    unknown_1 = np.array(
+        [e if isinstance(e, int) else -1 for e, _ in unknown], dtype=np.int64
+    )
+    unknown_2 = np.array(
+        [e if isinstance(e, int) else -1 for _, e in unknown], dtype=np.int64
+    )
+    keys = _sorted_unique(np.concatenate(keys)) if keys else np.empty(0, np.int64)
+    left = keys // gold.num_right
+    right = keys % gold.num_right
+    scores = []
+    for gold_keys, excluded_1, excluded_2 in folds:
+        # gold links are never ignored, even if intra links connect their
+        # entities with entities of other splits
+        fold_keys = keys[
+            ~(excluded_1[left] | excluded_2[right]) | _contains(gold_keys, keys)
+        ]
+        # pairs with an unknown entity are wrong, unless the other one is ignored
+        fold_unknown = ~(
+            ((unknown_1 >= 0) & excluded_1[np.maximum(unknown_1, 0)])
+            | ((unknown_2 >= 0) & excluded_2[np.maximum(unknown_2, 0)])
+        )
+        scores.append(
+            _scores(
+                int(_contains(gold_keys, fold_keys).sum()),
+                len(fold_keys) + int(fold_unknown.sum()),
+                len(gold_keys),
+            )
+        )
+    return scores
+
+
+def evaluate_ranked(
+    data,
+    candidates: Predictions,
+    ks: Sequence[int] = (1, 10),
+    split: str = "test",
+    honor_intra: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> List[Dict[str, float]]:
+    """Hits@k and MRR of ranked candidates for every fold.
+
+    Candidates of each left entity (or group of entities connected by
+    intra links) are ranked by descending "score", which is the third
+    column of files and tuples, or by their order if there is no score.
+    The rank of a gold link is the rank of its first correct
+    candidate, gold links without correct candidate count as not found.
+
+    :param data: The pair, see :func:`evaluate`.
+    :param candidates: Candidate pairs with optional score, see :func:`evaluate`.
+    :param ks: Cut-offs of the reported Hits@k.
+    :param split: Split of the folds that is scored, see :func:`evaluate`.
+    :param honor_intra: Treat entities with intra links as the same entity.
+    :param chunk_size: Number of lines of a candidate file read at once.
+    :return: "hits@k" for each k and "mrr" of each fold.
+    """
+    encoded = _as_encoded(data)
+    gold = _Gold(encoded, honor_intra)
+    folds = gold.folds(split)
+    keys = []
+    scores = []
+    for left, right, score in _columns(candidates, chunk_size):
+        keys.append(
+            gold.keys(
+                _encode_entities(left, encoded.entities_1),
+                _encode_entities(right, encoded.entities_2),
+            )
+        )
+        scores.append(score)
+    keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+    # position of each candidate by descending score, equal scores keep their order
+    if any(score is not None for score in scores):
+        by_score = np.argsort(-np.concatenate(scores), kind="stable")
+        position = np.empty(len(keys), dtype=np.int64)
+        position[by_score] = np.arange(len(keys))
+    else:
+        position = np.arange(len(keys))
+    known = keys >= 0
+    keys, position = keys[known], position[known]
+    # only the best candidate of each canonical pair is ranked
+    order = np.argsort(keys)
+    keys, position = keys[order], position[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(first)
+    keys = keys[starts]
+    position = np.minimum.reduceat(position, starts) if len(starts) else position
+    # keys are sorted by the canonical left entity, so each query is a
+    # contiguous group and the candidates are ordered within it
+    query = keys // gold.num_right
+    new_query = np.ones(len(keys), dtype=bool)
+    new_query[1:] = query[1:] != query[:-1]
+    group = np.cumsum(new_query) - 1
+    order = np.argsort(group * (len(known) + 1) + position)
+    group_starts = np.flatnonzero(new_query)
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(1, len(keys) + 1) - np.repeat(
+        group_starts, np.diff(np.append(group_starts, len(keys)))
+    )
+    results = []
+    for gold_keys, _, _ in folds:
+        found = _contains(keys, gold_keys)
+        gold_ranks = np.zeros(len(gold_keys), dtype=np.int64)
+        gold_ranks[found] = ranks[np.searchsorted(keys, gold_keys[found])]
+        num_gold = max(len(gold_keys), 1)
+        result = {
+            f"hits@{k}": int((found & (gold_ranks <= k)).sum()) / num_gold
+            for k in ks
+        }
+        result["mrr"] = float((1 / gold_ranks[found]).sum()) / num_gold
+        results.append(result)
+    return results
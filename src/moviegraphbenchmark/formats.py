@@ -0,0 +1,245 @@
+"""File formats of the created IMDB graph.
+
+The triples are written as plain, gzip or zstd compressed tsv, as Parquet
+or as N-Triples. Every format keeps the usual file names (e.g.
+``attr_triples_1``), the format of a file is detected from its first
+bytes (N-Triples from its first line) when it is read, and reading any
+of them gives the same dataframe as reading the tsv file.
+"""
+import gzip
+import io
+import re
+from typing import IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+OUTPUT_FORMATS = ["tsv", "tsv.gz", "tsv.zst", "parquet", "nt"]
+
+# formats whose files are lines of text, which end with a newline
+TEXT_FORMATS = ["tsv", "nt"]
+
+# size of the write buffer of the text formats in bytes
+BUFFER_SIZE = 1024 * 1024
+
+# triples that are buffered and written as one row group of a parquet file
+PARQUET_ROW_GROUP_SIZE = 250_000
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_MAGIC_BYTES = [
+    (b"\x1f\x8b", "tsv.gz"),
+    (b"\x28\xb5\x2f\xfd", "tsv.zst"),
+    (b"PAR1", "parquet"),
+]
+
+_COLUMNS = ["head", "relation", "tail"]
+
+# characters that are not allowed in an IRIREF of N-Triples
+_IRI_FORBIDDEN = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+# objects like "1999-01-01"^^<http://www.w3.org/2001/XMLSchema#date>
+_TYPED_LITERAL = re.compile(r'"(.*)"\^\^<([^\x00-\x20<>"{}|^`\\]+)>', re.S)
+_IRI = re.compile(r'https?://[^\x00-\x20<>"{}|^`\\]+')
+_LITERAL_ESCAPES = str.maketrans(
+    {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"}
+)
+_NT_LINE = re.compile(
+    r'<([^>]*)> <([^>]*)> (?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:\^\^<([^>]*)>)?) \.'
+)
+# like the csv parser of pandas: a quoted value ends at a single quote, two
+# quotes are an escaped one and the rest is taken as it is
+_QUOTED = re.compile(r'"((?:[^"]|"")*)"(.*)', re.S)
+_ESCAPE = re.compile(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)")
+_UNESCAPED = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f"}
+
+
+def detect_format(path: str) -> str:
+    """Format of a file written by :class:`TripleWriter`, tsv if unknown."""
+    with open(path, "rb") as in_file:
+        head = in_file.read(4)
+        for magic, output_format in _MAGIC_BYTES:
+            if head.startswith(magic):
+                return output_format
+        # a tsv file can start with "<" as well, so the whole line is checked
+        in_file.seek(0)
+        line = in_file.readline().decode("utf8", errors="replace")
+    if _NT_LINE.fullmatch(line.strip()):
+        return "nt"
+    return "tsv"
+
+
+def read_tsv(source, names: List[str], compression: Optional[str] = "infer"):
+    """Read a tsv file (or buffer) with every value as string."""
+    import pandas as pd
+
+    return pd.read_csv(
+        source,
+        header=None,
+        names=names,
+        sep="\t",
+        encoding="utf8",
+        dtype=str,
+        compression=compression,
+    )
+
+
+def _iri(value: str) -> str:
+    return "<" + _IRI_FORBIDDEN.sub(lambda m: f"\\u{ord(m.group()):04X}", value) + ">"
+
+
+def nt_line(triple: Tuple[str, str, str]) -> str:
+    """N-Triples line of a triple.
+
+    Objects with a datatype (see ``_add_dtype`` of
+    :mod:`moviegraphbenchmark.create_graph`) become typed literals, other
+    http(s) urls become IRIs and everything else a plain literal.
+    """
+    s, p, o = triple
+    typed = _TYPED_LITERAL.fullmatch(o)
+    if typed is not None:
+        obj = f'"{typed.group(1).translate(_LITERAL_ESCAPES)}"^^<{typed.group(2)}>'
+    elif _IRI.fullmatch(o):
+        obj = f"<{o}>"
+    else:
+        obj = f'"{o.translate(_LITERAL_ESCAPES)}"'
+    return f"{_iri(s)} {_iri(p)} {obj} .\n"
+
+
+def _unescape(value: str) -> str:
+    def replace(match: "re.Match") -> str:
+        escaped = match.group(1)
+        if len(escaped) > 1:
+            return chr(int(escaped[1:], 16))
+        return _UNESCAPED.get(escaped, escaped)
+
+    return _ESCAPE.sub(replace, value)
+
+
+def nt_to_tsv(lines: Iterable[str]) -> Iterator[str]:
+    """Turn N-Triples lines back into the tsv lines they were written from."""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _NT_LINE.fullmatch(line)
+        if match is None:
+            raise ValueError(f"Not an N-Triples line: {line}")
+        s, p, iri, literal, dtype = match.groups()
+        if iri is not None:
+            o = _unescape(iri)
+        elif dtype is not None:
+            o = f'"{_unescape(literal)}"^^<{dtype}>'
+        else:
+            o = _unescape(literal)
+        yield f"{_unescape(s)}\t{_unescape(p)}\t{o}\n"
+
+
+def _unquote(value: str) -> str:
+    match = _QUOTED.fullmatch(value)
+    if match is None:
+        # never closed
+        return value[1:].replace('""', '"')
+    return match.group(1).replace('""', '"') + match.group(2)
+
+
+def _column_as_read(values: Sequence[str]):
+    """Arrow array of the values as :func:`read_tsv` reads them from a tsv file."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pandas._libs.parsers import STR_NA_VALUES
+
+    array = pa.array(values, type=pa.string())
+    quoted = pc.starts_with(array, '"')
+    if pc.any(quoted).as_py():
+        values = list(values)
+        for i in pc.indices_nonzero(quoted).to_pylist():
+            values[i] = _unquote(values[i])
+        array = pa.array(values, type=pa.string())
+    na = pc.is_in(array, value_set=pa.array(sorted(STR_NA_VALUES), type=pa.string()))
+    return pc.if_else(na, pa.scalar(None, type=pa.string()), array)
+
+
+class TripleWriter:
+    """Writes batches of triples into a file of the given format.
+
+    The text formats join every batch into one string, which goes through
+    a large write buffer (and the compressor), parquet files get a row
+    group per :data:`PARQUET_ROW_GROUP_SIZE` triples.
+    """
+
+    def __init__(self, path: str, output_format: str = "tsv"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format {output_format}, choose one of {OUTPUT_FORMATS}"
+            )
+        self.path = path
+        self.output_format = output_format
+        self._out_file: Optional[IO[str]] = None
+        self._rows: List[Tuple[str, str, str]] = []
+        self._parquet_writer = None
+        if output_format == "parquet":
+            # fail before anything is parsed if pyarrow is missing
+            import pyarrow  # noqa: F401
+        elif output_format == "tsv.gz":
+            self._out_file = gzip.open(
+                path, "wt", encoding="utf8", compresslevel=GZIP_LEVEL
+            )
+        elif output_format == "tsv.zst":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError(
+                    "Please install zstandard for zstd output: pip install zstandard"
+                )
+            compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+                open(path, "wb")
+            )
+            self._out_file = io.TextIOWrapper(
+                io.BufferedWriter(compressed, BUFFER_SIZE), encoding="utf8"
+            )
+        else:
+            self._out_file = open(path, "w", encoding="utf8", buffering=BUFFER_SIZE)
+
+    def write(self, batch: List[Tuple[str, str, str]]):
+        if self.output_format == "nt":
+            self._out_file.write("".join(map(nt_line, batch)))
+        elif self.output_format == "parquet":
+            self._rows.extend(batch)
+            if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+                self._write_row_group()
+        else:
+            self._out_file.write("".join("\t".join(t) + "\n" for t in batch))
+
+    def _write_row_group(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, pa.string()) for name in _COLUMNS])
+        if self._rows:
+            table = pa.table(
+                {
+                    name: _column_as_read(column)
+                    for name, column in zip(_COLUMNS, zip(*self._rows))
+                },
+                schema=schema,
+            )
+        else:
+            table = schema.empty_table()
+        self._rows = []
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(
+                self.path, schema, compression="zstd"
+            )
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        if self.output_format == "parquet":
+            if self._rows or self._parquet_writer is None:
+                self._write_row_group()
+            self._parquet_writer.close()
+        else:
+            self._out_file.close()
+
+    def __enter__(self) -> "TripleWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,103 @@
+"""Binary cache of the tsv files loaded by load_data.
+
+Every file is stored as uncompressed Feather (Arrow IPC) file in
+``cache/frames`` of the data path, so later loads skip parsing. The
+strings are still converted into Python objects, which gives the same
+dataframe as parsing the file, but not a memory mapped one.
+The size, mtime and sha256 of the source are stored in the metadata of
+the cached file. If size and mtime are unchanged the cache is used
+directly, if only the mtime changed the hash decides.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from moviegraphbenchmark.manifest import sha256_file
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:
+    # without pyarrow the tsv files are always parsed
+    pa = None
+
+CACHE_DIR = os.path.join("cache", "frames")
+_METADATA_KEY = b"moviegraphbenchmark"
+
+
+def frame_cache_path(data_path: str, path: str) -> str:
+    rel_path = os.path.relpath(path, data_path)
+    return os.path.join(data_path, CACHE_DIR, rel_path + ".feather")
+
+
+def _source_info(path: str, stat: os.stat_result, names: List[str]) -> Dict[str, Any]:
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256_file(path),
+        "names": names,
+    }
+
+
+def _read_metadata(cache_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with pa.memory_map(cache_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if not metadata or _METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[_METADATA_KEY])
+
+
+def _write(cache_path: str, df: "pd.DataFrame", info: Dict[str, Any]):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(info)}
+    )
+    tmp_path = cache_path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+
+
+def cached_read(
+    path: str,
+    names: List[str],
+    data_path: str,
+    read: Callable[[str, List[str]], "pd.DataFrame"],
+) -> "pd.DataFrame":
+    """Load a tsv file from the binary cache, (re)creating the cache if needed.
+
+    :param path: Path of the tsv file.
+    :param names: Column names.
+    :param data_path: Data path containing the cache.
+    :param read: Function parsing the tsv file.
+    :return: The same dataframe as ``read(path, names)``.
+    """
+    if pa is None:
+        return read(path, names)
+    cache_path = frame_cache_path(data_path, path)
+    stat = os.stat(path)
+    cached = _read_metadata(cache_path)
+    if cached is not None and cached["names"] == names:
+        if cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        if cached["size"] == stat.st_size and cached["sha256"] == sha256_file(path):
+            # only touched, store the new mtime to skip hashing next time
+            df = feather.read_table(cache_path, memory_map=True).to_pandas()
+            _write(cache_path, df, _source_info(path, stat, names))
+            return df
+    logger.debug(f"Caching {path} in {cache_path}")
+    info = _source_info(path, stat, names)
+    df = read(path, names)
+    _write(cache_path, df, info)
+    return df
@@ -2,7 +2,9 @@ import gzip
 import logging
 import os
 import shutil
-from moviegraphbenchmark.utils import download_file
+from typing import IO, Callable, Optional, Set, Tuple
+
+from moviegraphbenchmark import metrics
 
 
 uris = {
@@ -22,13 +24,61 @@ def unzip(filepath: str):
             shutil.copyfileobj(f_in, f_out)
 
 
-def download_if_needed(imdb_path: str):
+def imdb_file_path(imdb_path: str, filename: str) -> str:
+    """Path of an IMDB dump, preferring an already decompressed file over the gz archive."""
+    filepath = os.path.join(imdb_path, filename)
+    if not os.path.isfile(filepath) and os.path.isfile(filepath + ".gz"):
+        return filepath + ".gz"
+    return filepath
+
+
+def open_tsv(path: str) -> IO[str]:
+    """Open a (possibly gzipped) tsv file for reading text."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf8")
+    return open(path, "r", encoding="utf8")
+
+
+def download_if_needed(
+    imdb_path: str,
+    keep_compressed: bool = False,
+    workers: int = len(uris),
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+    cache: Optional[Callable[[], Tuple[Set[str], str]]] = None,
+):
+    """Download the IMDB dumps that are not yet present.
+
+    Every dump is decompressed while it is downloaded, see
+    :mod:`moviegraphbenchmark.pipeline`.
+
+    :param imdb_path: Directory where the dumps are stored.
+    :param keep_compressed: If True, only keep the gz archives, which are parsed directly.
+    :param workers: Number of dumps that are downloaded at the same time.
+    :param on_metrics: Called with the metrics of downloading and of
+        decompressing each dump.
+    :param cache: If given, returns the allowed ids and the directory of the
+        cache of relevant rows (see :mod:`moviegraphbenchmark.imdb_cache`),
+        which is then filled while downloading. It may block until both are
+        known, so the download does not have to wait for them.
+    """
     os.makedirs(imdb_path, exist_ok=True)
+    missing = {}
     for u, p in uris.items():
         filepath = os.path.join(imdb_path, p)
-        if not os.path.isfile(filepath):
-            logger.info(f"Did not find {filepath}, therefore downloading from {u}")
-            download_file(u, imdb_path)
-            logger.info("Unpacking gz archive")
-            unzip(filepath)
-            os.remove(filepath + ".gz")
+        if os.path.isfile(filepath) or os.path.isfile(filepath + ".gz"):
+            continue
+        logger.info(f"Did not find {filepath}, therefore downloading from {u}")
+        missing[u] = filepath
+    if not missing:
+        return
+    # imported here, because the pipeline needs the parsing code
+    from moviegraphbenchmark.pipeline import stream_dumps
+
+    stream_dumps(
+        imdb_path,
+        missing,
+        keep_compressed=keep_compressed,
+        cache=cache,
+        workers=workers,
+        on_metrics=on_metrics,
+    )
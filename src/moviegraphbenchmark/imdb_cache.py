@@ -0,0 +1,149 @@
+"""Cache of the rows of the IMDB dumps that are relevant for the benchmark.
+
+Only rows whose first column is in the allowed list are needed to create
+the IMDB graph. These rows are stored as small gzipped dumps in a folder
+that is keyed by the allowed list, the exclude list and the dump urls,
+so that rebuilding does not need the multi-GB dumps anymore.
+"""
+import gzip
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Set
+
+from moviegraphbenchmark import create_graph, metrics
+from moviegraphbenchmark.get_imdb_data import imdb_file_path, uris
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+_COMPLETE_MARKER = "complete"
+
+_HEADER_PREFIXES = {
+    filename: mapping.header + "\t"
+    for filename, mapping in create_graph.FILE_MAPPINGS.items()
+}
+
+
+def cache_key(allowed_path: str, exclude_path: str) -> str:
+    """Hash of everything that determines the content of the cache."""
+    h = hashlib.sha256()
+    for path in [allowed_path, exclude_path]:
+        with open(path, "rb") as in_file:
+            h.update(in_file.read())
+        h.update(b"\0")
+    for uri, filename in sorted(uris.items()):
+        h.update(f"{uri}\t{filename}\n".encode("utf8"))
+    return h.hexdigest()[:16]
+
+
+def filtered_cache_dir(imdb_path: str, key: str) -> str:
+    return os.path.join(imdb_path, "filtered", key)
+
+
+def is_cached(cache_dir: str) -> bool:
+    return os.path.isfile(os.path.join(cache_dir, _COMPLETE_MARKER))
+
+
+def mark_complete(cache_dir: str):
+    # written last, so an interrupted build is not mistaken for a complete one
+    with open(os.path.join(cache_dir, _COMPLETE_MARKER), "w", encoding="utf8"):
+        pass
+
+
+def _write_rows(rows: Iterable[List[str]], cache_dir: str, filename: str) -> int:
+    """Write the filtered rows of a dump into the cache and return their number."""
+    out_path = os.path.join(cache_dir, filename + ".gz")
+    tmp_path = out_path + ".tmp"
+    kept = 0
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf8") as out_file:
+            for row in rows:
+                out_file.write("\t".join(row) + "\n")
+                kept += 1
+    except BaseException:
+        # e.g. the dump could not be downloaded or decompressed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, out_path)
+    return kept
+
+
+def _filter_dump(
+    imdb_path: str,
+    filename: str,
+    allowed: Set[str],
+    cache_dir: str,
+    profile: bool = False,
+) -> Optional[metrics.StageMetrics]:
+    path = imdb_file_path(imdb_path, filename)
+    collected: List[metrics.StageMetrics] = []
+    with metrics.counting_rows(profile) as counter, metrics.stage(
+        collected.append if profile else None, f"cache:{filename}"
+    ) as stage:
+        kept = _write_rows(
+            create_graph._read_row_tuples(
+                path, exclusion=_HEADER_PREFIXES[filename], allowed=allowed
+            ),
+            cache_dir,
+            filename,
+        )
+        if stage is not None:
+            stage.bytes_read = metrics.file_size(path)
+            stage.bytes_written = metrics.file_size(
+                os.path.join(cache_dir, filename + ".gz")
+            )
+            stage.rows_scanned = counter.rows
+            stage.rows_kept = kept
+    return collected[0] if collected else None
+
+
+def build_filtered_cache(
+    imdb_path: str,
+    allowed: Set[str],
+    cache_dir: str,
+    workers: int = 1,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+):
+    """Write the allowed rows of every IMDB dump into the cache.
+
+    :param imdb_path: Directory containing the IMDB dumps.
+    :param allowed: Ids of entities that are part of the benchmark.
+    :param cache_dir: Directory of the cache.
+    :param workers: Number of dumps that are filtered in parallel.
+    :param on_metrics: Called with the metrics of filtering each dump.
+    """
+    logger.info(f"Caching relevant IMDB rows in {cache_dir}")
+    os.makedirs(cache_dir, exist_ok=True)
+    profile = on_metrics is not None
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(uris))) as executor:
+            futures = [
+                executor.submit(
+                    _filter_dump, imdb_path, filename, allowed, cache_dir, profile
+                )
+                for filename in uris.values()
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            _filter_dump(imdb_path, filename, allowed, cache_dir, profile)
+            for filename in uris.values()
+        ]
+    if on_metrics is not None:
+        for result in results:
+            on_metrics(result)
+    mark_complete(cache_dir)
+
+
+def remove_dumps(imdb_path: str):
+    """Remove the (decompressed or compressed) IMDB dumps."""
+    for filename in uris.values():
+        for path in [
+            os.path.join(imdb_path, filename),
+            os.path.join(imdb_path, filename + ".gz"),
+        ]:
+            if os.path.isfile(path):
+                logger.info(f"Removing {path}")
+                os.remove(path)
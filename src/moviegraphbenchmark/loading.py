@@ -1,9 +1,23 @@
+import io
 import logging
 import os
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+import weakref
+from dataclasses import dataclass, field, fields
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple, Optional, Union
 
+from moviegraphbenchmark import formats, metrics
+from moviegraphbenchmark.compact import compact_frame
 from moviegraphbenchmark.create_graph import _create_graph_data
+from moviegraphbenchmark.encoding import (
+    EncodedERData,
+    encode,
+    encoded_cache_dir,
+    load_encoded,
+    save_encoded,
+    sources_key,
+)
+from moviegraphbenchmark.frame_cache import cached_read
 
 logger = logging.getLogger("moviegraphbenchmark")
 
@@ -29,61 +43,326 @@ class ERData:
     ent_links: pd.DataFrame
     folds: List[Fold]
     intra_ent_links: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None
+    _encoded: Optional[EncodedERData] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def to_encoded(self) -> EncodedERData:
+        """Integer encoded version of this pair, computed only once."""
+        if self._encoded is None:
+            self._encoded = encode(self)
+        return self._encoded
+
+
+class _LazyComponent:
+    """Attribute that is loaded on first access and memoized."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            value = instance._loaders[self.name]()
+            instance.__dict__[self.name] = value
+            return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
+def _lazy_repr(instance) -> str:
+    """Dataclass like repr that shows components which were not loaded yet as
+    pending instead of loading them."""
+    parts = []
+    for f in fields(instance):
+        if not f.repr:
+            continue
+        if f.name in instance._loaders and f.name not in instance.__dict__:
+            parts.append(f"{f.name}=<pending>")
+        else:
+            parts.append(f"{f.name}={getattr(instance, f.name)!r}")
+    return f"{type(instance).__name__}({', '.join(parts)})"
+
+
+class LazyFold(Fold):
+    """Fold that reads each of the links files on first access.
+
+    The repr only shows the loaded files and two lazy folds are only equal
+    if they are the same object, so neither reads any file.
+    """
+
+    train_links = _LazyComponent()
+    test_links = _LazyComponent()
+    valid_links = _LazyComponent()
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]]):
+        self._loaders = loaders
+
+    __repr__ = _lazy_repr
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def preload(self):
+        """Load all links files now."""
+        for name in self._loaders:
+            getattr(self, name)
+
+
+class LazyERData(ERData):
+    """ERData that reads each file on first access.
+
+    Folds are :class:`LazyFold`, so only the links of the folds that are
+    used are read. Like for :class:`LazyFold` neither repr nor comparison
+    reads any file.
+    """
+
+    attr_triples_1 = _LazyComponent()
+    attr_triples_2 = _LazyComponent()
+    rel_triples_1 = _LazyComponent()
+    rel_triples_2 = _LazyComponent()
+    ent_links = _LazyComponent()
+    intra_ent_links = _LazyComponent()
+
+    def __init__(
+        self, loaders: Dict[str, Callable[[], Any]], folds: List[LazyFold]
+    ):
+        self._loaders = loaders
+        self.folds = folds
+
+    __repr__ = _lazy_repr
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def preload(self):
+        """Load all files now."""
+        for name in self._loaders:
+            getattr(self, name)
+        for fold in self.folds:
+            fold.preload()
+
+
+# frames of the KG files by identity of the file, so KGs that are hard linked
+# into several pair folders are only parsed once per process; every load
+# gets a shallow copy of them
+_kg_frames: "weakref.WeakValueDictionary[Tuple, pd.DataFrame]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _copy_on_write() -> bool:
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    # "warn" (pandas 2.2) only warns, values are still shared
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def _read_kg(read, path, names, entity_columns, compact):
+    stat = os.stat(path)
+    key = (
+        stat.st_dev,
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime_ns,
+        tuple(names),
+        tuple(entity_columns),
+        compact,
+    )
+    df = _kg_frames.get(key)
+    if df is None:
+        df = read(path, names, entity_columns)
+        _kg_frames[key] = df
+    # with copy-on-write (the default since pandas 3) the copy shares the
+    # parsed columns until one of them is changed, without it every loaded
+    # pair needs its own values, so changes to one pair do not affect the others
+    loaded = df.copy(deep=not _copy_on_write())
+    # keeps the cached frame alive as long as one of its copies is used
+    object.__setattr__(loaded, "_kg_frame", df)
+    return loaded
+
+
+# pandas names of the compressions of the output formats
+_COMPRESSION = {"tsv.gz": "gzip", "tsv.zst": "zstd"}
 
 
 def _read(path, names):
-    return pd.read_csv(
-        path,
-        header=None,
-        names=names,
-        sep="\t",
-        encoding="utf8",
-        dtype=str,
+    """Read a file of the data path in any of the output formats."""
+    file_format = formats.detect_format(path)
+    if file_format == "parquet":
+        df = pd.read_parquet(path)
+        df.columns = names
+        return df
+    if file_format == "nt":
+        with open(path, encoding="utf8") as in_file:
+            lines = "".join(formats.nt_to_tsv(in_file))
+        return formats.read_tsv(io.StringIO(lines), names)
+    return formats.read_tsv(path, names, _COMPRESSION.get(file_format, "infer"))
+
+
+def _source_paths(data_path: str, pair: str) -> List[str]:
+    pair_path = os.path.join(data_path, pair)
+    paths = [
+        os.path.join(pair_path, name)
+        for name in [
+            "attr_triples_1",
+            "attr_triples_2",
+            "rel_triples_1",
+            "rel_triples_2",
+            "ent_links",
+        ]
+    ]
+    paths.extend(
+        os.path.join(data_path, f"{dataset}_intra_ent_links")
+        for dataset in pair.split("-")
     )
+    for fold in range(1, 6):
+        paths.extend(
+            os.path.join(pair_path, "721_5fold", str(fold), links)
+            for links in ["train_links", "test_links", "valid_links"]
+        )
+    return paths
+
+
+def _reader(data_path: str, use_cache: bool, compact: bool) -> Callable[..., Any]:
+    """Function reading a file of the data path as configured."""
+    if use_cache:
+
+        def read(path, names, entity_columns=None):
+            return cached_read(path, names, data_path, read=_read)
+
+    else:
+
+        def read(path, names, entity_columns=None):
+            return _read(path, names)
 
+    if compact:
+        base_read = read
 
-def load_data(pair: str = "imdb-tmdb", data_path: Optional[str] = None) -> ERData:
-    data_path = _create_graph_data(data_path)
+        def read(path, names, entity_columns=None):
+            if entity_columns is None:
+                entity_columns = names
+            return compact_frame(
+                base_read(path, names), entity_columns, category_columns=["relation"]
+            )
+
+    return read
+
+
+def _profiled(
+    read: Callable[..., Any], data_path: str, on_metrics: metrics.MetricsCallback
+) -> Callable[..., Any]:
+    """Reader that reports the metrics of every file it reads."""
+
+    def profiled_read(path, names, entity_columns=None):
+        rel_path = os.path.relpath(path, data_path).replace(os.sep, "/")
+        with metrics.stage(on_metrics, f"load:{rel_path}") as stage:
+            df = read(path, names, entity_columns)
+            stage.bytes_read = metrics.file_size(path)
+            stage.rows_scanned = stage.rows_kept = len(df)
+        return df
+
+    return profiled_read
+
+
+def load_data(
+    pair: str = "imdb-tmdb",
+    data_path: Optional[str] = None,
+    use_cache: bool = True,
+    encoded: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+) -> Union[ERData, EncodedERData]:
+    """Load a pair of the benchmark, creating the data if needed.
+
+    :param pair: Either "imdb-tmdb", "imdb-tvdb" or "tmdb-tvdb".
+    :param data_path: Path where the data is stored.
+    :param use_cache: Load the files from a binary cache, which is created on
+        first load (needs pyarrow).
+    :param encoded: Return the integer encoded pair, see :meth:`ERData.to_encoded`.
+    :param compact: Split entity URIs into categorical prefixes and local ids and
+        store relations as categoricals, see :func:`expand_uris`.
+    :param lazy: Only read the files when the attributes are first accessed,
+        see :class:`LazyERData`.
+    :param on_metrics: Called with the metrics of creating the data (if
+        needed) and of reading every file, also when lazily loaded files are
+        read later, see :mod:`moviegraphbenchmark.metrics`.
+    :return: The loaded pair.
+    """
+    data_path = _create_graph_data(data_path, on_metrics=on_metrics)
+    if encoded:
+        if not use_cache:
+            return load_data(
+                pair, data_path, use_cache=False, on_metrics=on_metrics
+            ).to_encoded()
+        cache_dir = encoded_cache_dir(data_path, pair)
+        key = sources_key(_source_paths(data_path, pair))
+        with metrics.stage(on_metrics, f"load:{pair}/encoded"):
+            encoded_data = load_encoded(cache_dir, key)
+        if encoded_data is None:
+            encoded_data = load_data(pair, data_path, on_metrics=on_metrics)
+            with metrics.stage(on_metrics, f"encode:{pair}"):
+                encoded_data = encoded_data.to_encoded()
+                save_encoded(encoded_data, cache_dir, key)
+        return encoded_data
+    read = _reader(data_path, use_cache, compact)
+    if on_metrics is not None:
+        read = _profiled(read, data_path, on_metrics)
     data_pair = pair.split("-")
     logger.info(f"Loading from data path: {data_path}")
     pair_path = os.path.join(data_path, pair)
     triple_columns = ["head", "relation", "tail"]
     link_columns = ["left", "right"]
-    attr_1 = _read(os.path.join(pair_path, "attr_triples_1"), triple_columns)
-    attr_2 = _read(os.path.join(pair_path, "attr_triples_2"), triple_columns)
-    rel_1 = _read(os.path.join(pair_path, "rel_triples_1"), triple_columns)
-    rel_2 = _read(os.path.join(pair_path, "rel_triples_2"), triple_columns)
-    ent_links = _read(os.path.join(pair_path, "ent_links"), link_columns)
-    intra_ent_left = _read(
-        os.path.join(data_path, f"{data_pair[0]}_intra_ent_links"), [f"{data_pair[0]}_left", f"{data_pair[0]}_right"]
-    )
-    intra_ent_right = _read(
-        os.path.join(data_path, f"{data_pair[1]}_intra_ent_links"), [f"{data_pair[1]}_left", f"{data_pair[1]}_right"]
-    )
-    folds = []
-    for fold in range(1, 6):
-        folds.append(
-            Fold(
-                train_links=_read(
-                    os.path.join(pair_path, "721_5fold", str(fold), "train_links"),
-                    link_columns,
-                ),
-                test_links=_read(
-                    os.path.join(pair_path, "721_5fold", str(fold), "test_links"),
-                    link_columns,
-                ),
-                valid_links=_read(
-                    os.path.join(pair_path, "721_5fold", str(fold), "valid_links"),
-                    link_columns,
-                ),
-            )
+    intra_paths = [
+        (
+            os.path.join(data_path, f"{dataset}_intra_ent_links"),
+            [f"{dataset}_left", f"{dataset}_right"],
         )
+        for dataset in data_pair
+    ]
+    read_kg = partial(_read_kg, read, compact=compact)
+    loaders: Dict[str, Callable[[], Any]] = {
+        "attr_triples_1": partial(
+            read_kg, os.path.join(pair_path, "attr_triples_1"), triple_columns, ["head"]
+        ),
+        "attr_triples_2": partial(
+            read_kg, os.path.join(pair_path, "attr_triples_2"), triple_columns, ["head"]
+        ),
+        "rel_triples_1": partial(
+            read_kg,
+            os.path.join(pair_path, "rel_triples_1"),
+            triple_columns,
+            ["head", "tail"],
+        ),
+        "rel_triples_2": partial(
+            read_kg,
+            os.path.join(pair_path, "rel_triples_2"),
+            triple_columns,
+            ["head", "tail"],
+        ),
+        "ent_links": partial(read, os.path.join(pair_path, "ent_links"), link_columns),
+        "intra_ent_links": lambda: tuple(read(*args) for args in intra_paths),
+    }
+    fold_loaders = [
+        {
+            links: partial(
+                read,
+                os.path.join(pair_path, "721_5fold", str(fold), links),
+                link_columns,
+            )
+            for links in ["train_links", "test_links", "valid_links"]
+        }
+        for fold in range(1, 6)
+    ]
+    if lazy:
+        return LazyERData(loaders, [LazyFold(fold) for fold in fold_loaders])
     return ERData(
-        attr_triples_1=attr_1,
-        attr_triples_2=attr_2,
-        rel_triples_1=rel_1,
-        rel_triples_2=rel_2,
-        ent_links=ent_links,
-        folds=folds,
-        intra_ent_links=(intra_ent_left, intra_ent_right),
+        **{name: load() for name, load in loaders.items()},
+        folds=[
+            Fold(**{name: load() for name, load in fold.items()})
+            for fold in fold_loaders
+        ],
     )
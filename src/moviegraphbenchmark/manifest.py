@@ -0,0 +1,133 @@
+"""Manifest of the build stages of the benchmark data.
+
+For every stage the manifest stores the inputs it was run with and the
+size and sha256 of each output file (relative to the data path). A stage
+only has to be rerun if its inputs changed or its outputs are damaged.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List
+
+from moviegraphbenchmark.formats import TEXT_FORMATS, detect_format
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+MANIFEST_NAME = "manifest.json"
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(data_path: str) -> Dict[str, Any]:
+    path = os.path.join(data_path, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {"stages": {}}
+    with open(path, "r", encoding="utf8") as in_file:
+        return json.load(in_file)
+
+
+def save_manifest(data_path: str, manifest: Dict[str, Any]):
+    path = os.path.join(data_path, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf8") as out_file:
+        json.dump(manifest, out_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def record_stage(
+    manifest: Dict[str, Any],
+    stage: str,
+    inputs: Dict[str, Any],
+    data_path: str,
+    outputs: Iterable[str],
+):
+    """Store inputs and fingerprints of the outputs of a finished stage.
+
+    :param manifest: Manifest that is updated in place.
+    :param stage: Name of the stage.
+    :param inputs: JSON serializable inputs of the stage.
+    :param data_path: Path the outputs are relative to.
+    :param outputs: Relative paths of the output files.
+    """
+    manifest["stages"][stage] = {
+        "inputs": inputs,
+        "outputs": {
+            rel_path: {
+                "size": os.path.getsize(os.path.join(data_path, rel_path)),
+                "sha256": sha256_file(os.path.join(data_path, rel_path)),
+            }
+            for rel_path in sorted(outputs)
+        },
+    }
+
+
+def _check_output(path: str, expected: Dict[str, Any], check_hashes: bool) -> str:
+    if not os.path.isfile(path):
+        return "missing"
+    size = os.path.getsize(path)
+    if size != expected["size"]:
+        return f"size is {size} instead of {expected['size']}"
+    if size > 0 and detect_format(path) in TEXT_FORMATS:
+        # compressed and parquet files are covered by the size
+        with open(path, "rb") as in_file:
+            in_file.seek(-1, os.SEEK_END)
+            if in_file.read(1) != b"\n":
+                return "does not end with a newline"
+    if check_hashes and sha256_file(path) != expected["sha256"]:
+        return "checksum mismatch"
+    return ""
+
+
+def verify_stage(
+    manifest: Dict[str, Any], stage: str, data_path: str, check_hashes: bool = False
+) -> List[str]:
+    """Check the outputs of a stage.
+
+    By default only sizes and trailing newlines (of text files) are
+    checked, which is enough to find truncated files without reading them.
+
+    :return: Description of every problem that was found.
+    """
+    if stage not in manifest["stages"]:
+        return [f"stage {stage} was never completed"]
+    problems = []
+    for rel_path, expected in manifest["stages"][stage]["outputs"].items():
+        problem = _check_output(
+            os.path.join(data_path, rel_path), expected, check_hashes
+        )
+        if problem:
+            problems.append(f"{rel_path}: {problem}")
+    return problems
+
+
+def stage_is_current(
+    manifest: Dict[str, Any], stage: str, inputs: Dict[str, Any], data_path: str
+) -> bool:
+    """Whether a stage ran with the given inputs and its outputs are intact."""
+    if stage not in manifest["stages"]:
+        return False
+    if manifest["stages"][stage]["inputs"] != inputs:
+        logger.info(f"Inputs of {stage} changed")
+        return False
+    problems = verify_stage(manifest, stage, data_path)
+    for problem in problems:
+        logger.info(f"Output of {stage} damaged: {problem}")
+    return not problems
+
+
+def verify_manifest(data_path: str, check_hashes: bool = True) -> List[str]:
+    """Check the outputs of all stages in the manifest of the data path."""
+    manifest = load_manifest(data_path)
+    if not manifest["stages"]:
+        return [f"no {MANIFEST_NAME} found in {data_path}"]
+    problems = []
+    for stage in manifest["stages"]:
+        problems.extend(verify_stage(manifest, stage, data_path, check_hashes))
+    return problems
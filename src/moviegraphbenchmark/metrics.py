@@ -0,0 +1,214 @@
+"""Wall time, CPU time, I/O and memory of the stages of creating and loading data.
+
+Functions that can be profiled take an ``on_metrics`` callback, which is
+called with a :class:`StageMetrics` after every stage and every IMDB file.
+Without callback nothing is measured, which costs a few ``is None``
+checks per stage and file but nothing per row.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is not reported there
+    resource = None
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageMetrics:
+    """Measurements of a stage.
+
+    ``rows_scanned`` are the rows (or triples) a stage reads and
+    ``rows_kept`` the ones it passes on. ``peak_memory_mb`` is the highest
+    RSS of the process (or of one of its finished worker processes) up to
+    the end of the stage.
+    """
+
+    stage: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    rows_scanned: int = 0
+    rows_kept: int = 0
+    peak_memory_mb: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+MetricsCallback = Callable[[StageMetrics], None]
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Highest RSS of this process and its finished child processes in MB."""
+    if resource is None:
+        return None
+    maxrss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+
+def cpu_time() -> float:
+    """CPU time of this process and its child processes that were waited for."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+@contextlib.contextmanager
+def stage(
+    on_metrics: Optional[MetricsCallback], name: str
+) -> Iterator[Optional[StageMetrics]]:
+    """Measure the enclosed block and pass the result to ``on_metrics``.
+
+    Yields the :class:`StageMetrics`, whose counters can be increased in
+    the block, or None if there is no callback.
+    """
+    if on_metrics is None:
+        yield None
+        return
+    metrics = StageMetrics(name)
+    wall, cpu = time.perf_counter(), cpu_time()
+    yield metrics
+    metrics.wall_s += time.perf_counter() - wall
+    metrics.cpu_s += cpu_time() - cpu
+    metrics.peak_memory_mb = peak_memory_mb()
+    on_metrics(metrics)
+
+
+class Clock:
+    """Wall and CPU time of this process from creation until stopped."""
+
+    def __init__(self):
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+
+    def stop(self) -> "Clock":
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        return self
+
+
+class TimedIterator(Iterator[T]):
+    """Iterator that measures the time spent in producing its items."""
+
+    def __init__(self, iterable: Iterable[T]):
+        self._iterator = iter(iterable)
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.count = 0
+
+    def __next__(self) -> T:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            item = next(self._iterator)
+        finally:
+            self.wall_s += time.perf_counter() - wall
+            self.cpu_s += time.process_time() - cpu
+        self.count += 1
+        return item
+
+
+def exclusive(
+    name: str, *spans: Tuple[Any, Optional[Any]], **counters: int
+) -> StageMetrics:
+    """Time spent in the outer but not in the inner part of nested spans.
+
+    :param name: Name of the stage.
+    :param spans: Pairs of :class:`Clock` or :class:`TimedIterator`, where
+        the time of the first includes the time of the second (if not
+        None), e.g. an iterator and the iterator it consumes.
+    :param counters: Counters of the :class:`StageMetrics`.
+    :return: The metrics of the stage.
+    """
+    metrics = StageMetrics(name, peak_memory_mb=peak_memory_mb(), **counters)
+    for outer, inner in spans:
+        metrics.wall_s += outer.wall_s - (0.0 if inner is None else inner.wall_s)
+        metrics.cpu_s += outer.cpu_s - (0.0 if inner is None else inner.cpu_s)
+    return metrics
+
+
+def format_table(stages: Iterable[StageMetrics]) -> str:
+    """Human readable table of the metrics of several stages."""
+    lines = [
+        f"{'stage':<32} {'wall s':>8} {'cpu s':>8} {'read MB':>9} {'written MB':>10}"
+        f" {'rows scanned':>13} {'rows kept':>11} {'peak MB':>8}"
+    ]
+    for m in stages:
+        peak = "" if m.peak_memory_mb is None else f"{m.peak_memory_mb:.0f}"
+        lines.append(
+            f"{m.stage:<32} {m.wall_s:8.2f} {m.cpu_s:8.2f}"
+            f" {m.bytes_read / 2**20:9.1f} {m.bytes_written / 2**20:10.1f}"
+            f" {m.rows_scanned:13,} {m.rows_kept:11,} {peak:>8}"
+        )
+    return "\n".join(lines)
+
+
+class RowCounter:
+    """Number of rows read from the dumps while it is active."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def counted(self, rows: Iterable[T]) -> Iterator[T]:
+        for row in rows:
+            self.rows += 1
+            yield row
+
+
+# set while a profiled IMDB file is parsed, the readers count their rows into
+# it; per thread, since dumps are filtered by several threads at the same time
+_local = threading.local()
+
+
+def _row_counter() -> Optional[RowCounter]:
+    return getattr(_local, "row_counter", None)
+
+
+@contextlib.contextmanager
+def counting_rows(enabled: bool = True) -> Iterator[RowCounter]:
+    """Count the rows that are read from the dumps in the enclosed block.
+
+    Only rows read by the calling thread are counted.
+    """
+    counter = RowCounter()
+    if not enabled:
+        yield counter
+        return
+    previous = _row_counter()
+    _local.row_counter = counter
+    try:
+        yield counter
+    finally:
+        _local.row_counter = previous
+
+
+def count_rows(rows: Iterable[T]) -> Iterable[T]:
+    """Count the lines of a dump if rows are counted, else return them as is."""
+    counter = _row_counter()
+    if counter is None:
+        return rows
+    return counter.counted(rows)
+
+
+def add_rows(num_rows: int):
+    """Add a batch of rows read from a dump if rows are counted."""
+    counter = _row_counter()
+    if counter is not None:
+        counter.rows += num_rows
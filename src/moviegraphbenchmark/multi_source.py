@@ -0,0 +1,181 @@
+"""Multi-source setting with all three KGs and the multi_source_cluster file."""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from moviegraphbenchmark.create_graph import (
+    BENCHMARK_RESOURCE_PREFIX,
+    KG_FILES,
+    _create_graph_data,
+)
+from moviegraphbenchmark.loading import _read_kg, _reader
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+try:
+    import pandas as pd
+except ImportError:
+    logger.error("Please install pandas for loading data: pip install pandas")
+
+DATASETS = ["imdb", "tmdb", "tvdb"]
+RESOURCE_PREFIXES = {
+    "imdb": BENCHMARK_RESOURCE_PREFIX,
+    "tmdb": "https://www.scads.de/movieBenchmark/resource/TMDB/",
+    "tvdb": "https://www.scads.de/movieBenchmark/resource/TVDB/",
+}
+
+
+class ClusterIndex:
+    """Clusters of entities with integer ids.
+
+    Entity ids are positions in :attr:`entities`, the members of cluster
+    ``c`` are ``members[offsets[c]:offsets[c + 1]]``.
+
+    :param entities: URI of every clustered entity.
+    :param entity_cluster: Cluster id of every entity.
+    """
+
+    def __init__(self, entities: "pd.Index", entity_cluster: np.ndarray):
+        self.entities = entities
+        self.entity_cluster = entity_cluster.astype(np.int32, copy=False)
+        self.entity_source = _sources(entities)
+        self.members = np.argsort(self.entity_cluster, kind="stable").astype(np.int32)
+        counts = np.bincount(self.entity_cluster)
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __repr__(self) -> str:
+        return f"ClusterIndex(clusters={len(self)}, entities={len(self.entities)})"
+
+    def cluster_of(self, entity: str) -> int:
+        """Cluster id of an entity URI (raises KeyError if not clustered)."""
+        return int(self.entity_cluster[self.entities.get_loc(entity)])
+
+    def clusters_of(self, entities) -> np.ndarray:
+        """Cluster ids of entity URIs, -1 for entities without cluster."""
+        positions = self.entities.get_indexer(np.asarray(entities, dtype=object))
+        return np.where(positions >= 0, self.entity_cluster[positions], -1)
+
+    def cluster_members(self, cluster: int) -> "pd.Index":
+        """URIs of the members of a cluster."""
+        return self.entities[
+            self.members[self.offsets[cluster] : self.offsets[cluster + 1]]
+        ]
+
+    def pairs(self) -> np.ndarray:
+        """All pairs of entity ids in the same cluster as (n, 2) array."""
+        counts = np.diff(self.offsets)
+        # every member is paired with all members after it in the cluster
+        position = np.arange(len(self.members))
+        cluster_end = np.repeat(self.offsets[1:], counts)
+        partners = cluster_end - position - 1
+        left = np.repeat(position, partners)
+        starts = np.cumsum(partners) - partners
+        right = left + np.arange(len(left)) - np.repeat(starts, partners) + 1
+        return np.stack([self.members[left], self.members[right]], axis=1)
+
+    def intra_source_pairs(self) -> np.ndarray:
+        """Pairs of entity ids of the same cluster and the same source."""
+        pairs = self.pairs()
+        sources = self.entity_source[pairs]
+        return pairs[sources[:, 0] == sources[:, 1]]
+
+    def inter_source_pairs(self) -> np.ndarray:
+        """Pairs of entity ids of the same cluster from different sources."""
+        pairs = self.pairs()
+        sources = self.entity_source[pairs]
+        return pairs[sources[:, 0] != sources[:, 1]]
+
+
+def _sources(entities: "pd.Index") -> np.ndarray:
+    values = pd.Series(np.asarray(entities, dtype=object), dtype=object)
+    return np.select(
+        [
+            values.str.startswith(prefix).to_numpy(bool)
+            for prefix in RESOURCE_PREFIXES.values()
+        ],
+        np.arange(len(RESOURCE_PREFIXES), dtype=np.int8),
+        default=-1,
+    ).astype(np.int8)
+
+
+def read_clusters(path: str) -> ClusterIndex:
+    """Read a file with one comma separated cluster per line.
+
+    :param path: Path of e.g. ``multi_source_cluster`` or a pair's ``cluster`` file.
+    :return: The clusters, the cluster id is the line number.
+    """
+    with open(path, "r", encoding="utf8") as in_file:
+        lines = [line for line in in_file.read().splitlines() if line]
+    counts = np.fromiter((line.count(",") + 1 for line in lines), dtype=np.int64)
+    entities = pd.Index(",".join(lines).split(","), dtype=object)
+    entity_cluster = np.repeat(np.arange(len(lines), dtype=np.int32), counts)
+    if not entities.is_unique:
+        duplicated = entities.duplicated()
+        logger.warning(
+            f"{duplicated.sum()} entities are in several clusters of {path}, "
+            "keeping the first"
+        )
+        entities = entities[~duplicated]
+        entity_cluster = entity_cluster[~duplicated]
+    return ClusterIndex(entities, entity_cluster)
+
+
+@dataclass
+class MultiSourceData:
+    """All KGs of the benchmark by dataset name ("imdb", "tmdb", "tvdb")."""
+
+    attr_triples: Dict[str, "pd.DataFrame"]
+    rel_triples: Dict[str, "pd.DataFrame"]
+    intra_ent_links: Dict[str, "pd.DataFrame"]
+    clusters: ClusterIndex
+
+
+def load_multi_source(
+    data_path: Optional[Union[str, os.PathLike]] = None,
+    use_cache: bool = True,
+    compact: bool = False,
+) -> MultiSourceData:
+    """Load the three KGs once each and the clusters of the multi-source task.
+
+    :param data_path: Path where the data is stored.
+    :param use_cache: Load the files from the binary cache, see ``load_data``.
+    :param compact: Compact representation of the frames, see ``load_data``.
+    :return: The KGs and the multi-source clusters.
+    """
+    data_path = _create_graph_data(data_path)
+    read = _reader(data_path, use_cache, compact)
+    triple_columns = ["head", "relation", "tail"]
+    attr_triples = {}
+    rel_triples = {}
+    intra_ent_links = {}
+    for dataset in DATASETS:
+        # every location of a KG has the same triples, so reading one is enough
+        location = os.path.join(data_path, KG_FILES[dataset][0])
+        attr_triples[dataset] = _read_kg(
+            read, location.format("attr_triples"), triple_columns, ["head"], compact
+        )
+        rel_triples[dataset] = _read_kg(
+            read,
+            location.format("rel_triples"),
+            triple_columns,
+            ["head", "tail"],
+            compact,
+        )
+        intra_ent_links[dataset] = read(
+            os.path.join(data_path, f"{dataset}_intra_ent_links"),
+            [f"{dataset}_left", f"{dataset}_right"],
+        )
+    return MultiSourceData(
+        attr_triples=attr_triples,
+        rel_triples=rel_triples,
+        intra_ent_links=intra_ent_links,
+        clusters=read_clusters(os.path.join(data_path, "multi_source_cluster")),
+    )
+
@@ -0,0 +1,452 @@
+"""Download, decompress and filter the IMDB dumps at the same time.
+
+Every missing dump is fetched by a download thread, which appends the
+compressed bytes to a ``.part`` file (so an interrupted download can be
+resumed) and puts them into a bounded queue. A second thread per dump
+decompresses the bytes as they arrive, writes the decompressed dump and,
+if a cache is built, filters the allowed rows into it. Because the queues
+are bounded, a slow consumer makes its download wait instead of buffering
+the whole dump in memory.
+"""
+import gzip
+import io
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from moviegraphbenchmark import create_graph, imdb_cache, metrics
+from moviegraphbenchmark.get_imdb_data import uris
+from moviegraphbenchmark.utils import CHUNK_SIZE, get_session
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+# compressed chunks per dump that are buffered between download and decompression
+QUEUE_SIZE = 64
+
+# returns the allowed ids and the directory of the cache, may block until
+# both are known (e.g. until the lists of the repository are downloaded)
+CacheTarget = Callable[[], Tuple[Set[str], str]]
+
+# marks the end of the downloaded bytes in a queue
+_END = None
+
+
+class _Cancelled(Exception):
+    """Raised in the downloads and consumers of all dumps once one of them failed."""
+
+
+def _put(chunks: "queue.Queue", item: Any, cancelled: threading.Event):
+    while True:
+        if cancelled.is_set():
+            raise _Cancelled()
+        try:
+            chunks.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(chunks: "queue.Queue", cancelled: threading.Event) -> Any:
+    while True:
+        if cancelled.is_set():
+            raise _Cancelled()
+        try:
+            return chunks.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+
+def _first_error(futures: Iterable["Future"]) -> Optional[BaseException]:
+    """The error that cancelled the other streams."""
+    for future in futures:
+        error = future.exception()
+        if error is not None and not isinstance(error, _Cancelled):
+            return error
+    return None
+
+
+class _QueueReader(io.RawIOBase):
+    """Binary stream over the bytes a download puts into a queue.
+
+    The first item of the queue is the number of bytes at the start of the
+    ``.part`` file that were downloaded before and are read from disk.
+    Exceptions in the queue are raised in the reader.
+    """
+
+    def __init__(
+        self, chunks: "queue.Queue", cancelled: threading.Event, part_path: str
+    ):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._part_path = part_path
+        self._prefix: Optional[IO[bytes]] = None
+        self._prefix_left = 0
+        self._buffer = memoryview(b"")
+        self._finished = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next(self) -> bool:
+        item = _get(self._chunks, self._cancelled)
+        if item is _END:
+            self._finished = True
+            return False
+        if isinstance(item, BaseException):
+            raise item
+        if isinstance(item, int):
+            if item > 0:
+                self._prefix = open(self._part_path, "rb")
+                self._prefix_left = item
+        else:
+            self._buffer = memoryview(item)
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._prefix is not None:
+                data = self._prefix.read(min(len(buffer), self._prefix_left))
+                if not data:
+                    raise IOError(f"{self._part_path} is shorter than expected")
+                self._prefix_left -= len(data)
+                if self._prefix_left == 0:
+                    self._prefix.close()
+                    self._prefix = None
+                buffer[: len(data)] = data
+                return len(data)
+            if self._buffer:
+                size = min(len(buffer), len(self._buffer))
+                buffer[:size] = self._buffer[:size]
+                self._buffer = self._buffer[size:]
+                return size
+            if self._finished or not self._next():
+                return 0
+
+    def close(self):
+        if self._prefix is not None:
+            self._prefix.close()
+            self._prefix = None
+        super().close()
+
+
+def _download(
+    session: "requests.Session",
+    url: str,
+    part_path: str,
+    chunks: "queue.Queue",
+    cancelled: threading.Event,
+    chunk_size: int,
+    retries: int,
+) -> int:
+    """Append the remaining bytes of a dump to its ``.part`` file and the queue.
+
+    :return: Size of the compressed dump.
+    """
+    import requests
+
+    try:
+        from tqdm import tqdm  # noqa: autoimport
+    except ImportError:
+        tqdm = None
+    bar = None
+    started = False
+    try:
+        for attempt in range(retries + 1):
+            done = metrics.file_size(part_path)
+            headers = {"Range": f"bytes={done}-"} if done > 0 else {}
+            try:
+                with session.get(url, stream=True, headers=headers) as r:
+                    if r.status_code == 416 and done > 0:
+                        # nothing left to download
+                        if not started:
+                            _put(chunks, done, cancelled)
+                        break
+                    r.raise_for_status()
+                    if done > 0 and r.status_code != 206:
+                        if started:
+                            # the decompression already consumed the first bytes
+                            raise IOError(f"{url} does not support range requests")
+                        # the server sends everything, so we start over
+                        done = 0
+                    if not started:
+                        _put(chunks, done, cancelled)
+                        started = True
+                    if bar is None and tqdm is not None:
+                        length = r.headers.get("Content-Length")
+                        bar = tqdm(
+                            unit="B",
+                            unit_scale=True,
+                            unit_divisor=1024,
+                            total=done + int(length) if length else None,
+                            initial=done,
+                            file=sys.stdout,
+                            desc=os.path.basename(url),
+                        )
+                    with open(part_path, "ab" if done > 0 else "wb") as out_file:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            out_file.write(chunk)
+                            _put(chunks, chunk, cancelled)
+                            if bar is not None:
+                                bar.update(len(chunk))
+                break
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                if attempt == retries:
+                    raise
+                logger.info(f"Download of {url} was interrupted, resuming...")
+        _put(chunks, _END, cancelled)
+    except _Cancelled:
+        raise
+    except BaseException as error:
+        try:
+            _put(chunks, error, cancelled)
+        except _Cancelled:
+            pass
+        raise
+    finally:
+        if bar is not None:
+            bar.close()
+    return metrics.file_size(part_path)
+
+
+def _written(lines: Iterable[bytes], out_file: IO[bytes]) -> Iterator[str]:
+    for line in lines:
+        out_file.write(line)
+        yield line.decode("utf8")
+
+
+def _consume(
+    chunks: "queue.Queue",
+    cancelled: threading.Event,
+    part_path: str,
+    dump_path: Optional[str],
+    cache: Optional[CacheTarget],
+    profile: bool = False,
+) -> Tuple[int, int, float]:
+    """Decompress a dump while it is downloaded.
+
+    :param dump_path: Where the decompressed dump is written, None to not keep it.
+    :param cache: Where the allowed rows of the dump are written, if any.
+    :param profile: Count the rows of the dump that are filtered.
+    :return: Number of rows read from the dump (only counted if profiled and
+        filtered) and written into the cache, and CPU time of the thread.
+    """
+    cpu = time.thread_time()
+    filename = os.path.basename(part_path)[: -len(".gz.part")]
+    kept = 0
+    counter = metrics.RowCounter()
+    try:
+        with _QueueReader(chunks, cancelled, part_path) as raw, io.BufferedReader(
+            raw, CHUNK_SIZE
+        ) as reader:
+            if dump_path is None and cache is None:
+                # only the compressed dump is kept, which is on disk already
+                while reader.read(CHUNK_SIZE):
+                    pass
+            else:
+                with gzip.GzipFile(fileobj=reader) as in_file:
+                    if cache is None:
+                        with open(dump_path + ".tmp", "wb") as out_file:
+                            shutil.copyfileobj(in_file, out_file, CHUNK_SIZE)
+                    else:
+                        allowed, cache_dir = cache()
+                        with metrics.counting_rows(profile) as counter:
+                            if dump_path is None:
+                                lines: Iterable[str] = (
+                                    line.decode("utf8") for line in in_file
+                                )
+                                kept = _filter_into(
+                                    lines, allowed, cache_dir, filename
+                                )
+                            else:
+                                with open(dump_path + ".tmp", "wb") as out_file:
+                                    kept = _filter_into(
+                                        _written(in_file, out_file),
+                                        allowed,
+                                        cache_dir,
+                                        filename,
+                                    )
+    except BaseException:
+        # stops the downloads and consumers of all dumps
+        cancelled.set()
+        if dump_path is not None and os.path.exists(dump_path + ".tmp"):
+            os.remove(dump_path + ".tmp")
+        raise
+    if dump_path is not None:
+        os.replace(dump_path + ".tmp", dump_path)
+    return counter.rows, kept, time.thread_time() - cpu
+
+
+def _filter_into(
+    lines: Iterable[str], allowed: Set[str], cache_dir: str, filename: str
+) -> int:
+    return imdb_cache._write_rows(
+        create_graph._filter_rows(
+            metrics.count_rows(lines), imdb_cache._HEADER_PREFIXES[filename], allowed
+        ),
+        cache_dir,
+        filename,
+    )
+
+
+def _once(cache: Optional[CacheTarget]) -> Optional[CacheTarget]:
+    """Call the cache target only once, however many dumps ask for it, and
+    create the cache directory."""
+    if cache is None:
+        return None
+    lock = threading.Lock()
+    result: List[Tuple[Set[str], str]] = []
+
+    def target() -> Tuple[Set[str], str]:
+        with lock:
+            if not result:
+                result.append(cache())
+                os.makedirs(result[0][1], exist_ok=True)
+            return result[0]
+
+    return target
+
+
+def stream_dumps(
+    imdb_path: str,
+    missing: Dict[str, str],
+    keep_compressed: bool = False,
+    cache: Optional[CacheTarget] = None,
+    workers: int = len(uris),
+    queue_size: int = QUEUE_SIZE,
+    chunk_size: int = CHUNK_SIZE,
+    retries: int = 3,
+    on_metrics: Optional[metrics.MetricsCallback] = None,
+):
+    """Download the missing IMDB dumps and decompress (and filter) them on the fly.
+
+    If a cache is built, the dumps that were already present are filtered
+    into it at the same time, so the cache is complete afterwards.
+
+    :param imdb_path: Directory where the dumps are stored.
+    :param missing: Paths of the decompressed dumps by url.
+    :param keep_compressed: Keep the gz archives instead of the decompressed dumps.
+    :param cache: Returns the allowed ids and the cache directory. It is
+        called once, when the first dump is filtered.
+    :param workers: Number of dumps that are streamed at the same time.
+    :param queue_size: Number of chunks buffered per dump.
+    :param chunk_size: Size of the downloaded chunks in bytes.
+    :param retries: How often an interrupted download is resumed.
+    :param on_metrics: Called with the metrics of streaming each dump.
+    """
+    session = get_session()
+    cache = _once(cache)
+    present = [
+        filename
+        for filename in uris.values()
+        if os.path.join(imdb_path, filename) not in missing.values()
+    ]
+    collected: List[metrics.StageMetrics] = []
+    with metrics.stage(on_metrics, "download") as download:
+        with ThreadPoolExecutor(max_workers=2 * max(1, workers)) as executor:
+            streams = []
+            # shared, so the first failure stops all dumps instead of only its own
+            cancelled = threading.Event()
+            for url, filepath in missing.items():
+                chunks: "queue.Queue" = queue.Queue(maxsize=queue_size)
+                part_path = filepath + ".gz.part"
+                downloaded = executor.submit(
+                    _download,
+                    session,
+                    url,
+                    part_path,
+                    chunks,
+                    cancelled,
+                    chunk_size,
+                    retries,
+                )
+                consumed = executor.submit(
+                    _consume,
+                    chunks,
+                    cancelled,
+                    part_path,
+                    None if keep_compressed else filepath,
+                    cache,
+                    on_metrics is not None,
+                )
+                streams.append((filepath, time.perf_counter(), downloaded, consumed))
+            filtered = []
+            if cache is not None:
+                profile = on_metrics is not None
+                filtered = [
+                    executor.submit(
+                        lambda filename: imdb_cache._filter_dump(
+                            imdb_path, filename, *cache(), profile
+                        ),
+                        filename,
+                    )
+                    for filename in present
+                ]
+            for filepath, start, downloaded, consumed in streams:
+                try:
+                    # a failed download also fails its consumer, but not vice versa
+                    scanned, kept, cpu_s = consumed.result()
+                    size = downloaded.result()
+                except _Cancelled as cancellation:
+                    error = _first_error(
+                        future for stream in streams for future in stream[2:]
+                    )
+                    raise cancellation if error is None else error
+                part_path = filepath + ".gz.part"
+                if keep_compressed:
+                    os.replace(part_path, filepath + ".gz")
+                else:
+                    os.remove(part_path)
+                if on_metrics is not None:
+                    written = metrics.file_size(filepath)
+                    if cache is not None:
+                        written += metrics.file_size(
+                            os.path.join(
+                                cache()[1], os.path.basename(filepath) + ".gz"
+                            )
+                        )
+                    collected.append(
+                        metrics.StageMetrics(
+                            f"stream:{os.path.basename(filepath)}",
+                            wall_s=time.perf_counter() - start,
+                            cpu_s=cpu_s,
+                            bytes_read=size,
+                            bytes_written=written,
+                            rows_scanned=scanned,
+                            rows_kept=kept,
+                            peak_memory_mb=metrics.peak_memory_mb(),
+                        )
+                    )
+            for future in filtered:
+                result = future.result()
+                if result is not None:
+                    collected.append(result)
+        if download is not None:
+            download.bytes_read = sum(
+                m.bytes_read for m in collected if m.stage.startswith("stream:")
+            )
+    if cache is not None:
+        imdb_cache.mark_complete(cache()[1])
+    if on_metrics is not None:
+        for result in collected:
+            on_metrics(result)
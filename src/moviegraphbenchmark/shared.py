@@ -0,0 +1,202 @@
+"""Encoded pairs in shared memory or memory mapped files.
+
+A pair is published once as a single buffer and attached by name (or
+path) in worker processes, which get read-only NumPy views of the
+arrays without pickling or parsing anything. The buffer starts with a
+JSON header describing offset, shape and dtype of every array, followed
+by the 64 byte aligned arrays. Vocabularies are stored as utf8 bytes
+with offsets and only turned into ``pd.Index`` when accessed.
+"""
+import json
+import logging
+import os
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from moviegraphbenchmark.encoding import (
+    VOCABULARIES,
+    EncodedERData,
+    _decode_vocabulary,
+    _vocabulary_arrays,
+    flat_arrays,
+    from_flat_arrays,
+)
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+_MAGIC = b"MGBENC01"
+_PREAMBLE = struct.Struct("<8sQ")
+_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _layout(encoded: EncodedERData) -> Tuple[Dict[str, np.ndarray], bytes, int]:
+    arrays = flat_arrays(encoded)
+    for name in VOCABULARIES:
+        offsets, data, null = _vocabulary_arrays(getattr(encoded, name))
+        arrays[f"{name}_offsets"] = offsets
+        arrays[f"{name}_data"] = data
+        arrays[f"{name}_null"] = null
+    # offsets are relative to the end of the header, so it can be built first
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries[name] = {
+            "offset": offset,
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+        }
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({"arrays": entries, "folds": len(encoded.folds)}).encode("utf8")
+    data_start = _align(_PREAMBLE.size + len(header))
+    return arrays, header, data_start + offset
+
+
+def _write(buffer: memoryview, arrays: Dict[str, np.ndarray], header: bytes):
+    _PREAMBLE.pack_into(buffer, 0, _MAGIC, len(header))
+    buffer[_PREAMBLE.size : _PREAMBLE.size + len(header)] = header
+    data_start = _align(_PREAMBLE.size + len(header))
+    entries = json.loads(header)["arrays"]
+    for name, array in arrays.items():
+        start = data_start + entries[name]["offset"]
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=start)
+        view[...] = array
+
+
+class _SharedVocabulary:
+    """Vocabulary that is decoded from the buffer on first access."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            arrays = instance._arrays
+            value = _decode_vocabulary(
+                arrays[f"{self.name}_offsets"],
+                arrays[f"{self.name}_data"],
+                arrays[f"{self.name}_null"],
+            )
+            instance.__dict__[self.name] = value
+            return value
+
+
+class SharedEncodedERData(EncodedERData):
+    """Encoded pair whose arrays are read-only views of a shared buffer.
+
+    Vocabularies are decoded on first access. Call :meth:`close` once the
+    arrays are not used anymore.
+    """
+
+    entities_1 = _SharedVocabulary()
+    entities_2 = _SharedVocabulary()
+    relations_1 = _SharedVocabulary()
+    relations_2 = _SharedVocabulary()
+    attributes_1 = _SharedVocabulary()
+    attributes_2 = _SharedVocabulary()
+    literals_1 = _SharedVocabulary()
+    literals_2 = _SharedVocabulary()
+
+    def __init__(
+        self, buffer: memoryview, closer: Optional[Callable[[], Any]] = None
+    ):
+        magic, header_size = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("Buffer does not contain an encoded pair")
+        header = json.loads(
+            bytes(buffer[_PREAMBLE.size : _PREAMBLE.size + header_size])
+        )
+        data_start = _align(_PREAMBLE.size + header_size)
+        self._arrays = {}
+        # byte offset of each array in the buffer
+        self._offsets = {}
+        for name, entry in header["arrays"].items():
+            self._offsets[name] = data_start + entry["offset"]
+            view = np.ndarray(
+                tuple(entry["shape"]),
+                dtype=np.dtype(entry["dtype"]),
+                buffer=buffer,
+                offset=self._offsets[name],
+            )
+            view.flags.writeable = False
+            self._arrays[name] = view
+        self._closer = closer
+        for name, value in from_flat_arrays(self._arrays, header["folds"]).items():
+            setattr(self, name, value)
+
+    def close(self):
+        """Release the buffer, the arrays must not be used afterwards."""
+        closer = self._closer
+        # views have to be gone before shared memory can be closed
+        self.__dict__.clear()
+        self._arrays = {}
+        self._closer = None
+        if closer is not None:
+            closer()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # attaching must not register the memory with the resource tracker, which
+    # would unlink it when the worker exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def share_encoded(
+    encoded: EncodedERData, name: Optional[str] = None
+) -> shared_memory.SharedMemory:
+    """Publish an encoded pair in shared memory.
+
+    The caller owns the memory and has to ``close()`` and ``unlink()`` it
+    once all workers are done.
+
+    :param encoded: Encoded pair, e.g. from ``load_data(encoded=True)``.
+    :param name: Name of the shared memory, a random one if None.
+    :return: The shared memory, workers attach to it via ``.name``.
+    """
+    arrays, header, size = _layout(encoded)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _write(shm.buf, arrays, header)
+    return shm
+
+
+def attach_shared(name: str) -> SharedEncodedERData:
+    """Attach to an encoded pair published with :func:`share_encoded`."""
+    shm = _attach_shared_memory(name)
+    return SharedEncodedERData(shm.buf, closer=shm.close)
+
+
+def write_mmap(encoded: EncodedERData, path: str):
+    """Write an encoded pair into a file that can be memory mapped."""
+    arrays, header, size = _layout(encoded)
+    tmp_path = path + ".tmp"
+    mapped = np.memmap(tmp_path, dtype=np.uint8, mode="w+", shape=(size,))
+    _write(memoryview(mapped), arrays, header)
+    mapped.flush()
+    del mapped
+    os.replace(tmp_path, path)
+
+
+def open_mmap(path: str) -> SharedEncodedERData:
+    """Memory map a file written with :func:`write_mmap` read-only."""
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    return SharedEncodedERData(memoryview(mapped))
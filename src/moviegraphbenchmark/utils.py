@@ -1,72 +1,376 @@
+import logging
 import os
 import shutil
-from glob import glob
-import zipfile
-import requests
 import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+
+logger = logging.getLogger("moviegraphbenchmark")
+
+CHUNK_SIZE = 1024 * 1024
+# files smaller than this are not split into ranged parts
+MIN_PART_SIZE = 16 * 1024 * 1024
+# members of the release archive at least this large are extracted in parallel
+MIN_PARALLEL_EXTRACT_SIZE = 1024 * 1024
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = 16) -> "requests.Session":
+    """Session that is shared by all downloads, so connections are reused."""
+    # requests is only imported once something is downloaded
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=3, connect=3, backoff_factor=0.5),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _remote_size(
+    session: "requests.Session", url: str
+) -> Tuple[Optional[int], bool]:
+    header = session.head(url, allow_redirects=True)
+    if not header.ok:
+        # some servers reject HEAD requests, the file is then fetched in one GET
+        return None, False
+    try:
+        filesize: Optional[int] = int(header.headers["Content-Length"])
+    except (KeyError, ValueError):
+        filesize = None
+    accept_ranges = header.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return filesize, accept_ranges
+
+
+def _part_path(output_path: str, part: int, num_parts: int) -> str:
+    if num_parts == 1:
+        return output_path + ".part"
+    # the layout is part of the name, so parts of a different split are not mixed
+    return f"{output_path}.part{part}of{num_parts}"
+
+
+def _part_ranges(filesize: int, num_parts: int) -> List[Tuple[int, int]]:
+    part_size = -(-filesize // num_parts)
+    return [
+        (start, min(start + part_size, filesize) - 1)
+        for start in range(0, filesize, part_size)
+    ]
+
+
+class _RangesIgnored(IOError):
+    """Raised if a server answers a range request with the whole file."""
+
+
+def _fetch_part(
+    session: "requests.Session",
+    url: str,
+    part_path: str,
+    byte_range: Optional[Tuple[int, int]],
+    chunk_size: int,
+    progress: Optional[Callable[[int], Any]],
+    retries: int,
+    split: bool = False,
+):
+    """Download (the remaining bytes of) a part and append them to its file.
+
+    :param byte_range: Inclusive first and last byte, None for the whole file
+        of unknown size.
+    :param split: Whether the part is one of several, which must not get
+        the whole file if the server ignores the range.
+    """
+    import requests
+
+    for attempt in range(retries + 1):
+        done = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if byte_range is not None:
+            length = byte_range[1] - byte_range[0] + 1
+            if done == length:
+                return
+            if done > length:
+                done = 0
+        headers = {}
+        if done > 0 or byte_range is not None:
+            start = done if byte_range is None else byte_range[0] + done
+            end = "" if byte_range is None else str(byte_range[1])
+            headers["Range"] = f"bytes={start}-{end}"
+        try:
+            with session.get(url, stream=True, headers=headers) as r:
+                if r.status_code == 416 and byte_range is None and done > 0:
+                    # nothing left to download
+                    return
+                r.raise_for_status()
+                if headers and r.status_code != 206:
+                    if byte_range is not None and (split or byte_range[0] > 0):
+                        raise _RangesIgnored(f"{url} does not support range requests")
+                    # the server sends everything, so we start over
+                    done = 0
+                if progress is not None and done > 0 and attempt == 0:
+                    progress(done)
+                with open(part_path, "ab" if done > 0 else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        if progress is not None:
+                            progress(len(chunk))
+            if byte_range is None:
+                return
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+            logger.info(f"Download of {url} was interrupted, resuming...")
+    if byte_range is not None and os.path.getsize(part_path) != length:
+        raise IOError(f"Could not download bytes {byte_range} of {url}")
+
+
+def download_file(
+    url: str,
+    dl_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    num_parts: int = 4,
+    min_part_size: int = MIN_PART_SIZE,
+    retries: int = 3,
+    session: Optional["requests.Session"] = None,
+) -> str:
+    """Download a file, resuming a previous interrupted download.
 
+    Bytes that were already downloaded are kept in ``.part`` files next to
+    the output. If the server supports range requests large files are
+    split into parts that are fetched in parallel.
 
-def download_file(url: str, dl_path: str, chunk_size: int = 1024):
+    :param url: Url of the file.
+    :param dl_path: Directory the file is stored in.
+    :param chunk_size: Size of the buffer used for streaming.
+    :param num_parts: Maximum number of parts downloaded in parallel.
+    :param min_part_size: Minimum size in bytes of a part.
+    :param retries: How often an interrupted download is resumed.
+    :param session: Session to use, defaults to the shared session.
+    :return: Path of the downloaded file.
+    """
+    session = get_session() if session is None else session
     filename = os.path.basename(url)
-    header = requests.head(url)
     output_path = os.path.join(dl_path, filename)
-    try:
-        filesize = int(header.headers["Content-Length"])
-    except KeyError:
-        filesize = int(header.raw.info()["Content-Length"])
+    filesize, accept_ranges = _remote_size(session, url)
+    if filesize is not None and accept_ranges:
+        num_parts = max(1, min(num_parts, filesize // min_part_size))
+        ranges: List[Optional[Tuple[int, int]]] = list(
+            _part_ranges(filesize, num_parts)
+        )
+    else:
+        num_parts = 1
+        ranges = [None]
+    part_paths = [_part_path(output_path, i, num_parts) for i in range(num_parts)]
     try:
         from tqdm import tqdm  # noqa: autoimport
 
-        with requests.get(url, stream=True) as r, open(output_path, "wb") as f, tqdm(
+        bar = tqdm(
             unit="B",
             unit_scale=True,
             unit_divisor=1024,
             total=filesize,
             file=sys.stdout,
             desc=filename,
-        ) as progress:
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                datasize = f.write(chunk)
-                progress.update(datasize)
+        )
+        progress: Optional[Callable[[int], Any]] = bar.update
     except ImportError:
-        with requests.get(url, stream=True) as r, open(output_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                f.write(chunk)
+        bar = None
+        progress = None
+    ranges_ignored = False
+    try:
+        if num_parts == 1:
+            _fetch_part(
+                session, url, part_paths[0], ranges[0], chunk_size, progress, retries
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=num_parts) as executor:
+                futures = [
+                    executor.submit(
+                        _fetch_part,
+                        session,
+                        url,
+                        part_path,
+                        byte_range,
+                        chunk_size,
+                        progress,
+                        retries,
+                        True,
+                    )
+                    for part_path, byte_range in zip(part_paths, ranges)
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except _RangesIgnored:
+                    ranges_ignored = True
+    finally:
+        if bar is not None:
+            bar.close()
+    if ranges_ignored:
+        # advertised range support, but sent the whole file for a part
+        logger.info(f"{url} ignores range requests, downloading it in one part")
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return download_file(
+            url,
+            dl_path,
+            chunk_size=chunk_size,
+            num_parts=1,
+            retries=retries,
+            session=session,
+        )
+    if num_parts > 1:
+        joined_path = output_path + ".part"
+        with open(joined_path, "wb") as out_file:
+            for part_path in part_paths:
+                with open(part_path, "rb") as in_file:
+                    shutil.copyfileobj(in_file, out_file, chunk_size)
+        for part_path in part_paths:
+            os.remove(part_path)
+    if filesize is not None and os.path.getsize(output_path + ".part") != filesize:
+        os.remove(output_path + ".part")
+        raise IOError(f"Size of {filename} does not match {filesize} bytes")
+    os.replace(output_path + ".part", output_path)
     return output_path
 
 
-def move_recursively_overwrite(src, dst):
-    """Circumvent shutil failing to overwrite dirs by overwriting contents."""
-    # dir exists try to move all inner files and overwrite
-    if os.path.exists(dst) and os.path.isdir(src):
-        for inner in os.listdir(src):
-            move_recursively_overwrite(
-                os.path.join(src, inner), os.path.join(dst, inner)
-            )
-    else:
-        shutil.move(src, dst)
+def download_files(urls: List[str], dl_path: str, workers: int = 4, **kwargs) -> List[str]:
+    """Download several files concurrently over the shared session.
+
+    :param urls: Urls of the files.
+    :param dl_path: Directory the files are stored in.
+    :param workers: Number of files downloaded at the same time.
+    :param kwargs: Passed on to :func:`download_file`.
+    :return: Paths of the downloaded files in the order of the urls.
+    """
+    if workers <= 1 or len(urls) <= 1:
+        return [download_file(url, dl_path, **kwargs) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as executor:
+        futures = [executor.submit(download_file, url, dl_path, **kwargs) for url in urls]
+        return [future.result() for future in futures]
+
+
+def _data_member_path(name: str) -> Optional[str]:
+    """Path inside the data folder of a member of the release archive, if any."""
+    # members are stored below a top level folder like MovieGraphBenchmark-1.0.0
+    parts = name.split("/")
+    if len(parts) < 3 or parts[1] != "data" or not parts[-1]:
+        return None
+    if any(part in ("", ".", "..") for part in parts[2:]):
+        raise IOError(f"Unsafe path {name} in archive")
+    return os.path.join(*parts[2:])
+
+
+def _extract_member(
+    zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, output_path: str, chunk_size: int
+):
+    """Write a member to a temporary file and move it into place."""
+    tmp_path = output_path + ".tmp"
+    with zip_ref.open(info) as in_file, open(tmp_path, "wb") as out_file:
+        shutil.copyfileobj(in_file, out_file, chunk_size)
+    # replaces the name only, so files it was hard linked to stay as they are
+    os.replace(tmp_path, output_path)
+
+
+def _extract_member_from(
+    archive_path: str, info: zipfile.ZipInfo, output_path: str, chunk_size: int
+):
+    # every thread reads through its own handle of the archive
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        _extract_member(zip_ref, info, output_path, chunk_size)
+
+
+def extract_data_folder(
+    archive_path: str,
+    dl_path: str,
+    workers: int = 4,
+    chunk_size: int = CHUNK_SIZE,
+    min_parallel_size: int = MIN_PARALLEL_EXTRACT_SIZE,
+):
+    """Extract the data folder of a release archive of the repository into dl_path.
+
+    Other members are skipped. Every file is written next to its final
+    location and then atomically replaces it, large files are extracted
+    in parallel.
+
+    :param archive_path: Path of the zip archive.
+    :param dl_path: Directory the content of the data folder is extracted to.
+    :param workers: Number of threads extracting large files.
+    :param chunk_size: Size of the buffer used for copying.
+    :param min_parallel_size: Files with at least this many (uncompressed)
+        bytes are extracted in parallel.
+    """
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        members = []
+        for info in zip_ref.infolist():
+            rel_path = _data_member_path(info.filename)
+            if rel_path is None or info.is_dir():
+                continue
+            output_path = os.path.join(dl_path, rel_path)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            members.append((info, output_path))
+        if not members:
+            raise IOError(f"{archive_path} contains no data folder")
+        large = [m for m in members if m[0].file_size >= min_parallel_size]
+        small = [m for m in members if m[0].file_size < min_parallel_size]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # largest first, so the longest extraction does not start last
+            futures = [
+                executor.submit(
+                    _extract_member_from, archive_path, info, output_path, chunk_size
+                )
+                for info, output_path in sorted(
+                    large, key=lambda m: m[0].file_size, reverse=True
+                )
+            ]
+            for info, output_path in small:
+                _extract_member(zip_ref, info, output_path, chunk_size)
+            for future in futures:
+                future.result()
 
 
 def download_github_folder(
     dl_path: str,
     version: str,
     base_url: str = "https://github.com/ScaDS/MovieGraphBenchmark/archive/refs/tags/",
+    archive_dir: Optional[str] = None,
 ):
+    """Download a release of the repository and extract its data folder.
+
+    :param dl_path: Directory the content of the data folder is extracted to.
+    :param version: Version of the release.
+    :param base_url: Url of the release archives.
+    :param archive_dir: If given, the archive is taken from this directory
+        if it was downloaded before, else it is downloaded into it and kept.
+    """
     url = f"{base_url}v{version}.zip"
     if not os.path.exists(dl_path):
         os.makedirs(dl_path)
-    output_path = download_file(url=url, dl_path=dl_path)
-    with zipfile.ZipFile(output_path, "r") as zip_ref:
-        zip_ref.extractall(dl_path)
-    os.remove(output_path)
-
-    # move everything inside data folder
-    zip_folder = list(glob(os.path.join(dl_path, "MovieGraphBenchmark-*")))[0]
-    new_data_path = os.path.join(zip_folder, "data")
-    for file_or_dir in os.listdir(new_data_path):
-        move_recursively_overwrite(
-            os.path.join(new_data_path, file_or_dir), os.path.join(dl_path, file_or_dir)
-        )
-
-    # remove everything else
-    shutil.rmtree(zip_folder)
+    if archive_dir is None:
+        output_path = download_file(url=url, dl_path=dl_path)
+    else:
+        output_path = os.path.join(archive_dir, os.path.basename(url))
+        if os.path.isfile(output_path):
+            logger.info(f"Using archive {output_path}")
+        else:
+            os.makedirs(archive_dir, exist_ok=True)
+            download_file(url=url, dl_path=archive_dir)
+    extract_data_folder(output_path, dl_path)
+    if archive_dir is None:
+        os.remove(output_path)
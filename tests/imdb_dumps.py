@@ -0,0 +1,121 @@
+import gzip
+import os
+import random
+from typing import Dict, List, Set, Tuple
+
+HEADERS = {
+    "name.basics.tsv": [
+        "nconst",
+        "primaryName",
+        "birthYear",
+        "deathYear",
+        "primaryProfession",
+        "knownForTitles",
+    ],
+    "title.basics.tsv": [
+        "tconst",
+        "titleType",
+        "primaryTitle",
+        "originalTitle",
+        "isAdult",
+        "startYear",
+        "endYear",
+        "runtimeMinutes",
+        "genres",
+    ],
+    "title.episode.tsv": ["tconst", "parentTconst", "seasonNumber", "episodeNumber"],
+    "title.principals.tsv": [
+        "tconst",
+        "ordering",
+        "nconst",
+        "category",
+        "job",
+        "characters",
+    ],
+}
+
+TITLE_TYPES = ["movie", "short", "tvMovie", "tvSeries", "tvEpisode", "video", "tvMiniSeries"]
+
+
+def _maybe_missing(rnd: random.Random, value: str) -> str:
+    return "\\N" if rnd.random() < 0.15 else value
+
+
+def _list_value(rnd: random.Random, values: List[str]) -> str:
+    chosen = rnd.sample(values, k=min(len(values), rnd.randint(1, 3)))
+    if rnd.random() < 0.2:
+        return str(chosen)
+    return ",".join(chosen)
+
+
+def write_imdb_dumps(
+    imdb_dir: str, n: int = 300, seed: int = 0, compress: bool = False
+) -> Tuple[Set[str], Set[Tuple[str, str]]]:
+    """Write small IMDB-shaped dumps with roughly n persons and n titles.
+
+    :return: allowed ids and excluded pairs
+    """
+    rnd = random.Random(seed)
+    os.makedirs(imdb_dir, exist_ok=True)
+    names = [f"nm{i:07d}" for i in range(n)]
+    titles = [f"tt{i:07d}" for i in range(n)]
+    allowed = set(rnd.sample(names, n // 2)) | set(rnd.sample(titles, n // 2))
+    rows: Dict[str, List[List[str]]] = {filename: [] for filename in HEADERS}
+    for nm in names:
+        rows["name.basics.tsv"].append(
+            [
+                nm,
+                f"Person {nm}",
+                _maybe_missing(rnd, str(rnd.randint(1900, 2000))),
+                _maybe_missing(rnd, str(rnd.randint(1950, 2020))),
+                _maybe_missing(rnd, _list_value(rnd, ["actor", "writer", "director"])),
+                _maybe_missing(rnd, _list_value(rnd, titles)),
+            ]
+        )
+    for tt in titles:
+        rows["title.basics.tsv"].append(
+            [
+                tt,
+                rnd.choice(TITLE_TYPES),
+                f"Title {tt}",
+                f"Original {tt}",
+                str(rnd.randint(0, 1)),
+                _maybe_missing(rnd, str(rnd.randint(1950, 2020))),
+                _maybe_missing(rnd, str(rnd.randint(1950, 2020))),
+                _maybe_missing(rnd, str(rnd.randint(1, 200))),
+                _maybe_missing(rnd, "Drama,Comedy"),
+            ]
+        )
+        if rnd.random() < 0.3:
+            rows["title.episode.tsv"].append(
+                [
+                    tt,
+                    rnd.choice(titles),
+                    _maybe_missing(rnd, str(rnd.randint(1, 10))),
+                    _maybe_missing(rnd, str(rnd.randint(1, 30))),
+                ]
+            )
+        for ordering in range(rnd.randint(1, 4)):
+            rows["title.principals.tsv"].append(
+                [tt, str(ordering + 1), rnd.choice(names), "actor", "\\N", "\\N"]
+            )
+    # duplicated rows produce duplicated triples
+    rows["title.principals.tsv"].extend(rnd.sample(rows["title.principals.tsv"], 20))
+    exclude = {
+        (row[2], row[0]) for row in rnd.sample(rows["title.principals.tsv"], 10)
+    }
+    for filename, header in HEADERS.items():
+        path = os.path.join(imdb_dir, filename)
+        lines = ["\t".join(header)] + ["\t".join(row) for row in rows[filename]]
+        content = "\n".join(lines) + "\n"
+        if compress:
+            with gzip.open(path + ".gz", "wt", encoding="utf8") as out_file:
+                out_file.write(content)
+        else:
+            with open(path, "w", encoding="utf8") as out_file:
+                out_file.write(content)
+    with open(os.path.join(imdb_dir, "allowed"), "w", encoding="utf8") as out_file:
+        out_file.write("\n".join(sorted(allowed)) + "\n")
+    with open(os.path.join(imdb_dir, "exclude"), "w", encoding="utf8") as out_file:
+        out_file.write("\n".join("\t".join(pair) for pair in sorted(exclude)) + "\n")
+    return allowed, exclude
@@ -0,0 +1,134 @@
+import itertools
+import re
+
+import numpy as np
+import pytest
+from test_encoding import _frame
+
+from moviegraphbenchmark import blocking
+from moviegraphbenchmark.blocking import BLOCKING_PROPERTIES, block, build_index
+from moviegraphbenchmark.loading import ERData, Fold
+
+NAME, TITLE = BLOCKING_PROPERTIES
+STRING = "^^<http://www.w3.org/2001/XMLSchema#string>"
+TRIPLES = ["head", "relation", "tail"]
+LINKS = ["left", "right"]
+
+
+@pytest.fixture
+def data():
+    attr_1 = [
+        ["a1", NAME, "Chae Soo-bin"],
+        ["a2", NAME, "Tom Hanks"],
+        ["a3", TITLE, "The Beginning of the Hunt"],
+        ["a4", TITLE, "Forrest Gump"],
+        ["a4", "year", "1994"],
+        ["a5", NAME, "Zoë Kravitz"],
+        ["a6", NAME, "Tom Cruise"],
+    ]
+    attr_2 = [
+        ["b1", NAME, f"chae soo-bin{STRING}"],
+        ["b2", NAME, f"Tom Hanks{STRING}"],
+        ["b3", TITLE, f'"The Hunt"{STRING}'],
+        ["b4", TITLE, f"Forrest Gump{STRING}"],
+        ["b5", NAME, f"Zoë Saldana{STRING}"],
+        ["b6", "job", "Tom"],
+    ]
+    links = [["a1", "b1"], ["a2", "b2"], ["a3", "b3"], ["a4", "b4"], ["a5", "b6"]]
+    return ERData(
+        attr_triples_1=_frame(attr_1, TRIPLES),
+        attr_triples_2=_frame(attr_2, TRIPLES),
+        rel_triples_1=_frame([["a1", "knows", "a2"]], TRIPLES),
+        rel_triples_2=_frame([["b1", "knows", "b2"]], TRIPLES),
+        ent_links=_frame(links, LINKS),
+        folds=[
+            Fold(
+                train_links=_frame(links[:1], LINKS),
+                test_links=_frame(links[1:4], LINKS),
+                valid_links=_frame(links[4:], LINKS),
+            )
+        ],
+        intra_ent_links=(
+            _frame([], ["a_left", "a_right"]),
+            _frame([], ["b_left", "b_right"]),
+        ),
+    )
+
+
+def _tokens(value, q):
+    value = re.sub(r"\^\^<[^>]*>$", "", value).strip('"').lower()
+    if q is None:
+        return set(re.findall(r"\w+", value))
+    return set(blocking._qgrams(value, q))
+
+
+def _expected(data, q):
+    def entity_tokens(triples):
+        tokens = {}
+        for head, relation, tail in triples.itertuples(index=False):
+            if relation in BLOCKING_PROPERTIES:
+                tokens.setdefault(head, set()).update(_tokens(tail, q))
+        return tokens
+
+    left = entity_tokens(data.attr_triples_1)
+    right = entity_tokens(data.attr_triples_2)
+    return {
+        (e1, e2)
+        for (e1, t1), (e2, t2) in itertools.product(left.items(), right.items())
+        if t1 & t2
+    }
+
+
+def _decode(data, batches):
+    encoded = data.to_encoded()
+    return [
+        (encoded.entities_1[left], encoded.entities_2[right])
+        for batch in batches
+        for left, right in batch
+    ]
+
+
+@pytest.mark.parametrize("q", [None, 3])
+@pytest.mark.parametrize("arrow", [True, False])
+def test_block(data, q, arrow, monkeypatch):
+    if not arrow:
+        monkeypatch.setattr(blocking, "pa", None)
+    candidates = block(data, q=q, max_block_comparisons=None, batch_size=2)
+    assert candidates.report is None
+    batches = list(candidates)
+    assert all(batch.dtype == np.int32 and batch.shape[1] == 2 for batch in batches)
+    pairs = _decode(data, batches)
+    # every pair is emitted once
+    assert len(pairs) == len(set(pairs))
+    expected = _expected(data, q)
+    assert set(pairs) == expected
+    report = candidates.report
+    assert report.num_candidates == len(expected)
+    assert report.num_gold == 5
+    gold = set(data.ent_links.itertuples(index=False))
+    found = expected & gold
+    assert report.num_found == len(found)
+    assert report.pair_completeness == pytest.approx(len(found) / 5)
+    encoded = data.to_encoded()
+    num_pairs = len(encoded.entities_1) * len(encoded.entities_2)
+    assert report.reduction_ratio == pytest.approx(1 - len(expected) / num_pairs)
+
+
+def test_tokens(data):
+    pairs = set(_decode(data, block(data, max_block_comparisons=None)))
+    assert ("a1", "b1") in pairs
+    assert ("a5", "b5") in pairs
+    # only the name and title properties are blocked on
+    assert ("a2", "b6") not in pairs
+
+
+def test_frequent_tokens(data):
+    # "tom" is the only token of a block with two pairs
+    index = build_index(data, max_block_comparisons=1)
+    kept = set(index.tokens[index.left_tokens])
+    assert "tom" not in kept
+    assert {"hanks", "cruise", "hunt"} <= kept
+    pairs = set(_decode(data, block(data, max_block_comparisons=1)))
+    assert ("a2", "b2") in pairs
+    assert ("a6", "b2") not in pairs
+    assert set(_decode(data, block(data, max_block_comparisons=0))) == set()
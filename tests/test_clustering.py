@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pandas as pd
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark.clustering import (
+    connected_components,
+    link_clusters,
+    missing_links,
+    rebuild_clusters,
+    same_clusters,
+)
+from moviegraphbenchmark.create_graph import _create_graph_data
+from moviegraphbenchmark.manifest import verify_manifest
+from moviegraphbenchmark.multi_source import RESOURCE_PREFIXES, read_clusters
+
+
+def _reference_components(left, right, num_nodes):
+    parent = list(range(num_nodes))
+
+    def find(node):
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    for a, b in zip(left, right):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([find(node) for node in range(num_nodes)])
+
+
+def test_connected_components():
+    rng = np.random.default_rng(0)
+    for num_nodes, num_links in [(1, 0), (50, 20), (1000, 900), (1000, 3000)]:
+        left = rng.integers(0, num_nodes, num_links)
+        right = rng.integers(0, num_nodes, num_links)
+        np.testing.assert_array_equal(
+            connected_components(left, right, num_nodes),
+            _reference_components(left, right, num_nodes),
+        )
+    # a long chain in random order
+    order = rng.permutation(10000)
+    roots = connected_components(order[:-1], order[1:], 10000)
+    assert (roots == 0).all()
+
+
+def test_link_clusters_and_missing_links():
+    imdb = RESOURCE_PREFIXES["imdb"]
+    tmdb = RESOURCE_PREFIXES["tmdb"]
+    ent_links = pd.DataFrame(
+        {
+            "left": [f"{imdb}nm1", f"{imdb}nm2", f"{imdb}nm3"],
+            "right": [f"{tmdb}person1", f"{tmdb}person1", f"{tmdb}person3"],
+        }
+    )
+    intra_links = pd.DataFrame({"left": [f"{imdb}nm1"], "right": [f"{imdb}nm2"]})
+    clusters = link_clusters([ent_links, intra_links])
+    assert len(clusters) == 2
+    assert list(clusters.cluster_members(0)) == [
+        f"{imdb}nm1",
+        f"{imdb}nm2",
+        f"{tmdb}person1",
+    ]
+    assert missing_links(clusters, [ent_links, intra_links]).empty
+    missing = missing_links(clusters, [ent_links])
+    assert missing.to_dict("records") == [
+        {"left": f"{imdb}nm1", "right": f"{imdb}nm2"}
+    ]
+    # the link of the tmdb entity comes first, but it is reported on the right
+    missing = missing_links(clusters, [intra_links, ent_links.iloc[[0, 2]]])
+    assert missing.to_dict("records") == [
+        {"left": f"{imdb}nm2", "right": f"{tmdb}person1"}
+    ]
+
+
+def test_rebuild_clusters(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    _create_graph_data(data_path)
+    cluster_path = os.path.join(data_path, "imdb-tvdb", "cluster")
+    multi_source_path = os.path.join(data_path, "multi_source_cluster")
+    original = read_clusters(cluster_path)
+    mtime = os.stat(cluster_path).st_mtime_ns
+
+    missing = rebuild_clusters(data_path)
+    assert all(pairs.empty for pairs in missing.values())
+    # the shipped clusters are complete, so nothing is rewritten
+    assert os.stat(cluster_path).st_mtime_ns == mtime
+
+    # link two clusters of imdb-tvdb
+    first, second = original.cluster_members(0), original.cluster_members(1)
+    links_path = os.path.join(data_path, "imdb-tvdb", "ent_links")
+    imdb = RESOURCE_PREFIXES["imdb"]
+    new_left = [e for e in first if e.startswith(imdb)][0]
+    new_right = [e for e in second if not e.startswith(imdb)][0]
+    with open(links_path, "a", encoding="utf8") as out_file:
+        out_file.write(f"{new_left}\t{new_right}\n")
+
+    missing = rebuild_clusters(data_path, write=False)
+    expected = len(first) * len(second) - 1
+    assert len(missing["imdb-tvdb"]) == expected
+    assert missing["imdb-tmdb"].empty
+    assert same_clusters(read_clusters(cluster_path), original)
+
+    rebuild_clusters(data_path)
+    rebuilt = read_clusters(cluster_path)
+    assert len(rebuilt) == len(original) - 1
+    assert rebuilt.cluster_of(new_left) == rebuilt.cluster_of(new_right)
+    assert set(rebuilt.cluster_members(rebuilt.cluster_of(new_left))) == set(
+        first
+    ) | set(second)
+    multi_source = read_clusters(multi_source_path)
+    assert multi_source.cluster_of(new_left) == multi_source.cluster_of(new_right)
+    # the edited and rebuilt files are recorded in the manifest
+    assert verify_manifest(data_path) == []
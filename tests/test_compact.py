@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark import compact as compact_module
+from moviegraphbenchmark import load_data
+from moviegraphbenchmark.compact import compact_frame, expand_uris
+
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_compact_frame_roundtrip(monkeypatch, use_pyarrow):
+    if not use_pyarrow:
+        monkeypatch.setattr(compact_module, "pa", None)
+    df = pd.DataFrame(
+        {
+            "head": ["https://a.org/r/1", "https://a.org/r#2", np.nan, "local"],
+            "relation": ["https://a.org/p", "https://a.org/p", "q", "q"],
+            "tail": ["some literal", np.nan, "https://a.org/r/", "x"],
+        },
+        dtype=str,
+    )
+    compact = compact_frame(df, ["head"], ["relation"])
+    assert list(compact.columns) == ["head_prefix", "head", "relation", "tail"]
+    assert isinstance(compact["head_prefix"].dtype, pd.CategoricalDtype)
+    assert set(compact["head_prefix"].cat.categories) == {
+        "",
+        "https://a.org/r#",
+        "https://a.org/r/",
+    }
+    assert isinstance(compact["relation"].dtype, pd.CategoricalDtype)
+    assert compact["head"].tolist()[:2] == ["1", "2"]
+    pd.testing.assert_frame_equal(expand_uris(compact), df)
+    # frames that are not compact are returned as they are
+    assert expand_uris(df) is df
+
+
+def test_load_compact(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    ds = load_data("imdb-tvdb", data_path)
+    compact = load_data("imdb-tvdb", data_path, compact=True)
+    assert list(compact.rel_triples_2.columns) == [
+        "head_prefix",
+        "head",
+        "relation",
+        "tail_prefix",
+        "tail",
+    ]
+    assert list(compact.attr_triples_1.columns) == [
+        "head_prefix",
+        "head",
+        "relation",
+        "tail",
+    ]
+    for full, small in [
+        (ds.attr_triples_1, compact.attr_triples_1),
+        (ds.rel_triples_2, compact.rel_triples_2),
+        (ds.ent_links, compact.ent_links),
+        (ds.folds[2].valid_links, compact.folds[2].valid_links),
+        (ds.intra_ent_links[1], compact.intra_ent_links[1]),
+    ]:
+        pd.testing.assert_frame_equal(expand_uris(small), full)
+        assert small.memory_usage(deep=True).sum() < full.memory_usage(deep=True).sum()
+    np.testing.assert_array_equal(
+        compact.to_encoded().rel_triples_2, ds.to_encoded().rel_triples_2
+    )
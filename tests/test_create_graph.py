@@ -0,0 +1,213 @@
+import os
+import random
+from typing import List, Tuple
+
+import pytest
+
+from moviegraphbenchmark import create_graph
+from moviegraphbenchmark.create_graph import (
+    BENCHMARK_RESOURCE_PREFIX,
+    FILE_MAPPINGS,
+    _dedup,
+    _line_aligned_chunks,
+    _parse_tasks,
+    _read_lines_in_range,
+    compile_mapping,
+    create_imdb_graph,
+    create_trips,
+    file_handler_dict,
+    parse_files,
+    property_dict,
+    write_files,
+)
+from imdb_dumps import write_imdb_dumps
+
+
+def _quadratic_dedup(trips: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+    # implementation used up to 1.1.0
+    d = []
+    for t in trips:
+        if t not in d:
+            d.append(t)
+    return d
+
+
+def _random_trips(n: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    rnd = random.Random(seed)
+    return [
+        (
+            f"https://www.scads.de/movieBenchmark/resource/IMDB/nm{rnd.randint(0, 200)}",
+            rnd.choice(["name", "birthYear", "participated_in"]),
+            f"tt{rnd.randint(0, 50)}",
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("max_in_memory", [None, 10, 100, 5000])
+def test_dedup_same_as_quadratic(max_in_memory, tmp_path):
+    trips = _random_trips(3000)
+    expected = _quadratic_dedup(trips)
+    assert len(expected) < len(trips)
+    deduped = _dedup(trips, max_in_memory=max_in_memory, spill_dir=str(tmp_path))
+    assert deduped == expected
+    # spill partitions are cleaned up
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dedup_caps_partitions(monkeypatch, tmp_path):
+    monkeypatch.setattr(create_graph, "MAX_SPILL_PARTITIONS", 3)
+    removed = []
+    remove = os.remove
+
+    def counting_remove(path):
+        removed.append(os.path.basename(path))
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", counting_remove)
+    trips = _random_trips(3000)
+    deduped = _dedup(trips, max_in_memory=10, spill_dir=str(tmp_path))
+    assert deduped == _quadratic_dedup(trips)
+    assert sorted(removed) == ["partition_0", "partition_1", "partition_2", "spool"]
+
+
+def test_dedup_accepts_iterator():
+    trips = _random_trips(500)
+    assert _dedup(iter(trips), max_in_memory=50) == _quadratic_dedup(trips)
+
+
+def test_parse_compressed_same_as_decompressed(tmp_path):
+    plain_dir = str(tmp_path.joinpath("plain"))
+    gz_dir = str(tmp_path.joinpath("gz"))
+    allowed, exclude = write_imdb_dumps(plain_dir)
+    write_imdb_dumps(gz_dir, compress=True)
+    assert not os.path.exists(os.path.join(gz_dir, "title.principals.tsv"))
+    plain_attr, plain_rel = parse_files(plain_dir, allowed, exclude)
+    gz_attr, gz_rel = parse_files(gz_dir, allowed, exclude)
+    assert len(plain_attr) > 0
+    assert len(plain_rel) > 0
+    assert plain_attr == gz_attr
+    assert plain_rel == gz_rel
+
+
+def test_line_aligned_chunks(tmp_path):
+    path = str(tmp_path.joinpath("lines"))
+    lines = [f"line{i}\t{'x' * (i % 7)}\n" for i in range(100)]
+    with open(path, "w", encoding="utf8") as out_file:
+        out_file.write("".join(lines))
+    chunks = _line_aligned_chunks(path, 7)
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == os.path.getsize(path)
+    read = []
+    for byte_range in chunks:
+        read.extend(_read_lines_in_range(path, byte_range))
+    assert read == lines
+
+
+def test_parse_files_parallel_same_as_serial(tmp_path, monkeypatch):
+    imdb_dir = str(tmp_path)
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph._MIN_CHUNK_SIZE", 1024)
+    assert len(_parse_tasks(imdb_dir, workers=3)) > len(file_handler_dict)
+    assert parse_files(imdb_dir, allowed, exclude, workers=3) == parse_files(
+        imdb_dir, allowed, exclude
+    )
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("use_pyarrow", [False, True])
+def test_columnar_engine_same_as_row(tmp_path, monkeypatch, compress, use_pyarrow):
+    if use_pyarrow:
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr("moviegraphbenchmark.columnar.pa_csv", None)
+    imdb_dir = str(tmp_path)
+    allowed, exclude = write_imdb_dumps(imdb_dir, n=500, compress=compress)
+    row_attr, row_rel = parse_files(imdb_dir, allowed, exclude, engine="row")
+    col_attr, col_rel = parse_files(imdb_dir, allowed, exclude, engine="columnar")
+    assert len(row_rel) > 0
+    assert col_attr == row_attr
+    assert col_rel == row_rel
+
+
+def test_columnar_engine_parallel(tmp_path, monkeypatch):
+    imdb_dir = str(tmp_path)
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph._MIN_CHUNK_SIZE", 1024)
+    assert parse_files(
+        imdb_dir, allowed, exclude, workers=3, engine="columnar"
+    ) == parse_files(imdb_dir, allowed, exclude)
+
+
+@pytest.mark.parametrize("dedup_limit", [None, 100])
+def test_create_imdb_graph_same_as_lists(tmp_path, dedup_limit):
+    imdb_dir = str(tmp_path.joinpath("imdb"))
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    list_dir = str(tmp_path.joinpath("lists"))
+    write_files(*parse_files(imdb_dir, allowed, exclude), list_dir)
+    out_folders = [str(tmp_path.joinpath("a")), str(tmp_path.joinpath("b"))]
+    create_imdb_graph(
+        imdb_dir, allowed, exclude, out_folders, dedup_limit=dedup_limit
+    )
+    for out_folder in out_folders:
+        for filename in ["attr_triples_1", "rel_triples_1"]:
+            with open(os.path.join(list_dir, filename), "rb") as expected, open(
+                os.path.join(out_folder, filename), "rb"
+            ) as streamed:
+                assert streamed.read() == expected.read()
+
+
+_CELLS = [
+    "",
+    "\\N",
+    "nm1",
+    "nm2",
+    "tt1",
+    "tt3",
+    "1999",
+    "Some Title",
+    "movie",
+    "tvEpisode",
+    "videoGame",
+    "actor,writer",
+    "['nm1', 'tt1']",
+    "['tt3', 'nm1', 'tt1']",
+    "['actor', 'writer']",
+    "[\"it's\", 'tt1']",
+]
+
+
+def _create_trips_per_column(mapping, row, allowed, exclude):
+    trips = []
+    for column in mapping.columns:
+        s = row[column.subject]
+        p = property_dict[column.prop]
+        if not column.checked:
+            trips.append((column.target, (BENCHMARK_RESOURCE_PREFIX + s, p, column.value)))
+            continue
+        # the title type is the only transformed column
+        p = "titleType" if column.transform is not None else column.prop
+        o = row[column.column] if column.column is not None else column.value
+        for t in create_trips(s, p, o, column.multiple, allowed, exclude, column.dtype):
+            trips.append((column.target, t))
+    return trips
+
+
+@pytest.mark.parametrize("filename", list(FILE_MAPPINGS))
+def test_compiled_mapping_same_as_create_trips(filename):
+    mapping = FILE_MAPPINGS[filename]
+    allowed = {"nm1", "tt1", "tt3"}
+    exclude = {("nm1", "tt1"), ("tt3", "nm1")}
+    width = 1 + max(
+        max(c.subject, -1 if c.column is None else c.column) for c in mapping.columns
+    )
+    transform = compile_mapping(mapping, allowed, exclude)
+    rnd = random.Random(0)
+    written = 0
+    for _ in range(3000):
+        row = [rnd.choice(_CELLS) for _ in range(width)]
+        out = []
+        transform(row, out.append)
+        assert out == _create_trips_per_column(mapping, row, allowed, exclude), row
+        written += len(out)
+    assert written > 0
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark import load_data
+from moviegraphbenchmark.encoding import (
+    VOCABULARIES,
+    encode,
+    load_encoded,
+    save_encoded,
+)
+from moviegraphbenchmark.loading import ERData, Fold
+
+
+def _frame(rows, columns):
+    return pd.DataFrame(rows, columns=columns, dtype=str)
+
+
+@pytest.fixture
+def data():
+    triples = ["head", "relation", "tail"]
+    links = ["left", "right"]
+    return ERData(
+        attr_triples_1=_frame([["a1", "name", "A"], ["a2", "name", "B"]], triples),
+        attr_triples_2=_frame([["b1", "title", "A"], ["b3", "year", "1990"]], triples),
+        rel_triples_1=_frame([["a1", "knows", "a2"], ["a3", "likes", "a1"]], triples),
+        rel_triples_2=_frame([["b2", "knows", "b1"]], triples),
+        ent_links=_frame([["a1", "b1"], ["a2", "b2"], ["a4", "b4"]], links),
+        folds=[
+            Fold(
+                train_links=_frame([["a1", "b1"]], links),
+                test_links=_frame([["a2", "b2"]], links),
+                valid_links=_frame([["a4", "b4"]], links),
+            )
+        ],
+        intra_ent_links=(
+            _frame([["a1", "a5"]], ["a_left", "a_right"]),
+            _frame([["b1", "b3"]], ["b_left", "b_right"]),
+        ),
+    )
+
+
+def _decode(array, vocabularies):
+    return [
+        [vocabulary[i] for i, vocabulary in zip(row, vocabularies)] for row in array
+    ]
+
+
+def test_encode(data):
+    encoded = data.to_encoded()
+    assert data.to_encoded() is encoded
+    assert list(encoded.entities_1) == ["a1", "a2", "a3", "a4", "a5"]
+    assert list(encoded.entities_2) == ["b1", "b2", "b3", "b4"]
+    for array in [encoded.rel_triples_1, encoded.attr_triples_2, encoded.ent_links]:
+        assert array.dtype == np.int32
+    assert encoded.rel_triples_1.shape == (2, 3)
+    assert _decode(
+        encoded.rel_triples_1,
+        [encoded.entities_1, encoded.relations_1, encoded.entities_1],
+    ) == data.rel_triples_1.values.tolist()
+    assert _decode(
+        encoded.attr_triples_2,
+        [encoded.entities_2, encoded.attributes_2, encoded.literals_2],
+    ) == data.attr_triples_2.values.tolist()
+    entity_vocabularies = [encoded.entities_1, encoded.entities_2]
+    assert (
+        _decode(encoded.ent_links, entity_vocabularies)
+        == data.ent_links.values.tolist()
+    )
+    assert (
+        _decode(encoded.folds[0].valid_links, entity_vocabularies)
+        == data.folds[0].valid_links.values.tolist()
+    )
+    assert _decode(
+        encoded.intra_ent_links[1], [encoded.entities_2, encoded.entities_2]
+    ) == [["b1", "b3"]]
+
+
+def test_load_encoded_cached(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    first = load_data("imdb-tvdb", data_path, encoded=True)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should be loaded from the cache")
+
+    monkeypatch.setattr("moviegraphbenchmark.loading.encode", fail)
+    second = load_data("imdb-tvdb", data_path, encoded=True)
+    expected = encode(load_data("imdb-tvdb", data_path))
+    for encoded in [first, second]:
+        for name in ["entities_1", "relations_2", "literals_1"]:
+            assert getattr(encoded, name).equals(getattr(expected, name))
+        np.testing.assert_array_equal(encoded.rel_triples_1, expected.rel_triples_1)
+        np.testing.assert_array_equal(encoded.attr_triples_2, expected.attr_triples_2)
+        np.testing.assert_array_equal(
+            encoded.folds[4].test_links, expected.folds[4].test_links
+        )
+        np.testing.assert_array_equal(
+            encoded.intra_ent_links[1], expected.intra_ent_links[1]
+        )
+
+
+def test_encoded_cache_roundtrip(data, tmpdir):
+    data.attr_triples_1.loc[1, "tail"] = np.nan
+    encoded = encode(data)
+    cache_dir = str(tmpdir)
+    save_encoded(encoded, cache_dir, "key")
+    assert load_encoded(cache_dir, "other") is None
+    loaded = load_encoded(cache_dir, "key")
+    for name in VOCABULARIES:
+        assert getattr(loaded, name).equals(getattr(encoded, name))
+    assert loaded.literals_1.isna().sum() == 1
+    np.testing.assert_array_equal(loaded.attr_triples_1, encoded.attr_triples_1)
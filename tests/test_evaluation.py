@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+from test_encoding import _frame
+
+from moviegraphbenchmark.evaluation import evaluate, evaluate_ranked
+from moviegraphbenchmark.loading import ERData, Fold
+
+LINKS = ["left", "right"]
+
+
+@pytest.fixture
+def data():
+    triples = ["head", "relation", "tail"]
+    entities_1 = [f"a{i}" for i in range(1, 9)]
+    entities_2 = [f"b{i}" for i in range(1, 9)]
+    links = [[f"a{i}", f"b{i}"] for i in range(1, 7)]
+    return ERData(
+        attr_triples_1=_frame([[e, "name", e.upper()] for e in entities_1], triples),
+        attr_triples_2=_frame([[e, "name", e.upper()] for e in entities_2], triples),
+        rel_triples_1=_frame([["a1", "knows", "a2"]], triples),
+        rel_triples_2=_frame([["b1", "knows", "b2"]], triples),
+        ent_links=_frame(links + [["a7", "b6"]], LINKS),
+        folds=[
+            Fold(
+                train_links=_frame(links[:2], LINKS),
+                test_links=_frame(links[2:5], LINKS),
+                valid_links=_frame([["a7", "b6"]], LINKS),
+            ),
+            Fold(
+                train_links=_frame(links[4:6], LINKS),
+                test_links=_frame(links[:3], LINKS),
+                valid_links=_frame(links[3:4], LINKS),
+            ),
+        ],
+        # a6 and a7 are the same entity, so a6 b6 and a7 b6 are one link
+        intra_ent_links=(
+            _frame([["a6", "a7"]], ["a_left", "a_right"]),
+            _frame([["b7", "b8"]], ["b_left", "b_right"]),
+        ),
+    )
+
+
+def test_evaluate(data):
+    predictions = _frame(
+        [["a1", "b1"], ["a3", "b3"], ["a3", "b3"], ["a4", "b5"], ["x", "b1"]], LINKS
+    )
+    first, second = evaluate(data, predictions)
+    # a1 b1 is a train link of the first fold and ignored, like x b1
+    assert (first.true_positives, first.num_predicted, first.num_gold) == (1, 2, 3)
+    assert first.precision == pytest.approx(1 / 2)
+    assert first.recall == pytest.approx(1 / 3)
+    assert first.f1 == pytest.approx(2 / 5)
+    # a4 is a valid entity of the second fold
+    assert (second.true_positives, second.num_predicted, second.num_gold) == (2, 3, 3)
+
+    all_links = evaluate(data, predictions, split="all")
+    assert len(all_links) == 1
+    assert all_links[0].true_positives == 2
+    assert all_links[0].num_predicted == 4
+    assert all_links[0].num_gold == 6
+
+
+def test_evaluate_unknown_duplicates(data):
+    predictions = _frame(
+        [["a3", "b3"], ["x", "b3"], ["x", "b3"], ["x", "y"], ["x", "y"], ["a1", "z"]],
+        LINKS,
+    )
+    first, second = evaluate(data, predictions)
+    # a1 z is ignored in the first fold, where a1 is a train entity
+    assert (first.true_positives, first.num_predicted) == (1, 3)
+    assert (second.true_positives, second.num_predicted) == (1, 4)
+
+
+def test_evaluate_intra_links(data):
+    predictions = _frame([["a7", "b6"], ["a6", "b6"]], LINKS)
+    first = evaluate(data, predictions, split="valid")[0]
+    assert (first.true_positives, first.num_predicted, first.num_gold) == (1, 1, 1)
+    first = evaluate(data, predictions, split="valid", honor_intra=False)[0]
+    assert (first.true_positives, first.num_predicted, first.num_gold) == (1, 2, 1)
+
+
+def _reference(data, predictions, split):
+    scores = []
+    for fold in data.folds:
+        gold = set(getattr(fold, f"{split}_links").itertuples(index=False))
+        known_1, known_2 = set(), set()
+        for other in ["train", "test", "valid"]:
+            if other != split:
+                links = getattr(fold, f"{other}_links")
+                known_1.update(links["left"])
+                known_2.update(links["right"])
+        predicted = {
+            (left, right)
+            for left, right in predictions
+            if left not in known_1 and right not in known_2
+        }
+        scores.append((len(predicted & gold), len(predicted), len(gold)))
+    return scores
+
+
+def test_evaluate_inputs(data, tmp_path):
+    rng = np.random.default_rng(0)
+    left = rng.integers(1, 9, 200)
+    right = rng.integers(1, 9, 200)
+    uris = list(zip([f"a{i}" for i in left], [f"b{i}" for i in right]))
+    expected = _reference(data, uris, "test")
+
+    def counts(scores):
+        return [(s.true_positives, s.num_predicted, s.num_gold) for s in scores]
+
+    frame = pd.DataFrame(uris, columns=LINKS)
+    assert counts(evaluate(data, frame, honor_intra=False)) == expected
+    path = tmp_path / "predictions"
+    frame.to_csv(path, sep="\t", header=False, index=False)
+    assert counts(evaluate(data, path, honor_intra=False, chunk_size=7)) == expected
+    encoded = data.to_encoded()
+    ids = np.stack(
+        [
+            encoded.entities_1.get_indexer(frame["left"]),
+            encoded.entities_2.get_indexer(frame["right"]),
+        ],
+        axis=1,
+    )
+    assert counts(evaluate(encoded, ids, honor_intra=False)) == expected
+    assert counts(evaluate(data, (ids[:, 0], ids[:, 1]), honor_intra=False)) == expected
+
+
+def test_evaluate_ranked(data, tmp_path):
+    candidates = pd.DataFrame(
+        [
+            ["a3", "b1", 0.9],
+            ["a3", "b3", 0.5],
+            ["a4", "b4", 0.8],
+            ["a4", "b2", 0.1],
+            ["a5", "b1", 0.7],
+            ["a5", "b2", 0.7],
+            ["a5", "b5", 0.7],
+            ["a6", "b6", 0.9],
+        ],
+        columns=["left", "right", "score"],
+    )
+    first, second = evaluate_ranked(data, candidates, ks=[1, 2])
+    # ranks of the test links of the first fold: a3 2, a4 1, a5 3
+    assert first["hits@1"] == pytest.approx(1 / 3)
+    assert first["hits@2"] == pytest.approx(2 / 3)
+    assert first["mrr"] == pytest.approx((1 / 2 + 1 + 1 / 3) / 3)
+    # a6 b6 is found as a7 b6
+    assert evaluate_ranked(data, candidates, split="valid")[0]["hits@1"] == 1
+    # only a3 b3 of the second fold is found
+    assert second["hits@2"] == pytest.approx(1 / 3)
+    assert second["mrr"] == pytest.approx(1 / 2 / 3)
+
+    path = tmp_path / "candidates"
+    candidates.to_csv(path, sep="\t", header=False, index=False)
+    assert evaluate_ranked(data, path, ks=[1, 2], chunk_size=3) == [first, second]
+    # without scores the candidates are ranked in the given order
+    unscored = candidates.sort_values("score", ascending=False, kind="stable")
+    assert evaluate_ranked(data, unscored[LINKS], ks=[1, 2]) == [first, second]
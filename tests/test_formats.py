@@ -0,0 +1,155 @@
+import gzip
+import json
+import os
+import re
+import shutil
+
+import pandas as pd
+import pytest
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from imdb_dumps import write_imdb_dumps
+from moviegraphbenchmark import load_data
+from moviegraphbenchmark.create_graph import (
+    DTYPE_DATE,
+    DTYPE_NON_NEG_INT,
+    _create_graph_data,
+    create_imdb_graph,
+)
+from moviegraphbenchmark.formats import (
+    OUTPUT_FORMATS,
+    TripleWriter,
+    detect_format,
+    nt_line,
+    nt_to_tsv,
+)
+from moviegraphbenchmark.loading import _read
+from moviegraphbenchmark.manifest import MANIFEST_NAME, verify_manifest
+
+IRIREF = r'<(?:[^\x00-\x20<>"{}|^`\\]|\\u[0-9A-F]{4})*>'
+LITERAL = r'"(?:[^"\\\n\r]|\\[tbnrf"\'\\]|\\u[0-9A-F]{4})*"'
+NT_LINE = re.compile(
+    rf"{IRIREF} {IRIREF} (?:{IRIREF}|{LITERAL}(?:\^\^{IRIREF})?) \.\n"
+)
+COLUMNS = ["head", "relation", "tail"]
+
+
+def _importorskip(output_format):
+    if output_format == "tsv.zst":
+        pytest.importorskip("zstandard")
+    elif output_format == "parquet":
+        pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_read_any_format(output_format, tmp_path):
+    _importorskip(output_format)
+    imdb_dir = str(tmp_path / "imdb")
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    expected_dir = str(tmp_path / "expected")
+    create_imdb_graph(imdb_dir, allowed, exclude, [expected_dir])
+    out_dirs = [str(tmp_path / "out"), str(tmp_path / "linked")]
+    counts = create_imdb_graph(
+        imdb_dir, allowed, exclude, out_dirs, output_format=output_format
+    )
+    for filename, count in zip(["attr_triples_1", "rel_triples_1"], counts):
+        expected = _read(os.path.join(expected_dir, filename), COLUMNS)
+        for out_dir in out_dirs:
+            path = os.path.join(out_dir, filename)
+            assert detect_format(path) == output_format
+            pd.testing.assert_frame_equal(_read(path, COLUMNS), expected)
+        assert len(expected) == count
+
+
+def test_nt_is_valid(tmp_path):
+    imdb_dir = str(tmp_path / "imdb")
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    out_dir = str(tmp_path / "out")
+    create_imdb_graph(imdb_dir, allowed, exclude, [out_dir], output_format="nt")
+    with open(os.path.join(out_dir, "attr_triples_1"), encoding="utf8") as in_file:
+        lines = in_file.readlines()
+    for line in lines:
+        assert NT_LINE.fullmatch(line), line
+    for dtype in [DTYPE_DATE, DTYPE_NON_NEG_INT]:
+        assert any(line.endswith(f"^^{dtype} .\n") for line in lines)
+
+
+@pytest.mark.parametrize(
+    "triple",
+    [
+        ("https://www.imdb.com/name/nm0000001", "http://xmlns.com/foaf/0.1/name", "A"),
+        ("https://www.imdb.com/title/tt0000001", "http://ex.org/p", "http://ex.org/o"),
+        ("http://ex.org/s", "http://ex.org/p", f'"1999-01-01"^^{DTYPE_DATE}'),
+        ("http://ex.org/s", "http://ex.org/p", f'"12"^^{DTYPE_NON_NEG_INT}'),
+        ("http://ex.org/s", "http://ex.org/p", 'say "hi" \\ to <them>'),
+        ("http://ex.org/s", "http://ex.org/p", f'"a "quoted" title"^^{DTYPE_DATE}'),
+        ("http://ex.org/s", "http://ex.org/p", "http://ex.org/with space"),
+        ("http://ex.org/a b", "http://ex.org/p{1}", "\\N"),
+    ],
+)
+def test_nt_round_trip(triple):
+    line = nt_line(triple)
+    assert NT_LINE.fullmatch(line), line
+    assert list(nt_to_tsv([line])) == ["\t".join(triple) + "\n"]
+
+
+def test_empty_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "attr_triples_1")
+    with TripleWriter(path, "parquet"):
+        pass
+    assert detect_format(path) == "parquet"
+    assert len(_read(path, COLUMNS)) == 0
+
+
+def test_parquet_values_as_tsv(tmp_path):
+    pytest.importorskip("pyarrow")
+    tails = ['"a"^^<x>', '"a""b"^^<x>', 'x"y', '"a"b"c', '""', '"NA"', "NA", "", "null"]
+    triples = [("h", "r", tail) for tail in tails]
+    paths = {}
+    for output_format in ["tsv", "parquet"]:
+        paths[output_format] = str(tmp_path / output_format)
+        with TripleWriter(paths[output_format], output_format) as writer:
+            writer.write(triples)
+    pd.testing.assert_frame_equal(
+        _read(paths["parquet"], COLUMNS), _read(paths["tsv"], COLUMNS)
+    )
+
+
+def test_detect_tsv_starting_like_nt(tmp_path):
+    path = str(tmp_path / "rel_triples_1")
+    with TripleWriter(path) as writer:
+        writer.write([("<a>", "<b>", "<c> .")])
+    assert detect_format(path) == "tsv"
+    assert _read(path, COLUMNS).values.tolist() == [["<a>", "<b>", "<c> ."]]
+
+
+def test_create_graph_data_keeps_format(monkeypatch, tmp_path):
+    data_path = tmp_path / "data"
+    data_path.mkdir()
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    _create_graph_data(str(data_path), use_cache=False)
+    _create_graph_data(str(data_path), use_cache=False, output_format="tsv.gz")
+    attr_path = data_path / "imdb-tmdb" / "attr_triples_1"
+    assert detect_format(str(attr_path)) == "tsv.gz"
+    with open(data_path / MANIFEST_NAME, encoding="utf8") as in_file:
+        manifest = json.load(in_file)
+    assert manifest["stages"]["imdb_graph"]["inputs"]["format"] == "tsv.gz"
+    assert verify_manifest(str(data_path)) == []
+    # without a format the existing graph is current and not rebuilt
+    mtime = os.path.getmtime(attr_path)
+    _create_graph_data(str(data_path), use_cache=False)
+    assert os.path.getmtime(attr_path) == mtime
+    data = load_data("imdb-tvdb", data_path, use_cache=False)
+    for name in ["attr_triples_1", "rel_triples_1"]:
+        tsv_path = str(tmp_path / name)
+        with gzip.open(data_path / "imdb-tvdb" / name) as in_file, open(
+            tsv_path, "wb"
+        ) as out_file:
+            shutil.copyfileobj(in_file, out_file)
+        pd.testing.assert_frame_equal(getattr(data, name), _read(tsv_path, COLUMNS))
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+import pytest
+
+from moviegraphbenchmark import frame_cache
+from moviegraphbenchmark.frame_cache import cached_read, frame_cache_path
+from moviegraphbenchmark.loading import _read
+
+pytest.importorskip("pyarrow")
+
+NAMES = ["head", "relation", "tail"]
+
+
+@pytest.fixture
+def tsv(tmp_path):
+    path = tmp_path / "rel_triples_1"
+    path.write_text("a\tp\tb\nc\tq\td\n", encoding="utf8")
+    return str(path)
+
+
+def _counting_read(calls):
+    def read(path, names):
+        calls.append(path)
+        return _read(path, names)
+
+    return read
+
+
+def test_cached_read(tsv, tmp_path):
+    calls = []
+    read = _counting_read(calls)
+    first = cached_read(tsv, NAMES, str(tmp_path), read)
+    assert os.path.isfile(frame_cache_path(str(tmp_path), tsv))
+    second = cached_read(tsv, NAMES, str(tmp_path), read)
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(second, _read(tsv, NAMES))
+    assert len(calls) == 1
+
+
+def test_cache_invalidation(tsv, tmp_path, monkeypatch):
+    calls = []
+    read = _counting_read(calls)
+    cached_read(tsv, NAMES, str(tmp_path), read)
+    # touching the file only leads to hashing it
+    stat = os.stat(tsv)
+    os.utime(tsv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cached_read(tsv, NAMES, str(tmp_path), read)
+    assert len(calls) == 1
+    hashed = []
+    monkeypatch.setattr(
+        frame_cache, "sha256_file", lambda path: hashed.append(path) or ""
+    )
+    cached_read(tsv, NAMES, str(tmp_path), read)
+    assert hashed == []
+    monkeypatch.undo()
+    # same size and mtime but changed content is caught by the hash
+    with open(tsv, "w", encoding="utf8") as out_file:
+        out_file.write("a\tp\tx\nc\tq\td\n")
+    os.utime(tsv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    df = cached_read(tsv, NAMES, str(tmp_path), read)
+    assert len(calls) == 2
+    assert df["tail"].tolist() == ["x", "d"]
+    # other column names are not served from the cache
+    cached_read(tsv, ["left", "relation", "right"], str(tmp_path), read)
+    assert len(calls) == 3
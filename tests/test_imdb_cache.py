@@ -0,0 +1,42 @@
+import os
+
+from moviegraphbenchmark.create_graph import parse_files
+from moviegraphbenchmark.imdb_cache import (
+    build_filtered_cache,
+    cache_key,
+    filtered_cache_dir,
+    is_cached,
+    remove_dumps,
+)
+from imdb_dumps import write_imdb_dumps
+
+
+def test_parse_cache_same_as_dumps(tmp_path):
+    imdb_dir = str(tmp_path)
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    expected = parse_files(imdb_dir, allowed, exclude)
+    key = cache_key(
+        os.path.join(imdb_dir, "allowed"), os.path.join(imdb_dir, "exclude")
+    )
+    cache_dir = filtered_cache_dir(imdb_dir, key)
+    assert not is_cached(cache_dir)
+    build_filtered_cache(imdb_dir, allowed, cache_dir)
+    assert is_cached(cache_dir)
+    remove_dumps(imdb_dir)
+    assert not os.path.exists(os.path.join(imdb_dir, "title.principals.tsv"))
+    assert parse_files(cache_dir, allowed, exclude) == expected
+    assert parse_files(cache_dir, allowed, exclude, engine="columnar") == expected
+
+
+def test_cache_key_depends_on_allowed(tmp_path):
+    allowed_path = str(tmp_path.joinpath("allowed"))
+    exclude_path = str(tmp_path.joinpath("exclude"))
+    with open(exclude_path, "w") as out_file:
+        out_file.write("nm1\ttt1\n")
+    with open(allowed_path, "w") as out_file:
+        out_file.write("nm1\n")
+    key = cache_key(allowed_path, exclude_path)
+    assert key == cache_key(allowed_path, exclude_path)
+    with open(allowed_path, "a") as out_file:
+        out_file.write("tt1\n")
+    assert key != cache_key(allowed_path, exclude_path)
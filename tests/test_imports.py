@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ["click", "numpy", "pandas", "pyarrow", "requests"]
+
+
+def _loaded_after(code: str):
+    script = (
+        f"import json, logging, sys\n{code}\n"
+        f"print(json.dumps([[m for m in {HEAVY!r} if m in sys.modules],"
+        " len(logging.getLogger().handlers)]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "code, allowed",
+    [
+        ("import moviegraphbenchmark", []),
+        ("import moviegraphbenchmark.create_graph", []),
+        ("from moviegraphbenchmark.get_imdb_data import uris", []),
+        ("import moviegraphbenchmark.cli", ["click"]),
+    ],
+)
+def test_imports_are_cheap(code, allowed):
+    loaded, root_handlers = _loaded_after(code)
+    assert loaded == allowed
+    # importing must not configure logging
+    assert root_handlers == 0
+
+
+def test_lazy_attributes():
+    import moviegraphbenchmark
+    from moviegraphbenchmark import create_graph
+    from moviegraphbenchmark.cli import create_graph_data
+    from moviegraphbenchmark.loading import load_data
+
+    assert moviegraphbenchmark.load_data is load_data
+    assert "load_multi_source" in dir(moviegraphbenchmark)
+    assert isinstance(moviegraphbenchmark.__version__, str)
+    # the old location of the command still works
+    assert create_graph.create_graph_data is create_graph_data
+    with pytest.raises(AttributeError):
+        moviegraphbenchmark.missing
@@ -0,0 +1,61 @@
+import pandas as pd
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark import load_data
+from moviegraphbenchmark import loading
+from moviegraphbenchmark.loading import ERData, Fold, LazyERData, LazyFold
+
+
+def test_lazy_load(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    eager = load_data("imdb-tvdb", data_path, use_cache=False)
+    # do not share the frames of the KGs with the eagerly loaded data
+    loading._kg_frames.clear()
+
+    read_paths = []
+    original_read = loading._read
+
+    def counting_read(path, names):
+        read_paths.append(path)
+        return original_read(path, names)
+
+    monkeypatch.setattr(loading, "_read", counting_read)
+    lazy = load_data("imdb-tvdb", data_path, use_cache=False, lazy=True)
+    assert isinstance(lazy, ERData) and isinstance(lazy, LazyERData)
+    assert isinstance(lazy.folds[0], Fold) and isinstance(lazy.folds[0], LazyFold)
+    assert read_paths == []
+    # neither repr nor comparison reads files
+    assert "attr_triples_1=<pending>" in repr(lazy)
+    assert "train_links=<pending>" in repr(lazy.folds[0])
+    assert lazy == lazy and lazy.folds[0] != lazy.folds[1]
+    assert read_paths == []
+
+    pd.testing.assert_frame_equal(lazy.rel_triples_1, eager.rel_triples_1)
+    pd.testing.assert_frame_equal(lazy.folds[0].train_links, eager.folds[0].train_links)
+    lazy.rel_triples_1
+    lazy.folds[0].train_links
+    assert len(read_paths) == 2
+    assert "rel_triples_1=<pending>" not in repr(lazy)
+    assert "attr_triples_1=<pending>" in repr(lazy)
+    assert len(read_paths) == 2
+
+    lazy.preload()
+    # 5 triple and link files, 2 intra links files and 15 fold files
+    assert len(read_paths) == 22
+    for name in ["attr_triples_1", "attr_triples_2", "rel_triples_2", "ent_links"]:
+        pd.testing.assert_frame_equal(getattr(lazy, name), getattr(eager, name))
+    for lazy_intra, eager_intra in zip(lazy.intra_ent_links, eager.intra_ent_links):
+        pd.testing.assert_frame_equal(lazy_intra, eager_intra)
+    for lazy_fold, eager_fold in zip(lazy.folds, eager.folds):
+        for name in ["train_links", "test_links", "valid_links"]:
+            pd.testing.assert_frame_equal(
+                getattr(lazy_fold, name), getattr(eager_fold, name)
+            )
+    lazy.preload()
+    assert len(read_paths) == 22
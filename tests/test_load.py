@@ -4,11 +4,13 @@ from shutil import copyfile
 import pathlib
 import random
 from typing import Set
-from moviegraphbenchmark import load_data
+import pandas as pd
+from moviegraphbenchmark import load_data, loading
 from moviegraphbenchmark.create_graph import (
     get_allowed,
     get_excluded,
     _create_data_path,
+    link_identical_kg_files,
     parse_files,
 )
 import os
@@ -26,7 +28,9 @@ def noop(*args, **kwargs):
     return
 
 
-def mock_read_row_tuples(path: str, exclusion: str, allowed: Set[str]):
+def mock_read_row_tuples(
+    path: str, exclusion: str, allowed: Set[str], byte_range=None
+):
     if "name.basics.tsv" in path:
         for ent in allowed_name:
             yield [
@@ -221,3 +225,64 @@ def test_load_mocked_downloads(pair, monkeypatch, tmpdir):
         assert not fold.train_links.empty
         assert not fold.valid_links.empty
     assert not ds.ent_links.empty
+
+
+def test_shared_imdb_kg(monkeypatch, tmpdir):
+    data_path = tmpdir.mkdir("data")
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    imdb_tmdb = load_data(pair="imdb-tmdb", data_path=data_path)
+    for filename in ["attr_triples_1", "rel_triples_1"]:
+        assert os.path.samefile(
+            os.path.join(data_path, "imdb-tmdb", filename),
+            os.path.join(data_path, "imdb-tvdb", filename),
+        )
+    read_paths = []
+    original_read = loading._read
+
+    def counting_read(path, names):
+        read_paths.append(os.path.relpath(path, data_path))
+        return original_read(path, names)
+
+    monkeypatch.setattr(loading, "_read", counting_read)
+    imdb_tvdb = load_data(pair="imdb-tvdb", data_path=data_path, use_cache=False)
+    assert read_paths
+    # the linked KG is not parsed again
+    assert not any(path.endswith("_triples_1") for path in read_paths)
+    pd.testing.assert_frame_equal(imdb_tvdb.attr_triples_1, imdb_tmdb.attr_triples_1)
+    # but changing the frames of one pair does not change the other
+    imdb_tvdb.rel_triples_1["added"] = 1
+    imdb_tvdb.attr_triples_1.loc[0, "tail"] = "changed"
+    imdb_tvdb.attr_triples_1.drop(columns="relation", inplace=True)
+    assert list(imdb_tmdb.rel_triples_1.columns) == ["head", "relation", "tail"]
+    assert list(imdb_tmdb.attr_triples_1.columns) == ["head", "relation", "tail"]
+    assert imdb_tmdb.attr_triples_1.loc[0, "tail"] != "changed"
+    assert load_data(pair="imdb-tmdb", data_path=data_path).attr_triples_1.equals(
+        imdb_tmdb.attr_triples_1
+    )
+
+
+def test_link_identical_kg_files(tmpdir):
+    data_path = str(tmpdir)
+    for location, content in [
+        ("imdb-tvdb/rel_triples_2", "a\tb\tc\n"),
+        ("tmdb-tvdb/rel_triples_2", "a\tb\tc\n"),
+        ("imdb-tvdb/attr_triples_2", "a\tb\tc\n"),
+        ("tmdb-tvdb/attr_triples_2", "a\tb\td\n"),
+    ]:
+        os.makedirs(os.path.join(data_path, os.path.dirname(location)), exist_ok=True)
+        with open(os.path.join(data_path, location), "w") as out_file:
+            out_file.write(content)
+    link_identical_kg_files(data_path)
+    assert os.path.samefile(
+        os.path.join(data_path, "imdb-tvdb/rel_triples_2"),
+        os.path.join(data_path, "tmdb-tvdb/rel_triples_2"),
+    )
+    assert not os.path.samefile(
+        os.path.join(data_path, "imdb-tvdb/attr_triples_2"),
+        os.path.join(data_path, "tmdb-tvdb/attr_triples_2"),
+    )
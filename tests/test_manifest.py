@@ -0,0 +1,88 @@
+import os
+
+import pytest
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark.create_graph import IMDB_GRAPH_OUTPUTS, _create_graph_data
+from moviegraphbenchmark.manifest import (
+    MANIFEST_NAME,
+    load_manifest,
+    record_stage,
+    save_manifest,
+    stage_is_current,
+    verify_manifest,
+    verify_stage,
+)
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    data_path = str(tmp_path)
+    for name, content in [("a", "1\t2\n"), ("b", "3\t4\n5\t6\n")]:
+        with open(os.path.join(data_path, name), "w") as out_file:
+            out_file.write(content)
+    manifest = load_manifest(data_path)
+    record_stage(manifest, "stage", {"version": "1"}, data_path, ["a", "b"])
+    save_manifest(data_path, manifest)
+    return data_path
+
+
+def test_manifest_roundtrip(recorded):
+    manifest = load_manifest(recorded)
+    assert set(manifest["stages"]["stage"]["outputs"]) == {"a", "b"}
+    assert stage_is_current(manifest, "stage", {"version": "1"}, recorded)
+    assert not stage_is_current(manifest, "stage", {"version": "2"}, recorded)
+    assert not stage_is_current(manifest, "other", {"version": "1"}, recorded)
+    assert verify_manifest(recorded) == []
+
+
+def test_manifest_detects_damage(recorded):
+    manifest = load_manifest(recorded)
+    with open(os.path.join(recorded, "b"), "r+") as out_file:
+        out_file.truncate(6)
+    assert len(verify_stage(manifest, "stage", recorded)) == 1
+    assert not stage_is_current(manifest, "stage", {"version": "1"}, recorded)
+    # same size but different content is only found with the checksums
+    with open(os.path.join(recorded, "b"), "w") as out_file:
+        out_file.write("3\t4\n5\t7\n")
+    assert verify_stage(manifest, "stage", recorded) == []
+    assert verify_manifest(recorded, check_hashes=True) == ["b: checksum mismatch"]
+    os.remove(os.path.join(recorded, "a"))
+    assert "a: missing" in verify_manifest(recorded)
+
+
+def test_rebuild_only_damaged_stage(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    _create_graph_data(data_path)
+    manifest = load_manifest(data_path)
+    assert set(manifest["stages"]) == {"github", "imdb_graph"}
+    assert set(manifest["stages"]["imdb_graph"]["outputs"]) == set(IMDB_GRAPH_OUTPUTS)
+    assert MANIFEST_NAME not in manifest["stages"]["github"]["outputs"]
+    assert verify_manifest(data_path) == []
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should not be called")
+
+    # intact data is not touched again
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.create_imdb_graph", fail)
+    _create_graph_data(data_path)
+
+    # a truncated graph is rebuilt without downloading anything
+    monkeypatch.undo()
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", fail)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    rel_path = os.path.join(data_path, "imdb-tmdb", "rel_triples_1")
+    with open(rel_path, "r+") as out_file:
+        out_file.truncate(os.path.getsize(rel_path) // 2)
+    assert verify_manifest(data_path) != []
+    _create_graph_data(data_path)
+    assert verify_manifest(data_path) == []
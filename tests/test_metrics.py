@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+
+import pytest
+from click.testing import CliRunner
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from imdb_dumps import HEADERS, write_imdb_dumps
+from moviegraphbenchmark import create_graph, load_data
+from moviegraphbenchmark.cli import create_graph_data
+from moviegraphbenchmark.create_graph import create_imdb_graph
+
+
+def _lines(path):
+    with open(path, encoding="utf8") as in_file:
+        return in_file.read().splitlines()
+
+
+@pytest.mark.parametrize(
+    "engine, workers", [("row", 1), ("columnar", 1), ("row", 2), ("columnar", 2)]
+)
+def test_create_imdb_graph_metrics(engine, workers, tmp_path, monkeypatch):
+    # several chunks per file, whose metrics are added up
+    monkeypatch.setattr(create_graph, "_MIN_CHUNK_SIZE", 1024)
+    imdb_dir = str(tmp_path / "imdb")
+    allowed, exclude = write_imdb_dumps(imdb_dir)
+    expected_dir = str(tmp_path / "expected")
+    create_imdb_graph(imdb_dir, allowed, exclude, [expected_dir])
+    collected = []
+    out_dir = str(tmp_path / "out")
+    attr_count, rel_count = create_imdb_graph(
+        imdb_dir,
+        allowed,
+        exclude,
+        [out_dir],
+        workers=workers,
+        engine=engine,
+        on_metrics=collected.append,
+    )
+    for filename in ["attr_triples_1", "rel_triples_1"]:
+        assert _lines(os.path.join(out_dir, filename)) == _lines(
+            os.path.join(expected_dir, filename)
+        )
+    stages = {m.stage: m for m in collected}
+    assert list(stages) == [f"parse:{filename}" for filename in HEADERS] + [
+        "spool",
+        "dedup",
+        "write",
+        "create_imdb_graph",
+    ]
+    for filename in HEADERS:
+        parsed = stages[f"parse:{filename}"]
+        path = os.path.join(imdb_dir, filename)
+        assert parsed.rows_scanned == len(_lines(path))
+        assert parsed.bytes_read == os.path.getsize(path)
+        assert parsed.rows_kept > 0
+        assert parsed.peak_memory_mb > 0
+    triples = sum(stages[f"parse:{filename}"].rows_kept for filename in HEADERS)
+    assert stages["create_imdb_graph"].rows_scanned == triples
+    assert stages["dedup"].rows_kept == attr_count + rel_count
+    assert stages["write"].bytes_written == sum(
+        os.path.getsize(os.path.join(out_dir, filename))
+        for filename in ["attr_triples_1", "rel_triples_1"]
+    )
+    for m in collected:
+        assert m.wall_s >= 0
+        assert m.cpu_s >= 0
+
+
+def test_imdb_cache_metrics(tmp_path):
+    from moviegraphbenchmark.imdb_cache import build_filtered_cache
+
+    imdb_dir = str(tmp_path / "imdb")
+    allowed, _ = write_imdb_dumps(imdb_dir)
+    collected = []
+    build_filtered_cache(
+        imdb_dir, allowed, str(tmp_path / "cache"), on_metrics=collected.append
+    )
+    assert [m.stage for m in collected] == [f"cache:{f}" for f in HEADERS]
+    for m in collected:
+        path = os.path.join(imdb_dir, m.stage.split(":")[1])
+        assert m.rows_scanned == len(_lines(path))
+        assert 0 < m.rows_kept < m.rows_scanned
+
+
+def test_rows_are_counted_per_thread():
+    from moviegraphbenchmark import metrics
+
+    both_counting = threading.Barrier(2)
+    counts = {}
+
+    def count(name, rows):
+        with metrics.counting_rows() as counter:
+            both_counting.wait()
+            for _ in metrics.count_rows(range(rows)):
+                pass
+            metrics.add_rows(rows)
+            both_counting.wait()
+        counts[name] = counter.rows
+
+    threads = [
+        threading.Thread(target=count, args=(name, rows))
+        for name, rows in [("a", 3), ("b", 5)]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counts == {"a": 6, "b": 10}
+
+
+def test_cli_metrics_json(monkeypatch, tmp_path):
+    data_path = tmp_path / "data"
+    data_path.mkdir()
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    metrics_path = tmp_path / "metrics.json"
+    result = CliRunner().invoke(
+        create_graph_data,
+        [
+            "--data-path",
+            str(data_path),
+            "--no-cache",
+            "--profile",
+            "--metrics-json",
+            str(metrics_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with open(metrics_path, encoding="utf8") as in_file:
+        stages = {m["stage"]: m for m in json.load(in_file)}
+    assert stages["create_imdb_graph"]["rows_kept"] > 0
+    assert "parse:title.principals.tsv" in stages
+    assert "create_imdb_graph" in result.output
+
+    collected = []
+    data = load_data("imdb-tvdb", data_path, use_cache=False, on_metrics=collected.append)
+    stages = {m.stage: m for m in collected}
+    assert stages["load:imdb-tvdb/attr_triples_1"].rows_kept == len(data.attr_triples_1)
+    assert stages["load:imdb-tvdb/721_5fold/1/test_links"].bytes_read == os.path.getsize(
+        data_path / "imdb-tvdb" / "721_5fold" / "1" / "test_links"
+    )
+    # data that is already complete is not rebuilt
+    assert "create_imdb_graph" not in stages
@@ -0,0 +1,95 @@
+import itertools
+
+import numpy as np
+import pytest
+from test_load import copy_existing_data, mock_read_row_tuples, noop
+
+from moviegraphbenchmark import load_data, load_multi_source
+from moviegraphbenchmark.multi_source import DATASETS, RESOURCE_PREFIXES, read_clusters
+
+IMDB = RESOURCE_PREFIXES["imdb"]
+TMDB = RESOURCE_PREFIXES["tmdb"]
+TVDB = RESOURCE_PREFIXES["tvdb"]
+
+CLUSTERS = [
+    [f"{IMDB}tt1", f"{TMDB}movie1", f"{TVDB}1"],
+    [f"{IMDB}nm1", f"{IMDB}nm2"],
+    [f"{TMDB}person3", f"{TVDB}3", f"{IMDB}nm3", f"{TMDB}person4"],
+]
+
+
+@pytest.fixture
+def clusters(tmp_path):
+    path = tmp_path / "multi_source_cluster"
+    path.write_text("\n".join(",".join(cluster) for cluster in CLUSTERS) + "\n")
+    return read_clusters(str(path))
+
+
+def _uri_pairs(clusters, pairs):
+    return {frozenset(clusters.entities[pair]) for pair in pairs}
+
+
+def test_cluster_lookup(clusters):
+    assert len(clusters) == 3
+    assert clusters.cluster_of(f"{TVDB}3") == 2
+    with pytest.raises(KeyError):
+        clusters.cluster_of(f"{TVDB}2")
+    np.testing.assert_array_equal(
+        clusters.clusters_of([f"{IMDB}nm2", "unknown", f"{TMDB}movie1"]), [1, -1, 0]
+    )
+    assert list(clusters.cluster_members(2)) == CLUSTERS[2]
+    assert list(clusters.entity_source[:3]) == [0, 1, 2]
+
+
+def test_cluster_pairs(clusters):
+    expected = {
+        frozenset(pair)
+        for cluster in CLUSTERS
+        for pair in itertools.combinations(cluster, 2)
+    }
+    pairs = clusters.pairs()
+    assert pairs.shape == (len(expected), 2)
+    assert _uri_pairs(clusters, pairs) == expected
+    intra = _uri_pairs(clusters, clusters.intra_source_pairs())
+    assert intra == {
+        frozenset([f"{IMDB}nm1", f"{IMDB}nm2"]),
+        frozenset([f"{TMDB}person3", f"{TMDB}person4"]),
+    }
+    assert _uri_pairs(clusters, clusters.inter_source_pairs()) == expected - intra
+
+
+def test_duplicate_cluster_members(tmp_path):
+    path = tmp_path / "cluster"
+    path.write_text("a,b\nb,c\n")
+    clusters = read_clusters(str(path))
+    assert list(clusters.entities) == ["a", "b", "c"]
+    assert clusters.cluster_of("b") == 0
+
+
+def test_load_multi_source(monkeypatch, tmpdir):
+    data_path = str(tmpdir.mkdir("data"))
+    copy_existing_data(data_path)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_if_needed", noop)
+    monkeypatch.setattr("moviegraphbenchmark.create_graph.download_github_folder", noop)
+    monkeypatch.setattr(
+        "moviegraphbenchmark.create_graph._read_row_tuples", mock_read_row_tuples
+    )
+    multi = load_multi_source(data_path)
+    for dataset in DATASETS:
+        assert len(multi.attr_triples[dataset]) > 0
+        assert len(multi.rel_triples[dataset]) > 0
+        assert list(multi.intra_ent_links[dataset].columns) == [
+            f"{dataset}_left",
+            f"{dataset}_right",
+        ]
+        from_imdb = multi.attr_triples[dataset]["head"].str.startswith(IMDB)
+        assert from_imdb.all() if dataset == "imdb" else not from_imdb.any()
+    # the IMDB KG is a copy of the same parsed frame as the one of the pairs
+    pair = load_data("imdb-tmdb", data_path)
+    assert pair.attr_triples_1._kg_frame is multi.attr_triples["imdb"]._kg_frame
+    assert (multi.clusters.entity_source >= 0).all()
+    links = pair.ent_links
+    np.testing.assert_array_equal(
+        multi.clusters.clusters_of(links["left"]),
+        multi.clusters.clusters_of(links["right"]),
+    )
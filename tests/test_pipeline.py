@@ -0,0 +1,244 @@
+import gzip
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from test_load import copy_existing_data
+from test_utils import server  # noqa: F401
+
+from imdb_dumps import HEADERS, write_imdb_dumps
+from moviegraphbenchmark import create_graph, pipeline
+from moviegraphbenchmark.create_graph import _create_graph_data, create_imdb_graph
+from moviegraphbenchmark.get_imdb_data import download_if_needed, uris
+from moviegraphbenchmark.imdb_cache import (
+    build_filtered_cache,
+    cache_key,
+    filtered_cache_dir,
+    is_cached,
+)
+
+
+@pytest.fixture
+def served_dumps(server, tmp_path, monkeypatch):  # noqa: F811
+    url, served, handler = server
+    allowed, exclude = write_imdb_dumps(str(served), compress=True)
+    expected_dir = str(tmp_path / "expected")
+    write_imdb_dumps(expected_dir)
+    for u in list(uris):
+        monkeypatch.delitem(uris, u)
+    for filename in HEADERS:
+        monkeypatch.setitem(uris, f"{url}/{filename}.gz", filename)
+    return served, handler, allowed, exclude, expected_dir
+
+
+def _read(path):
+    with open(path, "rb") as in_file:
+        return in_file.read()
+
+
+def _cache_rows(cache_dir):
+    rows = {}
+    for filename in HEADERS:
+        with gzip.open(os.path.join(cache_dir, filename + ".gz"), "rt") as in_file:
+            rows[filename] = in_file.read()
+    return rows
+
+
+@pytest.mark.parametrize("keep_compressed", [False, True])
+def test_stream_dumps_into_cache(served_dumps, tmp_path, keep_compressed):
+    served, _, allowed, exclude, expected_dir = served_dumps
+    expected_cache = str(tmp_path / "expected_cache")
+    build_filtered_cache(expected_dir, allowed, expected_cache)
+    imdb_dir = str(tmp_path / "imdb")
+    cache_dir = str(tmp_path / "cache")
+    collected = []
+    missing = {u: os.path.join(imdb_dir, f) for u, f in uris.items()}
+    os.makedirs(imdb_dir)
+    pipeline.stream_dumps(
+        imdb_dir,
+        missing,
+        keep_compressed=keep_compressed,
+        cache=lambda: (allowed, cache_dir),
+        on_metrics=collected.append,
+        # small chunks and queues, so downloads have to wait for the decompression
+        queue_size=2,
+        chunk_size=512,
+    )
+    assert is_cached(cache_dir)
+    assert _cache_rows(cache_dir) == _cache_rows(expected_cache)
+    for filename in HEADERS:
+        path = os.path.join(imdb_dir, filename)
+        if keep_compressed:
+            assert not os.path.exists(path)
+            assert _read(path + ".gz") == _read(os.path.join(served, filename + ".gz"))
+        else:
+            assert _read(path) == _read(os.path.join(expected_dir, filename))
+            assert not os.path.exists(path + ".gz")
+    assert sorted(os.listdir(imdb_dir)) == sorted(
+        f + ".gz" if keep_compressed else f for f in HEADERS
+    )
+    stages = {m.stage: m for m in collected}
+    for filename in HEADERS:
+        streamed = stages[f"stream:{filename}"]
+        assert streamed.bytes_read == os.path.getsize(
+            os.path.join(served, filename + ".gz")
+        )
+        assert streamed.rows_kept > 0
+        with open(os.path.join(expected_dir, filename), "rb") as in_file:
+            assert streamed.rows_scanned == len(in_file.readlines())
+    assert stages["download"].bytes_read == sum(
+        os.path.getsize(os.path.join(served, f + ".gz")) for f in HEADERS
+    )
+
+
+def test_stream_filters_present_dumps(served_dumps, tmp_path):
+    _, handler, allowed, _, expected_dir = served_dumps
+    imdb_dir = str(tmp_path / "imdb")
+    os.makedirs(imdb_dir)
+    shutil.copyfile(
+        os.path.join(expected_dir, "name.basics.tsv"),
+        os.path.join(imdb_dir, "name.basics.tsv"),
+    )
+    cache_dir = str(tmp_path / "cache")
+    download_if_needed(imdb_dir, cache=lambda: (allowed, cache_dir))
+    assert len(handler.requests) == len(HEADERS) - 1
+    expected_cache = str(tmp_path / "expected_cache")
+    build_filtered_cache(expected_dir, allowed, expected_cache)
+    assert is_cached(cache_dir)
+    assert _cache_rows(cache_dir) == _cache_rows(expected_cache)
+
+
+def test_stream_resumes(served_dumps, tmp_path):
+    served, handler, _, _, expected_dir = served_dumps
+    filename = "title.principals.tsv"
+    data = _read(os.path.join(served, filename + ".gz"))
+    imdb_dir = str(tmp_path / "imdb")
+    os.makedirs(imdb_dir)
+    # left over from an interrupted run
+    with open(os.path.join(imdb_dir, filename + ".gz.part"), "wb") as out_file:
+        out_file.write(data[:1000])
+    handler.cut_after = 500
+    missing = {u: os.path.join(imdb_dir, f) for u, f in uris.items() if f == filename}
+    pipeline.stream_dumps(imdb_dir, missing, chunk_size=100)
+    assert _read(os.path.join(imdb_dir, filename)) == _read(
+        os.path.join(expected_dir, filename)
+    )
+    assert handler.requests[0] == "bytes=1000-"
+    assert len(handler.requests) == 2
+    assert os.listdir(imdb_dir) == [filename]
+
+
+def test_stream_without_ranges(served_dumps, tmp_path):
+    served, handler, _, _, expected_dir = served_dumps
+    handler.support_ranges = False
+    filename = "title.basics.tsv"
+    imdb_dir = str(tmp_path / "imdb")
+    os.makedirs(imdb_dir)
+    with open(os.path.join(imdb_dir, filename + ".gz.part"), "wb") as out_file:
+        out_file.write(b"garbage")
+    missing = {u: os.path.join(imdb_dir, f) for u, f in uris.items() if f == filename}
+    pipeline.stream_dumps(imdb_dir, missing)
+    assert _read(os.path.join(imdb_dir, filename)) == _read(
+        os.path.join(expected_dir, filename)
+    )
+
+
+def test_stream_failure(served_dumps, tmp_path):
+    served, _, _, _, _ = served_dumps
+    os.remove(os.path.join(served, "title.episode.tsv.gz"))
+    imdb_dir = str(tmp_path / "imdb")
+    os.makedirs(imdb_dir)
+    missing = {u: os.path.join(imdb_dir, f) for u, f in uris.items()}
+    with pytest.raises(Exception, match="404"):
+        pipeline.stream_dumps(imdb_dir, missing)
+    assert not os.path.exists(os.path.join(imdb_dir, "title.episode.tsv"))
+    assert not any(f.endswith(".tmp") for f in os.listdir(imdb_dir))
+
+
+def test_first_install_overlaps_downloads(served_dumps, tmp_path, monkeypatch):
+    served, handler, allowed, exclude, expected_dir = served_dumps
+    requested = threading.Event()
+    handler_get = handler.do_GET
+
+    def do_GET(self):
+        requested.set()
+        handler_get(self)
+
+    monkeypatch.setattr(handler, "do_GET", do_GET)
+    data_path = tmp_path / "data"
+    overlapped = []
+
+    def download_github_folder(path, version, **kwargs):
+        # the dumps are requested while the repository is still downloading
+        overlapped.append(requested.wait(timeout=10))
+        copy_existing_data(path)
+        for name in ["allowed", "exclude"]:
+            shutil.copyfile(
+                os.path.join(expected_dir, name), os.path.join(path, "imdb", name)
+            )
+
+    monkeypatch.setattr(create_graph, "download_github_folder", download_github_folder)
+    _create_graph_data(str(data_path))
+    assert overlapped == [True]
+    imdb_dir = str(data_path / "imdb")
+    cache_dir = filtered_cache_dir(
+        imdb_dir,
+        cache_key(os.path.join(imdb_dir, "allowed"), os.path.join(imdb_dir, "exclude")),
+    )
+    assert is_cached(cache_dir)
+    for filename in HEADERS:
+        assert _read(os.path.join(imdb_dir, filename)) == _read(
+            os.path.join(expected_dir, filename)
+        )
+    graph_dir = str(tmp_path / "graph")
+    create_imdb_graph(expected_dir, allowed, exclude, [graph_dir])
+    for filename in ["attr_triples_1", "rel_triples_1"]:
+        assert _read(os.path.join(data_path, "imdb-tvdb", filename)) == _read(
+            os.path.join(graph_dir, filename)
+        )
+
+
+def test_stream_failure_cancels_other_dumps(served_dumps, tmp_path, monkeypatch):
+    served, handler, _, _, _ = served_dumps
+    with open(os.path.join(served, "title.episode.tsv.gz"), "wb") as out_file:
+        out_file.write(b"not gzip" * 1000)
+    lines = os.urandom(2_000_000).hex().encode("ascii")
+    slow = gzip.compress(
+        b"\n".join(lines[i : i + 80] for i in range(0, len(lines), 80))
+    )
+    handler_get = handler.do_GET
+
+    def do_GET(self):
+        if not self.path.endswith("name.basics.tsv.gz"):
+            handler_get(self)
+            return
+        # takes about 10 seconds unless the client stops reading
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(slow)))
+        self.end_headers()
+        try:
+            for start in range(0, len(slow), 4096):
+                self.wfile.write(slow[start : start + 4096])
+                time.sleep(0.02)
+        except OSError:
+            pass
+
+    monkeypatch.setattr(handler, "do_GET", do_GET)
+    imdb_dir = str(tmp_path / "imdb")
+    os.makedirs(imdb_dir)
+    missing = {
+        u: os.path.join(imdb_dir, f)
+        for u, f in uris.items()
+        if f in ["name.basics.tsv", "title.episode.tsv"]
+    }
+    cache_dir = str(tmp_path / "cache")
+    start = time.perf_counter()
+    with pytest.raises(gzip.BadGzipFile):
+        pipeline.stream_dumps(
+            imdb_dir, missing, cache=lambda: (set(), cache_dir), chunk_size=4096
+        )
+    assert time.perf_counter() - start < 5
+    assert not any(f.endswith(".tmp") for f in os.listdir(imdb_dir))
+    assert not any(f.endswith(".tmp") for f in os.listdir(cache_dir))
@@ -0,0 +1,109 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+import pytest
+from test_encoding import data  # noqa: F401
+
+from moviegraphbenchmark.shared import attach_shared, open_mmap, share_encoded, write_mmap
+
+NUM_WORKERS = 3
+
+
+def _digest(encoded) -> str:
+    h = hashlib.sha256()
+    for array in [
+        encoded.rel_triples_1,
+        encoded.attr_triples_2,
+        encoded.ent_links,
+        encoded.folds[0].test_links,
+        encoded.intra_ent_links[1],
+    ]:
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+
+def _worker(name, path, barrier, results):
+    shared = attach_shared(name)
+    mapped = open_mmap(path)
+    first = int(shared.rel_triples_1[0, 0])
+    barrier.wait()
+    # the publisher changes the shared buffer in between
+    barrier.wait()
+    results.put(
+        {
+            "digest": _digest(shared),
+            "mmap_digest": _digest(mapped),
+            "first": first,
+            "changed": int(shared.rel_triples_1[0, 0]),
+            "writeable": shared.rel_triples_1.flags.writeable,
+            "entities_1": list(shared.entities_1),
+            "literals_2": list(mapped.literals_2),
+        }
+    )
+    shared.close()
+
+
+def test_shared_workers(data, tmp_path):  # noqa: F811
+    encoded = data.to_encoded()
+    path = str(tmp_path / "imdb-tvdb.mgb")
+    write_mmap(encoded, path)
+    shm = share_encoded(encoded)
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(NUM_WORKERS + 1)
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=_worker, args=(shm.name, path, barrier, results))
+            for _ in range(NUM_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        barrier.wait(timeout=60)
+        view = np.ndarray(
+            encoded.rel_triples_1.shape,
+            dtype=np.int32,
+            buffer=shm.buf,
+            offset=_offset_of(shm, "rel_triples_1"),
+        )
+        view[0, 0] = 42
+        del view
+        barrier.wait(timeout=60)
+        outputs = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+    finally:
+        shm.close()
+        shm.unlink()
+    expected = _digest(encoded)
+    for output in outputs:
+        assert output["mmap_digest"] == expected
+        assert output["first"] == encoded.rel_triples_1[0, 0]
+        # all workers see the change of the publisher, so nothing was copied
+        assert output["changed"] == 42
+        assert not output["writeable"]
+        assert output["entities_1"] == list(encoded.entities_1)
+        assert output["literals_2"] == list(encoded.literals_2)
+    assert len({output["digest"] for output in outputs}) == 1
+
+
+def _offset_of(shm, name) -> int:
+    attached = attach_shared(shm.name)
+    offset = attached._offsets[name]
+    attached.close()
+    return offset
+
+
+def test_attached_equals_encoded(data, tmp_path):  # noqa: F811
+    encoded = data.to_encoded()
+    path = str(tmp_path / "encoded.mgb")
+    write_mmap(encoded, path)
+    mapped = open_mmap(path)
+    for name in ["rel_triples_1", "rel_triples_2", "attr_triples_1", "ent_links"]:
+        np.testing.assert_array_equal(getattr(mapped, name), getattr(encoded, name))
+        with pytest.raises(ValueError):
+            getattr(mapped, name)[0, 0] = 1
+    for name in ["entities_2", "relations_1", "attributes_2", "literals_1"]:
+        assert getattr(mapped, name).equals(getattr(encoded, name))
+    assert len(mapped.folds) == len(encoded.folds)
@@ -0,0 +1,276 @@
+import os
+import random
+import re
+import threading
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from moviegraphbenchmark.utils import (
+    download_file,
+    download_files,
+    download_github_folder,
+    extract_data_folder,
+)
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files of a directory, optionally supporting range requests."""
+
+    support_ranges = True
+    # advertise range support, but answer every GET with the whole file
+    ranges_in_head_only = False
+    # answer HEAD requests with this error status
+    head_status = None
+    # close the connection after sending this many bytes of a response
+    cut_after = None
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, head_only: bool):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as in_file:
+            data = in_file.read()
+        range_header = self.headers.get("Range")
+        if not head_only:
+            type(self).requests.append(range_header)
+        start, end = 0, len(data) - 1
+        if range_header and self.support_ranges and not self.ranges_in_head_only:
+            first, last = re.match(r"bytes=(\d+)-(\d*)", range_header).groups()
+            start = int(first)
+            end = int(last) if last else end
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        if self.support_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head_only:
+            return
+        body = data[start : end + 1]
+        cut_after = type(self).cut_after
+        if cut_after is not None and len(body) > cut_after:
+            # simulate a dropped connection once
+            type(self).cut_after = None
+            self.wfile.write(body[:cut_after])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.head_status is not None:
+            self.send_error(self.head_status)
+            return
+        self._send(head_only=True)
+
+    def do_GET(self):
+        self._send(head_only=False)
+
+
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    handler = type("Handler", (RangeRequestHandler,), {"requests": []})
+    httpd = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(handler, directory=str(served))
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", served, handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _write_random(path, size, seed=0):
+    data = random.Random(seed).getrandbits(8 * size).to_bytes(size, "little")
+    with open(path, "wb") as out_file:
+        out_file.write(data)
+    return data
+
+
+def test_download_in_parts(server, tmp_path):
+    url, served, handler = server
+    data = _write_random(served / "dump.gz", 100_000)
+    dl_path = tmp_path / "dl"
+    dl_path.mkdir()
+    output_path = download_file(
+        f"{url}/dump.gz", str(dl_path), chunk_size=4096, min_part_size=10_000
+    )
+    with open(output_path, "rb") as in_file:
+        assert in_file.read() == data
+    assert sorted(handler.requests) == sorted(
+        ["bytes=0-24999", "bytes=25000-49999", "bytes=50000-74999", "bytes=75000-99999"]
+    )
+    assert os.listdir(dl_path) == ["dump.gz"]
+
+
+@pytest.mark.parametrize("support_ranges", [True, False])
+def test_resume_download(server, tmp_path, support_ranges):
+    url, served, handler = server
+    handler.support_ranges = support_ranges
+    data = _write_random(served / "dump.gz", 50_000)
+    dl_path = tmp_path / "dl"
+    dl_path.mkdir()
+    with open(dl_path / "dump.gz.part", "wb") as out_file:
+        out_file.write(data[:20_000])
+    output_path = download_file(f"{url}/dump.gz", str(dl_path))
+    with open(output_path, "rb") as in_file:
+        assert in_file.read() == data
+    if support_ranges:
+        assert handler.requests == ["bytes=20000-49999"]
+
+
+def test_resume_dropped_connection(server, tmp_path):
+    url, served, handler = server
+    handler.cut_after = 7_000
+    data = _write_random(served / "dump.gz", 30_000)
+    output_path = download_file(f"{url}/dump.gz", str(tmp_path), chunk_size=1024)
+    with open(output_path, "rb") as in_file:
+        assert in_file.read() == data
+    assert len(handler.requests) == 2
+    # bytes that were received before the connection dropped are kept
+    resumed_at = int(re.match(r"bytes=(\d+)-", handler.requests[1]).group(1))
+    assert 0 < resumed_at <= 7_000
+
+
+def test_head_rejected(server, tmp_path):
+    url, served, handler = server
+    handler.head_status = 405
+    data = _write_random(served / "dump.gz", 100_000)
+    output_path = download_file(f"{url}/dump.gz", str(tmp_path), min_part_size=10_000)
+    with open(output_path, "rb") as in_file:
+        assert in_file.read() == data
+    # a single unranged request
+    assert handler.requests == [None]
+
+
+def test_ranges_only_advertised(server, tmp_path):
+    url, served, handler = server
+    handler.ranges_in_head_only = True
+    data = _write_random(served / "dump.gz", 100_000)
+    dl_path = tmp_path / "dl"
+    dl_path.mkdir()
+    output_path = download_file(
+        f"{url}/dump.gz", str(dl_path), chunk_size=4096, min_part_size=10_000
+    )
+    with open(output_path, "rb") as in_file:
+        assert in_file.read() == data
+    # the split is given up after the first answers and fetched in one part
+    assert len(handler.requests) == 5
+    assert handler.requests[-1] == "bytes=0-99999"
+    assert os.listdir(dl_path) == ["dump.gz"]
+
+
+def test_download_files(server, tmp_path):
+    url, served, _ = server
+    contents = {
+        f"dump{i}.gz": _write_random(served / f"dump{i}.gz", 20_000 + i, seed=i)
+        for i in range(4)
+    }
+    dl_path = tmp_path / "dl"
+    dl_path.mkdir()
+    paths = download_files(
+        [f"{url}/{name}" for name in contents], str(dl_path), min_part_size=5_000
+    )
+    for path, (name, data) in zip(paths, contents.items()):
+        assert os.path.basename(path) == name
+        with open(path, "rb") as in_file:
+            assert in_file.read() == data
+
+
+_RELEASE_FILES = {
+    "README.md": b"readme",
+    "src/moviegraphbenchmark/__init__.py": b"",
+    "data/imdb/allowed": b"nm1\ntt1\n",
+    "data/imdb-tmdb/721_5fold/1/test_links": b"a\tb\n",
+    "data/imdb-tmdb/attr_triples_2": b"x" * 50_000,
+    "data/tmdb_intra_ent_links": b"y" * 30_000,
+}
+
+
+def _write_release(path, files=_RELEASE_FILES):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("MovieGraphBenchmark-1.0.0/", b"")
+        zip_ref.writestr("MovieGraphBenchmark-1.0.0/data/", b"")
+        for name, data in files.items():
+            zip_ref.writestr(f"MovieGraphBenchmark-1.0.0/{name}", data)
+
+
+def _extracted(path):
+    contents = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            with open(os.path.join(root, name), "rb") as in_file:
+                contents[os.path.relpath(os.path.join(root, name), path)] = in_file.read()
+    return contents
+
+
+def test_download_github_folder(server, tmp_path):
+    url, served, _ = server
+    _write_release(served / "v1.0.0.zip")
+    dl_path = tmp_path / "data"
+    (dl_path / "imdb-tmdb").mkdir(parents=True)
+    # existing files are replaced without changing the files they are linked to
+    (dl_path / "imdb-tmdb" / "attr_triples_2").write_bytes(b"old")
+    os.link(dl_path / "imdb-tmdb" / "attr_triples_2", dl_path / "linked")
+    (dl_path / "unrelated").write_bytes(b"kept")
+    download_github_folder(str(dl_path), "1.0.0", base_url=f"{url}/")
+    expected = {
+        os.path.join(*name.split("/")[1:]): data
+        for name, data in _RELEASE_FILES.items()
+        if name.startswith("data/")
+    }
+    expected.update({"linked": b"old", "unrelated": b"kept"})
+    assert _extracted(dl_path) == expected
+
+
+@pytest.mark.parametrize("min_parallel_size", [0, 10_000, 10**9])
+def test_extract_data_folder(tmp_path, min_parallel_size):
+    archive = tmp_path / "release.zip"
+    _write_release(archive)
+    dl_path = tmp_path / "data"
+    extract_data_folder(str(archive), str(dl_path), min_parallel_size=min_parallel_size)
+    assert set(_extracted(dl_path)) == {
+        os.path.join("imdb", "allowed"),
+        os.path.join("imdb-tmdb", "721_5fold", "1", "test_links"),
+        os.path.join("imdb-tmdb", "attr_triples_2"),
+        "tmdb_intra_ent_links",
+    }
+
+
+def test_extract_unsafe_path(tmp_path):
+    archive = tmp_path / "release.zip"
+    _write_release(archive, {"data/../../evil": b"evil"})
+    with pytest.raises(IOError, match="Unsafe"):
+        extract_data_folder(str(archive), str(tmp_path / "data"))
+    assert not (tmp_path / "evil").exists()
+
+
+def test_download_github_folder_archive_dir(server, tmp_path):
+    url, served, handler = server
+    _write_release(served / "v1.0.0.zip")
+    archive_dir = tmp_path / "archives"
+    download_github_folder(
+        str(tmp_path / "first"), "1.0.0", base_url=f"{url}/", archive_dir=str(archive_dir)
+    )
+    assert os.listdir(archive_dir) == ["v1.0.0.zip"]
+    requests = len(handler.requests)
+    os.remove(served / "v1.0.0.zip")
+    download_github_folder(
+        str(tmp_path / "second"), "1.0.0", base_url=f"{url}/", archive_dir=str(archive_dir)
+    )
+    assert len(handler.requests) == requests
+    assert _extracted(tmp_path / "first") == _extracted(tmp_path / "second")